@@ -1,6 +1,7 @@
 from .net import NeuroNetLibrary
-from .nlu import NeuroNluLibrary, NeuroNluRecognitionRequest, NeuroNluRecognitionResult
+from .nlu import NeuroNluLibrary, NeuroNluRecognitionRequest, NeuroNluRecognitionResult, MatchRules
 from .voice import NeuroVoiceLibrary, InvalidCallStateError, check_call_state
+from .logic import TransitionTable
 
 __all__ = ['NeuroNetLibrary', 'NeuroNluLibrary', 'NeuroNluRecognitionRequest', 'NeuroNluRecognitionResult',
-           'NeuroVoiceLibrary', 'InvalidCallStateError', 'check_call_state']
+           'MatchRules', 'NeuroVoiceLibrary', 'InvalidCallStateError', 'check_call_state', 'TransitionTable']
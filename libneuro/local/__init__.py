@@ -0,0 +1,21 @@
+from .agent import Agent
+from .classifier import IntentClassifier
+from .counters import CounterEngine
+from .dialer import DialerSimulator, PredictiveDialer
+from .env import MemoryEnvBackend
+from .net import LocalNeuroNetLibrary, parse_call_date
+from .nlu import LocalNeuroNluLibrary, LocalNeuroNluRecognitionRequest, LocalNeuroNluRecognitionResult
+from .nlu_api import NluApiClient, NluApiError, NluApiStubServer
+from .profiler import Histogram, Profiler
+from .scheduler import CallScheduler, ScheduledCall
+from .sms import FakeSmsGateway, SmsDispatcher, SmsMessage
+from .stats import FileStatsSink, SqliteStatsSink, StatsBuffer
+from .voice import LocalNeuroVoiceLibrary, Transition, check_call_state
+from .executor import ScriptExecutor
+
+__all__ = ['Agent', 'IntentClassifier', 'CounterEngine', 'DialerSimulator', 'PredictiveDialer', 'MemoryEnvBackend',
+           'LocalNeuroNetLibrary', 'parse_call_date', 'LocalNeuroNluLibrary', 'LocalNeuroNluRecognitionRequest',
+           'LocalNeuroNluRecognitionResult', 'NluApiClient', 'NluApiError', 'NluApiStubServer', 'Histogram',
+           'Profiler', 'CallScheduler', 'ScheduledCall', 'FakeSmsGateway', 'SmsDispatcher', 'SmsMessage',
+           'FileStatsSink', 'SqliteStatsSink', 'StatsBuffer', 'LocalNeuroVoiceLibrary', 'Transition',
+           'check_call_state', 'ScriptExecutor']
@@ -0,0 +1,46 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+Record = Union[str, Tuple[str, str]]
+
+
+class Agent:
+    """ Конфигурация агента (аналог данных из CMS) для локального исполнения скриптов логики
+
+    :param entities: паттерны сущностей {entity: {value: [pattern, ...]}}, паттерн – регулярное выражение
+    :param intents: паттерны интентов {intent: [pattern, ...]}
+    :param prompts: записи агента: названия промптов или пары (сущность, значение)
+    :param storage: пользовательские данные для nn.storage
+    :param output_entities: ключи nn.env, которые попадают в nn.dump
+    :param gazetteers: файлы справочников из build_gazetteer для extract_address / extract_person
+                       {'city': path, 'street': path, 'first': path, 'last': path, 'middle': path}
+    :param exceptions: замены слов и фраз в реплике до поиска сущностей {'интернэт': 'интернет'}
+    :param number_words: заменять в реплике числительные цифрами ("двадцать пять" -> "25")
+    :param intent_model: путь к модели IntentClassifier (без расширения, файлы .npy и .json), интенты,
+                         не найденные паттернами, определяются классификатором
+
+    Пример:
+    agent = Agent(entities={'confirm': {'true': [r'\\bда\\b', 'соглас'], 'false': [r'\\bнет\\b']}},
+                  intents={'callback': ['перезвон']},
+                  prompts=['hello_main_prompt', ('org', 'neuro')],
+                  output_entities=['call_result'])
+    """
+
+    def __init__(self,
+                 entities: Optional[Dict[str, Dict[str, List[str]]]] = None,
+                 intents: Optional[Dict[str, List[str]]] = None,
+                 prompts: Optional[Iterable[Record]] = None,
+                 storage: Optional[Dict[str, str]] = None,
+                 output_entities: Optional[Iterable[str]] = None,
+                 gazetteers: Optional[Dict[str, str]] = None,
+                 intent_model: Optional[str] = None,
+                 exceptions: Optional[Dict[str, str]] = None,
+                 number_words: bool = False):
+        self.entities = dict(entities or {})
+        self.intents = dict(intents or {})
+        self.prompts = set(prompts or ())
+        self.storage = dict(storage or {})
+        self.output_entities = list(output_entities or ())
+        self.gazetteers = dict(gazetteers or {})
+        self.intent_model = intent_model
+        self.exceptions = dict(exceptions or {})
+        self.number_words = number_words
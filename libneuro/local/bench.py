@@ -0,0 +1,1059 @@
+""" Бенчмарки локального рантайма
+
+Запуск:
+    python3 -m libneuro.local.bench [name ...] [--script task_logic.py]
+
+Без аргументов запускаются все бенчмарки.
+"""
+import argparse
+import csv
+import heapq
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from ..nlu import MatchRules
+from .agent import Agent
+from .counters import CounterEngine
+from .dialer import DialerSimulator, PredictiveDialer
+from .env import MemoryEnvBackend
+from .executor import ScriptExecutor
+from .gazetteer import Gazetteer, build_gazetteer
+from .normalizer import Normalizer, parse_number_words
+from .net import LocalNeuroNetLibrary
+from .scheduler import CallScheduler
+from .nlu import LocalNeuroNluLibrary, LocalNeuroNluRecognitionResult
+from .nlu_api import NluApiClient, NluApiStubServer, random_latency
+from .profiler import Histogram, Profiler
+from .sms import FakeSmsGateway, SmsDispatcher, SmsMessage
+from .stats import (POLICY_BLOCK, POLICY_DROP_NEWEST, POLICY_DROP_OLDEST, FileStatsSink, SqliteStatsSink,
+                    StatsBuffer)
+from ..voice import InvalidCallStateError
+from .voice import LocalNeuroVoiceLibrary, check_call_state
+
+# Паттерны сущностей для task_logic.py
+DEMO_AGENT = Agent(
+    entities={
+        'confirm': {'true': [r'\bда\b', r'\bконечно\b', r'соглас'], 'false': [r'\bнет\b', r'не надо']},
+        'repeat': {'true': [r'повтор', r'еще раз', r'не расслышал']},
+        'robot': {'true': [r'робот', r'автоответчик']},
+        'operator': {'true': [r'оператор', r'специалист', r'живой человек']},
+        'payment_problem': {'true': [r'оплат', r'плат[её]ж', r'счет']},
+        'internet_problem': {'true': [r'интернет', r'wi-?fi', r'роутер']},
+        'tv_problem': {'true': [r'телевиден', r'\bтв\b', r'канал']},
+        'pay_site': {'true': [r'сайт', r'онлайн']},
+        'offices': {'true': [r'офис', r'отделени']},
+        'promise_pay': {'true': [r'заплачу', r'оплачу', r'внесу']},
+        'no_question': {'true': [r'нет вопросов', r'больше ничего', r'все понятно']},
+    },
+    output_entities=['hello_unit_exec_count'],
+)
+
+DEMO_DIALOGS = [
+    ['у меня не работает интернет', 'нет', 'да', 'нет вопросов'],
+    ['проблема с оплатой', 'а где офис', 'хорошо я заплачу', 'да', 'нет вопросов'],
+    ['не показывает телевидение', 'повторите пожалуйста', 'да', 'больше ничего'],
+    [None, 'алло', 'ты робот', 'оператор'],
+    [None, None, None],
+    ['что', 'что', 'интернет', 'да'],
+]
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                              'task_logic.py')
+
+
+def _report(name, count, elapsed, unit='op'):
+    print('%-32s %10d %-8s %10.3f s %12.0f %s/s %10.2f us/%s'
+          % (name, count, unit, elapsed, count / elapsed, unit, elapsed / count * 1e6, unit))
+
+
+def bench_dialogs(script=DEFAULT_SCRIPT, count=20000):
+    """ Сквозное исполнение диалогов hello_main -> *_logic -> goodbye_* """
+    executor = ScriptExecutor.from_file(script, DEMO_AGENT)
+    started = time.perf_counter()
+    for i in range(count):
+        executor.run('hello_main', DEMO_DIALOGS[i % len(DEMO_DIALOGS)], msisdn='7900%07d' % i)
+    _report('dialogs', count, time.perf_counter() - started, 'dialog')
+
+
+def _stack_depth():
+    depth, frame = 0, sys._getframe(1)
+    while frame is not None:
+        depth, frame = depth + 1, frame.f_back
+    return depth
+
+
+def bench_trampoline(script=DEFAULT_SCRIPT, count=20000):
+    """ Рекурсивное исполнение против trampoline: скорость и максимальная глубина стека на длинном звонке """
+    long_dialog = ['что'] * 9 + ['интернет'] + ['что'] * 9 + ['да']
+    for trampoline in (False, True):
+        executor = ScriptExecutor.from_file(script, DEMO_AGENT, trampoline=trampoline)
+        depths = []
+        say = executor.nv.say
+        executor.nv.say = lambda *args: (depths.append(_stack_depth()), say(*args))
+        executor.run('hello_main', long_dialog)
+        executor.nv.say = say
+        started = time.perf_counter()
+        for i in range(count):
+            executor.run('hello_main', DEMO_DIALOGS[i % len(DEMO_DIALOGS)])
+        _report('dialogs trampoline=%s' % trampoline, count, time.perf_counter() - started, 'dialog')
+        print('%-32s max stack depth %d over %d prompts' % ('', max(depths), len(depths)))
+
+
+def bench_profile(script=DEFAULT_SCRIPT, count=20000):
+    """ Диалоги без профайлера, с выключенным и включенным Profiler; точность квантилей Histogram """
+    executor = ScriptExecutor.from_file(script, DEMO_AGENT)
+    profiler = Profiler()
+    profiled = ScriptExecutor.from_file(script, DEMO_AGENT, profiler=profiler)
+    for name, current, enabled in (('no profiler', executor, False), ('profiler disabled', profiled, False),
+                                   ('profiler enabled', profiled, True)):
+        profiler.enabled = enabled
+        started = time.perf_counter()
+        for i in range(count):
+            current.run('hello_main', DEMO_DIALOGS[i % len(DEMO_DIALOGS)])
+        _report('dialogs %s' % name, count, time.perf_counter() - started, 'dialog')
+    print(profiler.table())
+    rnd = random.Random(0)
+    values = sorted(int(rnd.lognormvariate(10, 2)) for _ in range(count))
+    histogram = Histogram()
+    started = time.perf_counter()
+    for value in values:
+        histogram.record(value)
+    _report('histogram record', count, time.perf_counter() - started)
+    exact = {share: values[int(share * count + 0.5) - 1] for share in (0.5, 0.9, 0.99, 0.999)}
+    error = max(abs(histogram.percentile(share) - value) / value for share, value in exact.items())
+    print('%-32s max relative quantile error %.2f%%' % ('', error * 100))
+
+
+def bench_counters(count=500000, threads=8):
+    """ nn.counter: словарь звонка, CounterEngine, round trip к backend на каждую операцию; атомарность add """
+    counters = {}
+    started = time.perf_counter()
+    for i in range(count):
+        value = counters.get('hello_null', 0)
+        counters['hello_null'] = value + 1
+    _report('counter dict', count, time.perf_counter() - started)
+    variants = (('CounterEngine', None, False), ('CounterEngine + backend', MemoryEnvBackend(), False),
+                ('round trip per op', MemoryEnvBackend(), True))
+    for name, backend, per_op in variants:
+        engine = CounterEngine(backend, interval=0.05)
+        started = time.perf_counter()
+        for i in range(count):
+            engine.add(i // 4, 'hello_null', 1)
+            if per_op:
+                engine.flush()
+            elif i % 4 == 3:
+                engine.end_call(i // 4)
+        engine.close()
+        _report(name, count, time.perf_counter() - started)
+        if backend is not None:
+            print('%-32s %.3f backend round trips/op' % ('', backend.round_trips / count))
+    engine = CounterEngine()
+    seen = [[] for _ in range(threads)]
+
+    def worker(values):
+        for _ in range(count // threads):
+            values.append(engine.add('call', 'hello_null', 1))
+    workers = [threading.Thread(target=worker, args=(values,)) for values in seen]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    values = sorted(value for thread_values in seen for value in thread_values)
+    assert values == list(range(count // threads * threads)), 'CounterEngine.add is not atomic'
+    print('%-32s %d threads: every value returned exactly once, final %d'
+          % ('', threads, engine.get('call', 'hello_null')))
+
+
+class _CountingNet(LocalNeuroNetLibrary):
+    """ nn, который только считает вставленные звонки – память не растет от размера кампании """
+
+    def _insert_calls(self, calls):
+        self.call_inserts += 1
+        self.inserted = getattr(self, 'inserted', 0) + len(calls)
+
+
+def _campaign(count):
+    dates = ['2020-05-2%d 1%d:00:00' % (day, hour) for day in range(5) for hour in range(10)]
+    for i in range(count):
+        yield {'msisdn': '7900%07d' % i, 'date': dates[i % len(dates)], 'entry_point': 'main_online',
+               'on_success_call': 'main_success', 'on_failed_call': 'main_failed', 'priority': i % 3}
+
+
+def bench_call_many(count=200000):
+    """ Загрузка кампании: nn.call на каждый номер против nn.call_many из генератора и CSV; пиковая память """
+    nn = LocalNeuroNetLibrary()
+    started = time.perf_counter()
+    for spec in _campaign(count):
+        nn.call(**spec)
+    _report('nn.call loop', count, time.perf_counter() - started, 'call')
+    print('%-32s %d inserts' % ('', nn.call_inserts))
+    nn = LocalNeuroNetLibrary()
+    started = time.perf_counter()
+    assert nn.call_many(_campaign(count)) == count
+    _report('nn.call_many generator', count, time.perf_counter() - started, 'call')
+    print('%-32s %d inserts' % ('', nn.call_inserts))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'campaign.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, ['msisdn', 'date', 'entry_point', 'on_success_call', 'on_failed_call',
+                                        'priority'])
+            writer.writeheader()
+            writer.writerows(_campaign(count))
+        for label, source in (('nn.call_many generator', _campaign), ('nn.call_many csv', None)):
+            nn = _CountingNet()
+            tracemalloc.start()
+            started = time.perf_counter()
+            if source is None:
+                with open(path, newline='', encoding='utf-8') as f:
+                    nn.call_many(csv.DictReader(f))
+            else:
+                nn.call_many(source(count))
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert nn.inserted == count
+            print('%-32s %.2f us/call under tracemalloc, peak %.0f KB' % (label, elapsed / count * 1e6, peak / 1024))
+
+
+class _HeapScheduler:
+    """ Базовая очередь звонков на heapq: (тик, -приоритет, call_id), отмена – ленивым множеством """
+
+    def __init__(self, now):
+        self.heap = []
+        self.cancelled = set()
+        self.origin = now
+        self.ids = 0
+
+    def add(self, date, payload, priority=0):
+        self.ids += 1
+        heapq.heappush(self.heap, (int((date - self.origin).total_seconds()), -priority, self.ids, payload))
+        return self.ids
+
+    def cancel(self, call_id):
+        self.cancelled.add(call_id)
+
+    def pop_due(self, now):
+        limit = int((now - self.origin).total_seconds())
+        due = []
+        while self.heap and self.heap[0][0] <= limit:
+            _, _, call_id, _ = heapq.heappop(self.heap)
+            if call_id in self.cancelled:
+                self.cancelled.discard(call_id)
+            else:
+                due.append(call_id)
+        return due
+
+
+def bench_scheduler(count=500000):
+    """ CallScheduler (timing wheel) против heapq: вставка, отмена 10%, выдача за неделю шагами по минуте """
+    rnd = random.Random(0)
+    start = datetime(2024, 1, 1)
+    dates = [start + timedelta(seconds=rnd.randrange(7 * 86400)) for _ in range(count)]
+    priorities = [rnd.randrange(3) for _ in range(count)]
+    cancelled = rnd.sample(range(count), count // 10)
+    payload = {'entry_point': 'main_online'}
+    results = {}
+    for name, scheduler in (('heapq', _HeapScheduler(start)), ('timing wheel', CallScheduler(now=start))):
+        started = time.perf_counter()
+        ids = [scheduler.add(date, payload, priority) for date, priority in zip(dates, priorities)]
+        _report('%s add' % name, count, time.perf_counter() - started, 'call')
+        started = time.perf_counter()
+        for i in cancelled:
+            scheduler.cancel(ids[i])
+        _report('%s cancel' % name, len(cancelled), time.perf_counter() - started, 'call')
+        started = time.perf_counter()
+        dispatched = []
+        now = start
+        while now <= start + timedelta(days=7):
+            now += timedelta(minutes=1)
+            due = scheduler.pop_due(now)
+            dispatched.append(sorted(due if name == 'heapq' else [call.call_id for call in due]))
+        _report('%s pop_due' % name, count - len(cancelled), time.perf_counter() - started, 'call')
+        results[name] = dispatched
+    assert results['heapq'] == results['timing wheel'], 'timing wheel and heapq dispatched different calls'
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'calls.log')
+        scheduler = CallScheduler(now=start, log_path=path)
+        started = time.perf_counter()
+        for chunk in range(0, count, 1000):
+            scheduler.add_many((date, priority, payload) for date, priority in
+                               zip(dates[chunk:chunk + 1000], priorities[chunk:chunk + 1000]))
+        _report('timing wheel add_many + log', count, time.perf_counter() - started, 'call')
+        scheduler.pop_due(start + timedelta(days=1))
+        scheduler.close()
+        started = time.perf_counter()
+        restored = CallScheduler(now=start + timedelta(days=1), log_path=path)
+        _report('timing wheel replay', len(restored), time.perf_counter() - started, 'call')
+        restored.close()
+
+
+class _ProgressiveDialer(PredictiveDialer):
+    """ Базовая политика: набор только на свободные линии, без брошенных звонков """
+
+    @staticmethod
+    def _allowance(channel):
+        return max(channel.capacity - channel.active - channel.ringing, 0)
+
+
+def bench_dialer(count=20000):
+    """ Прогрессивный и предиктивный набор кампании на двух каналах в DialerSimulator """
+    start = datetime(2024, 1, 1, 9)
+    rates = (('answer 15%', 0.15), ('answer 30%', 0.3), ('answer 60%', 0.6),
+             ('answer 50% -> 15%', lambda elapsed: 0.5 if elapsed < 3600 else 0.15))
+    for label, answer_rate in rates:
+        for name, dialer_class in (('progressive', _ProgressiveDialer), ('predictive', PredictiveDialer)):
+            scheduler = CallScheduler(now=start)
+            scheduler.add_many((start, None, {'channel': 'sip-1' if i % 4 else 'sip-2'}) for i in range(count))
+            dialer = dialer_class(scheduler, capacity={'sip-1': 30, 'sip-2': 10})
+            started = time.perf_counter()
+            report = DialerSimulator(answer_rate=answer_rate).run(dialer, start)
+            elapsed = time.perf_counter() - started
+            print('%-18s %-12s %6.2f h  utilization %5.1f%%  abandoned %5.1f%%  %6.0f connected/h  %5.2f us/dial'
+                  % (label, name, report['duration'] / 3600, report['utilization'] * 100,
+                     report['abandon_rate'] * 100, report['connected_per_hour'], elapsed / report['dials'] * 1e6))
+
+
+def bench_sms(count=20000, latency=0.002):
+    """ nn.send_sms: синхронный запрос к шлюзу на сообщение против SmsDispatcher; лимит скорости канала """
+    channels = ['sms-%d' % i for i in range(4)]
+    messages = [('7900%07d' % (i % (count * 9 // 10)), 'Ваш код: %d' % (i % (count * 9 // 10)), channels[i % 4])
+                for i in range(count)]
+    gateway = FakeSmsGateway(latency=latency)
+    sample = messages[:count // 100]
+    started = time.perf_counter()
+    for dest_number, text, channel in sample:
+        gateway.send_batch(channel, [SmsMessage(0, dest_number, text, channel)])
+    _report('sms synchronous send', len(sample), time.perf_counter() - started, 'sms')
+    gateway = FakeSmsGateway(latency=latency, failure_rate=0.01)
+    dispatcher = SmsDispatcher(gateway, rate=1e6, batch_size=500)
+    nn = LocalNeuroNetLibrary(sms_dispatcher=dispatcher)
+    started = time.perf_counter()
+    for dest_number, text, channel in messages:
+        nn.send_sms(dest_number, text, channel)
+    _report('sms SmsDispatcher send', count, time.perf_counter() - started, 'sms')
+    dispatcher.flush()
+    _report('sms SmsDispatcher send + flush', count, time.perf_counter() - started, 'sms')
+    print('%-32s %d delivered, %d failed, %d duplicates in %d requests'
+          % ('', dispatcher.delivered, dispatcher.failed, dispatcher.duplicates, gateway.requests))
+    dispatcher.close()
+    dispatcher = SmsDispatcher(FakeSmsGateway(), rate={channels[0]: 2000}, default_rate=500, batch_size=100)
+    nn = LocalNeuroNetLibrary(sms_dispatcher=dispatcher)
+    started = time.perf_counter()
+    nn.send_sms_many(messages[:8000])
+    dispatcher.flush()
+    # по 2000 sms на канал: sms-0 (2000/s) отправляет все сразу из burst, остальные – burst 500 и 1500 за 3 s
+    print('%-32s 4 x 2000 sms, 2000/s and 3 x 500/s: %.2f s, expected ~3.00 s'
+          % ('sms rate limit', time.perf_counter() - started))
+    dispatcher.close()
+
+
+class _SlowSink:
+    """ sink с фиксированной задержкой на пакет – для проверки политик переполнения """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.records = 0
+
+    def write(self, records):
+        time.sleep(self.latency)
+        self.records += len(records)
+
+    def close(self):
+        pass
+
+
+def bench_stats(script=DEFAULT_SCRIPT, count=50000):
+    """ nn.log / nn.dump: синхронная запись каждой записи против StatsBuffer; политики переполнения """
+    with tempfile.TemporaryDirectory() as directory:
+        records = [(i // 10, 'nn.log', 'unit', 'hello_main %d' % i) for i in range(count)]
+        for name, sink in (('sqlite', SqliteStatsSink(os.path.join(directory, 'sync.db'))),
+                           ('file', FileStatsSink(os.path.join(directory, 'sync.jsonl')))):
+            started = time.perf_counter()
+            for record in records:
+                sink.write([record])
+            _report('%s write per record' % name, count, time.perf_counter() - started, 'record')
+            sink.close()
+        for name, sink in (('sqlite', SqliteStatsSink(os.path.join(directory, 'buffer.db'))),
+                           ('file', FileStatsSink(os.path.join(directory, 'buffer.jsonl')))):
+            buffer = StatsBuffer(sink)
+            started = time.perf_counter()
+            for record in records:
+                buffer.put(record)
+            enqueued = time.perf_counter() - started
+            buffer.flush()
+            _report('%s StatsBuffer put' % name, count, enqueued, 'record')
+            _report('%s StatsBuffer put + flush' % name, count, time.perf_counter() - started, 'record')
+            print('%-32s %d batches' % ('', buffer.batches))
+            buffer.close()
+        for label, hangup_timeout in (('dialogs', None), ('dialogs StatsBuffer sqlite', 0.0),
+                                      ('dialogs StatsBuffer hangup wait', 1.0)):
+            buffer = None
+            if hangup_timeout is not None:
+                buffer = StatsBuffer(SqliteStatsSink(os.path.join(directory, 'dialogs-%s.db' % hangup_timeout)),
+                                     hangup_timeout=hangup_timeout)
+            executor = ScriptExecutor.from_file(script, DEMO_AGENT, stats_buffer=buffer)
+            started = time.perf_counter()
+            for i in range(count // 10):
+                executor.run('hello_main', DEMO_DIALOGS[i % len(DEMO_DIALOGS)])
+            executor.close()
+            _report(label, count // 10, time.perf_counter() - started, 'dialog')
+            if buffer is not None:
+                print('%-32s %d records in %d batches, %d dropped, %d errors'
+                      % ('', buffer.written, buffer.batches, buffer.dropped, buffer.errors))
+                buffer.close()
+    for policy in (POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_BLOCK):
+        sink = _SlowSink(0.01)
+        buffer = StatsBuffer(sink, capacity=1000, batch_size=100, policy=policy, block_timeout=0.05)
+        started = time.perf_counter()
+        for record in records[:count // 10]:
+            buffer.put(record)
+        elapsed = time.perf_counter() - started
+        buffer.close()
+        print('%-32s put %.1f us/record, written %d, dropped %d'
+              % ('overflow %s' % policy, elapsed / (count // 10) * 1e6, sink.records, buffer.dropped))
+
+
+ENV_SCRIPT = """
+@check_call_state(nv)
+def survey_main():
+    nn.env('turn', (nn.env('turn') or 0) + 1)
+    nn.env('last_unit', 'survey_main')
+    nn.env('attempt', nn.env('turn'))
+    nv.say('question')
+    with nv.listen(entities=['confirm']) as r:
+        pass
+    nn.env('last_answer', r.utterance())
+    nn.env({'confirm': r.entity('confirm'), 'silence': 'true' if not r else None})
+    if r.has_entity('confirm'):
+        nv.hangup()
+    return survey_main()
+"""
+
+
+def bench_env(script=DEFAULT_SCRIPT, count=20000):
+    """ nn.env с backend: запись при каждом nn.env против отложенной записи раз в ход """
+    survey = [[None, 'что', 'да'], ['алло', 'нет'], [None, None, None, None]]
+    for name, source, dialogs, entry_point in (('demo', None, DEMO_DIALOGS, 'hello_main'),
+                                               ('survey', ENV_SCRIPT, survey, 'survey_main')):
+        for write_behind in (False, True):
+            backend = MemoryEnvBackend()
+            if source is None:
+                executor = ScriptExecutor.from_file(script, DEMO_AGENT, env_backend=backend)
+            else:
+                executor = ScriptExecutor(source, DEMO_AGENT, env_backend=backend)
+            executor.nn.env_write_behind = write_behind
+            started = time.perf_counter()
+            for i in range(count):
+                executor.run(entry_point, dialogs[i % len(dialogs)])
+            _report('%s write_behind=%s' % (name, write_behind), count, time.perf_counter() - started, 'dialog')
+            print('%-32s %.2f backend round trips/dialog' % ('', backend.round_trips / count))
+
+
+def _legacy_check_call_state(nv):
+    """ Проверка статуса через nv.is_running() на каждом вызове – как до CallState """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            if not nv.is_running():
+                raise InvalidCallStateError('Call is not running: %s' % nv.state)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bench_call_state(count=2000000):
+    """ Накладные расходы check_call_state на переход: без декоратора, nv.is_running(), чтение CallState """
+    def unit(value):
+        return value
+
+    nv = LocalNeuroVoiceLibrary(LocalNeuroNluLibrary(DEMO_AGENT))
+    variants = [('undecorated', unit), ('decorated is_running()', _legacy_check_call_state(nv)(unit)),
+                ('decorated CallState', check_call_state(nv)(unit))]
+    baseline = None
+    for name, func in variants:
+        started = time.perf_counter()
+        for i in range(count):
+            func(i)
+        elapsed = time.perf_counter() - started
+        _report(name, count, elapsed, 'call')
+        if baseline is None:
+            baseline = elapsed
+        else:
+            print('%-32s overhead %.1f ns/call' % ('', (elapsed - baseline) / count * 1e9))
+    nv.hangup()
+    decorated = variants[-1][1]
+    started = time.perf_counter()
+    for i in range(count // 10):
+        try:
+            decorated(i)
+        except InvalidCallStateError:
+            pass
+        else:
+            raise AssertionError('check_call_state must raise after hangup')
+    _report('raise after hangup', count // 10, time.perf_counter() - started, 'call')
+
+
+def _chained_more_question(r):
+    if r.has_entity("payment_problem"):
+        if r.entity("payment_problem") == 'true':
+            return 'payment_main'
+    if r.has_entity("internet_problem"):
+        if r.entity("internet_problem") == 'true':
+            return 'internet_main'
+    if r.has_entity("tv_problem"):
+        if r.entity("tv_problem") == 'true':
+            return 'tv_main'
+    if r.has_entity("robot"):
+        if r.entity("robot") == 'true':
+            return 'more_question_robot'
+    if r.has_entity("no_question"):
+        if r.entity("no_question") == 'true':
+            return 'goodbye_main'
+    if r.has_entity("operator"):
+        if r.entity("operator") == 'true':
+            return 'goodbye_operator_demand'
+    if r.has_entity("confirm"):
+        if r.entity("confirm") == 'true':
+            return 'more_question_confirm'
+    return 'more_question_default'
+
+
+def bench_match(count=500000):
+    """ r.match() против цепочки has_entity() / entity() на правилах more_question_logic """
+    rules = {
+        ('payment_problem', 'true'): 'payment_main',
+        ('internet_problem', 'true'): 'internet_main',
+        ('tv_problem', 'true'): 'tv_main',
+        ('robot', 'true'): 'more_question_robot',
+        ('no_question', 'true'): 'goodbye_main',
+        ('operator', 'true'): 'goodbye_operator_demand',
+        ('confirm', 'true'): 'more_question_confirm',
+    }
+    compiled = MatchRules(rules)
+    results = [LocalNeuroNluRecognitionResult('...', entities) for entities in (
+        {'confirm': 'true'}, {'operator': 'true', 'confirm': 'false'}, {'payment_problem': 'true'}, {'repeat': 'true'})]
+    for r in results:
+        assert r.match(compiled, 'more_question_default') == _chained_more_question(r)
+    for name, func in (('match chained if', _chained_more_question),
+                       ('match dict rules', lambda r: r.match(rules, 'more_question_default')),
+                       ('match MatchRules', lambda r: r.match(compiled, 'more_question_default'))):
+        started = time.perf_counter()
+        for i in range(count):
+            func(results[i & 3])
+        _report(name, count, time.perf_counter() - started)
+    # на 7 правилах выигрыша по времени нет, match стоит O(найденных сущностей) и выигрывает на больших таблицах
+    many = {('entity_%d' % i, 'true'): 'unit_%d' % i for i in range(100)}
+    compiled = MatchRules(many)
+    results = [LocalNeuroNluRecognitionResult('...', {'entity_%d' % i: 'true'}) for i in (97, 98, 99, 5)]
+
+    def chained(r):
+        for (entity, value), unit in many.items():
+            if r.has_entity(entity) and r.entity(entity) == value:
+                return unit
+        return None
+    for name, func in (('match chained if, 100 rules', chained),
+                       ('match MatchRules, 100 rules', lambda r: r.match(compiled))):
+        started = time.perf_counter()
+        for i in range(count // 10):
+            func(results[i & 3])
+        _report(name, count // 10, time.perf_counter() - started)
+
+
+def _synthetic_agent(entity_count, seed=0):
+    rnd = random.Random(seed)
+    alphabet = 'абвгдежзиклмнопрстуфхцчшщыэюя'
+    words = [''.join(rnd.choice(alphabet) for _ in range(rnd.randint(4, 9))) for _ in range(entity_count * 4)]
+    entities = {'entity_%d' % i: {'true': [r'\b%s' % words[i * 4], words[i * 4 + 1]],
+                                  'false': [r'не %s\b' % words[i * 4 + 2], r'%s[аы]?' % words[i * 4 + 3]]}
+                for i in range(entity_count)}
+    return Agent(entities=entities), words
+
+
+def bench_extract(count=20000):
+    """ nlu.extract по всем сущностям агента: сравнение с последовательной проверкой паттернов """
+    rnd = random.Random(1)
+    for entity_count in (10, 100, 1000):
+        agent, words = _synthetic_agent(entity_count)
+        nlu = LocalNeuroNluLibrary(agent)
+        sequential = [(entity, value, [re.compile(pattern) for pattern in patterns])
+                      for entity, values in agent.entities.items() for value, patterns in values.items()]
+        utterances = [' '.join(rnd.choice(words) for _ in range(6)) for _ in range(64)]
+        for text in utterances:
+            expected = {}
+            for entity, value, patterns in sequential:
+                if entity not in expected and any(pattern.search(text) for pattern in patterns):
+                    expected[entity] = value
+            assert nlu.extract(text).dump()['entities'] == expected
+        runs = max(count // entity_count, 200)
+        started = time.perf_counter()
+        for i in range(runs):
+            text = utterances[i & 63]
+            found = {}
+            for entity, value, patterns in sequential:
+                if entity in found:
+                    continue
+                for pattern in patterns:
+                    if pattern.search(text):
+                        found[entity] = value
+                        break
+        _report('extract sequential %d entities' % entity_count, runs, time.perf_counter() - started)
+        started = time.perf_counter()
+        for i in range(count):
+            nlu.extract(utterances[i & 63])
+        _report('extract matcher %d entities' % entity_count, count, time.perf_counter() - started)
+
+
+def _misspell(rnd, word):
+    """ Одна ошибка ASR: замена, пропуск или вставка буквы """
+    alphabet = 'абвгдежзиклмнопрстуфхцчшщыэюя'
+    i = rnd.randrange(len(word))
+    kind = rnd.randrange(3)
+    if kind == 0:
+        return word[:i] + rnd.choice(alphabet) + word[i + 1:]
+    if kind == 1 and len(word) > 1:
+        return word[:i] + word[i + 1:]
+    return word[:i] + rnd.choice(alphabet) + word[i:]
+
+
+def bench_fuzzy(count=2000):
+    """ nlu.extract(fuzzy=True): полнота на фразах с ошибками ASR и стоимость одной фразы """
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print('fuzzy: numpy is not installed, skipped')
+        return
+    rnd = random.Random(5)
+    phrases = ['я согласен', 'соедините с оператором', 'проблема с интернетом', 'повторите пожалуйста',
+               'я внесу платеж завтра', 'смотрю телевидение', 'где ваш офис', 'нет вопросов спасибо']
+    sources = [rnd.choice(phrases) for _ in range(256)]
+    typos = [' '.join(_misspell(rnd, word) if len(word) > 3 else word for word in phrase.split())
+             for phrase in sources]
+    nlu = LocalNeuroNluLibrary(DEMO_AGENT)
+    # ожидаемые сущности – точный поиск по фразе без ошибок; 'работает' в одной ошибке от основы 'робот'
+    cases = list(zip(typos, (nlu.extract(phrase).dump()['entities'] for phrase in sources)))
+    cases.append(('интирнет не работает', {'internet_problem': 'true'}))
+    for label, fuzzy in (('exact', False), ('fuzzy', True)):
+        correct = extra = 0
+        for text, expected in cases:
+            found = nlu.extract(text, fuzzy=fuzzy).dump()['entities']
+            correct += found == expected
+            extra += sum(1 for name, value in found.items() if expected.get(name) != value)
+        print('%-32s %s: %d/%d utterances with expected entities, %d wrong entities (threshold %.2f)'
+              % ('fuzzy recall', label, correct, len(cases), extra, nlu.fuzzy_threshold))
+    assert nlu.extract('интирнет не работает', fuzzy=True).entity('robot') is None
+    for name, agent, utterances in [('demo', DEMO_AGENT, typos)] + [
+            ('%d entities' % entity_count,) + _synthetic_typos(rnd, entity_count) for entity_count in (100, 1000)]:
+        nlu = LocalNeuroNluLibrary(agent)
+        runs = count if name == 'demo' else count // 10
+        started = time.perf_counter()
+        for i in range(runs):
+            nlu.extract(utterances[i & 255])
+        _report('extract exact %s' % name, runs, time.perf_counter() - started)
+        started = time.perf_counter()
+        for i in range(runs):
+            nlu.extract(utterances[i & 255], fuzzy=True)
+        _report('extract fuzzy %s' % name, runs, time.perf_counter() - started)
+
+
+INTENT_PHRASES = {
+    'callback': ['перезвоните позже', 'наберите мне вечером', 'сейчас неудобно говорить', 'позвоните завтра'],
+    'operator': ['соедините с оператором', 'хочу поговорить с человеком', 'позовите специалиста',
+                 'переключите на сотрудника'],
+    'complaint': ['у вас ужасный сервис', 'буду жаловаться', 'опять ничего не работает', 'верните деньги'],
+    'wrong_person': ['вы ошиблись номером', 'это не я', 'такой здесь не живет', 'номер принадлежит другому'],
+    '': ['да', 'слушаю', 'алло', 'я дома', 'понятно', 'а сколько стоит', 'ну хорошо'],
+}
+
+
+def _intent_dataset(rnd, size):
+    texts, labels = [], []
+    prefixes = ['', 'ну ', 'девушка ', 'слушайте ', 'это самое ']
+    for _ in range(size):
+        intent = rnd.choice(list(INTENT_PHRASES))
+        words = rnd.choice(INTENT_PHRASES[intent]).split()
+        words = [_misspell(rnd, word) if len(word) > 3 and rnd.random() < 0.3 else word for word in words]
+        texts.append(rnd.choice(prefixes) + ' '.join(words))
+        labels.append(intent or None)
+    return texts, labels
+
+
+def bench_intents(count=20000):
+    """ Локальный классификатор интентов: обучение, качество, predict и extract на фразу, пакетная оценка """
+    try:
+        from .classifier import IntentClassifier
+    except ImportError:
+        print('intents: numpy is not installed, skipped')
+        return
+    rnd = random.Random(7)
+    train_texts, train_labels = _intent_dataset(rnd, 4000)
+    test_texts, test_labels = _intent_dataset(rnd, 1000)
+    started = time.perf_counter()
+    classifier = IntentClassifier.train(train_texts, train_labels)
+    _report('intents train', len(train_texts), time.perf_counter() - started, 'text')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'intents')
+        classifier.save(path)
+        classifier = IntentClassifier.load(path)
+        report = classifier.evaluate(test_texts, test_labels)
+        print('%-32s accuracy %.3f, %s' % ('intents evaluate', report['accuracy'], ', '.join(
+            '%s %.2f/%.2f' % (intent, stats['precision'], stats['recall'])
+            for intent, stats in sorted(report['intents'].items()))))
+        started = time.perf_counter()
+        for i in range(count):
+            classifier.predict(test_texts[i % 1000])
+        _report('intents predict', count, time.perf_counter() - started)
+        started = time.perf_counter()
+        for start in range(0, count, 1000):
+            classifier.predict_many(test_texts)
+        _report('intents predict_many', count, time.perf_counter() - started)
+        for name, agent in (('patterns', Agent(intents={'operator': ['оператор']})),
+                            ('classifier', Agent(intents={'operator': ['оператор']}, intent_model=path))):
+            nlu = LocalNeuroNluLibrary(agent)
+            started = time.perf_counter()
+            for i in range(count):
+                nlu.extract(test_texts[i % 1000])
+            _report('extract %s' % name, count, time.perf_counter() - started)
+
+
+def _synthetic_typos(rnd, entity_count):
+    agent, words = _synthetic_agent(entity_count)
+    return agent, [' '.join(_misspell(rnd, rnd.choice(words)) for _ in range(6)) for _ in range(256)]
+
+
+def bench_scope(count=20000):
+    """ nlu.extract с областью поиска из nv.listen: кэш матчеров против пересборки на каждом ходу """
+    agent, words = _synthetic_agent(200)
+    scopes = [['entity_%d' % i for i in range(start, start + 6)] for start in range(0, 60, 6)]
+    utterances = [' '.join(random.Random(i).choice(words) for _ in range(6)) for i in range(64)]
+    nlu = LocalNeuroNluLibrary(agent)
+    started = time.perf_counter()
+    for i in range(count // 20):
+        nlu._matchers.clear()
+        nlu.extract(utterances[i & 63], entities=scopes[i % len(scopes)])
+    _report('extract scope, no cache', count // 20, time.perf_counter() - started)
+    nlu._matchers.clear()
+    started = time.perf_counter()
+    for i in range(count):
+        nlu.extract(utterances[i & 63], entities=scopes[i % len(scopes)])
+    _report('extract scope, cached', count, time.perf_counter() - started)
+    print('%-32s %s' % ('', nlu.matcher_cache_info()))
+
+
+def bench_stream(count=50):
+    """ Поиск по частичным гипотезам длинной реплики: extract на каждой гипотезе против потокового поиска """
+    nlu = LocalNeuroNluLibrary(DEMO_AGENT)
+    scope = ['operator', 'repeat', 'robot', 'confirm']
+    for words in (20, 100, 400):
+        rnd = random.Random(words)
+        filler = ['ну', 'вот', 'значит', 'у', 'меня', 'такая', 'ситуация', 'сложилась', 'с', 'вами']
+        utterance = ' '.join(rnd.choice(filler) for _ in range(words)) + ' позовите оператора'
+        tokens = utterance.split()
+        hypotheses = [' '.join(tokens[:i]) for i in range(1, len(tokens) + 1)]
+        started = time.perf_counter()
+        for _ in range(count):
+            for hypothesis in hypotheses:
+                if nlu.extract(hypothesis, entities=scope).has_entity('operator'):
+                    break
+        _report('partials extract %d words' % words, count, time.perf_counter() - started, 'utt')
+        started = time.perf_counter()
+        for _ in range(count):
+            stream = nlu.stream(entities=scope)
+            for i, hypothesis in enumerate(hypotheses):
+                if 'operator' in stream.feed(hypothesis, final=i == len(hypotheses) - 1)[0]:
+                    break
+            else:
+                raise AssertionError('operator not detected')
+        _report('partials stream %d words' % words, count, time.perf_counter() - started, 'utt')
+
+
+def bench_normalize(count=20000):
+    """ Нормализация реплики с 300 исключениями и числительными: правило за правилом против Normalizer """
+    rnd = random.Random(11)
+    agent, words = _synthetic_agent(100)
+    exceptions = {word: words[300 + i % 100] for i, word in enumerate(words[:300])}
+    numbers = ['двадцать', 'пять', 'сто', 'три', 'тысячи', 'сорок']
+    utterances = [' '.join(rnd.choice(words if rnd.random() < 0.7 else numbers) for _ in range(10)).upper()
+                  for _ in range(256)]
+    rules = [(re.compile(r'\b%s\b' % re.escape(key)), value) for key, value in exceptions.items()]
+    number = re.compile(r'\b(?:%s)(?: (?:%s))*\b' % ('|'.join(numbers), '|'.join(numbers)))
+    normalizer = Normalizer(exceptions, number_words=True)
+
+    def rule_by_rule(text):
+        text = ' '.join(text.lower().replace('ё', 'е').split())
+        for pattern, value in rules:
+            text = pattern.sub(value, text)
+        return number.sub(lambda match: ' '.join(map(str, parse_number_words(match.group().split()))), text)
+
+    for text in utterances:
+        assert rule_by_rule(text) == normalizer.normalize(text), text
+    started = time.perf_counter()
+    for i in range(count // 10):
+        rule_by_rule(utterances[i & 255])
+    _report('normalize rule by rule', count // 10, time.perf_counter() - started)
+    started = time.perf_counter()
+    for i in range(count):
+        normalizer.normalize(utterances[i & 255])
+    _report('normalize compiled', count, time.perf_counter() - started)
+    nlu = LocalNeuroNluLibrary(Agent(entities=agent.entities, exceptions=exceptions, number_words=True))
+    started = time.perf_counter()
+    for i in range(count // 20):
+        stream = nlu.stream()
+        text = utterances[i & 255]
+        for end in range(1, len(text) + 1):
+            stream.feed(text[:end], final=end == len(text))
+    _report('stream per character', count // 20, time.perf_counter() - started, 'utt')
+
+
+class _DictResult:
+    """ Прежнее представление результата: атрибуты в __dict__, сущности и интенты в словарях """
+
+    def __init__(self, utterance, entities, intents):
+        self._utterance = utterance
+        self._entities = dict(entities) if entities else {}
+        self._intents = dict(intents) if intents else {}
+
+    def dump_json(self):
+        return json.dumps({'utterance': self._utterance, 'entities': dict(self._entities),
+                           'intents': dict(self._intents)}, ensure_ascii=False)
+
+
+def _allocated(factory, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def bench_result(count=200000):
+    """ Результат распознавания: память на объект и скорость dump_json, __dict__ со словарями против __slots__ """
+    samples = [('да', {}, {}), ('соедините с оператором', {'operator': 'true'}, {}),
+               ('нет не надо мне перезвоните', {'confirm': 'false', 'callback': 'true'}, {'callback': 'true'})]
+    for utterance, entities, intents in samples:
+        assert LocalNeuroNluRecognitionResult(utterance, entities, intents).dump_json() == \
+            _DictResult(utterance, entities, intents).dump_json()
+    for utterance, entities, intents in samples:
+        label = '%d entities' % len(entities)
+        for name, cls in (('dict', _DictResult), ('slots', LocalNeuroNluRecognitionResult)):
+            size = _allocated(lambda i: cls(utterance, entities, intents), 10000)
+            print('%-32s %8.0f bytes/object' % ('result %s %s' % (name, label), size))
+    for name, cls in (('dict', _DictResult), ('slots', LocalNeuroNluRecognitionResult)):
+        results = [cls(*sample) for sample in samples]
+        started = time.perf_counter()
+        for i in range(count):
+            results[i % 3].dump_json()
+        _report('dump_json %s' % name, count, time.perf_counter() - started)
+
+
+class _PremergedDefaults:
+    """ Настройки nv.set_default в виде готовых слоев: повтор той же конфигурации не меняет слой,
+    наложение kwargs в listen кэшируется. Вариант, отклоненный по замерам bench settings: nv хранит словари
+    """
+
+    def __init__(self):
+        self.sections = {}
+        self._merged = {}
+
+    def set_default(self, section, values):
+        current = self.sections.get(section)
+        if current is not None and all(current.get(key, current) is value for key, value in values.items()):
+            return
+        layer = dict(current or {})
+        layer.update(values)
+        self.sections[section] = layer
+        self._merged.clear()
+
+    def listen_options(self, kwargs):
+        defaults = self.sections.get('listen', {})
+        if not kwargs:
+            return defaults
+        # тип в ключе: 1, True и 1.0 – разные настройки
+        key = tuple((name, type(value), value) for name, value in kwargs.items())
+        merged = self._merged.get(key)
+        if merged is None:
+            merged = self._merged[key] = {**defaults, **kwargs}
+        return merged
+
+
+def bench_settings(count=500000):
+    """ nv.set_default('listen', {...}) перед каждым nv.listen и сборка настроек listen: словари nv
+    против готовых слоев _PremergedDefaults
+    """
+    values = {'no_input_timeout': 6000, 'recognition_timeout': 60000, 'speech_complete_timeout': 2500,
+              'asr_complete_timeout': 6000}
+    nv = LocalNeuroVoiceLibrary(LocalNeuroNluLibrary(DEMO_AGENT))
+    premerged = _PremergedDefaults()
+    started = time.perf_counter()
+    for _ in range(count):
+        nv.set_default('listen', values)
+    _report('set_default nv dict', count, time.perf_counter() - started)
+    started = time.perf_counter()
+    for _ in range(count):
+        premerged.set_default('listen', values)
+    _report('set_default premerged', count, time.perf_counter() - started)
+    for label, kwargs in (('no kwargs', {}), ('kwargs', {'no_input_timeout': 4000})):
+        started = time.perf_counter()
+        for _ in range(count):
+            options = nv.get_default('listen')
+            options.update(kwargs)
+        _report('listen %s nv dict' % label, count, time.perf_counter() - started)
+        started = time.perf_counter()
+        for _ in range(count):
+            premerged.listen_options(kwargs)
+        _report('listen %s premerged' % label, count, time.perf_counter() - started)
+        assert premerged.listen_options(kwargs) == options
+    nv.reset([None] * count)
+    started = time.perf_counter()
+    for _ in range(count):
+        nv.set_default('listen', values)
+        with nv.listen():
+            pass
+    _report('set_default + nv.listen', count, time.perf_counter() - started)
+
+
+def bench_batch(count=200000):
+    """ nlu.extract_many: один процесс против пула процессов """
+    agent, words = _synthetic_agent(300)
+    nlu = LocalNeuroNluLibrary(agent)
+    rnd = random.Random(2)
+    utterances = [' '.join(rnd.choice(words) for _ in range(rnd.randint(1, 8))) for _ in range(4096)]
+    source = [utterances[i & 4095] for i in range(count)]
+    for workers in sorted({1, os.cpu_count() or 1, 4}):
+        started = time.perf_counter()
+        for _ in nlu.extract_many(source, workers=workers, chunk_size=1024):
+            pass
+        _report('extract_many workers=%d' % workers, count, time.perf_counter() - started, 'utt')
+
+
+def bench_result_cache(count=200000):
+    """ nlu.extract частых коротких реплик с кэшем результатов и без """
+    utterances = ['да', 'нет', 'алло', 'оператор', 'Да', 'повторите', 'что', 'да да']
+    scope = ['confirm', 'operator', 'repeat', 'robot']
+    for size in (0, 1024):
+        nlu = LocalNeuroNluLibrary(DEMO_AGENT, result_cache_size=size)
+        started = time.perf_counter()
+        for i in range(count):
+            nlu.extract(utterances[i & 7], entities=scope)
+        _report('extract result_cache_size=%d' % size, count, time.perf_counter() - started)
+    print('%-32s %s' % ('', nlu.result_cache_info()))
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def bench_nlu_api(count=2000, threads=16):
+    """ extract(use_neuro_api=True) через NluApiClient и локальную заглушку: p50 / p99 и доля фоллбеков """
+    from concurrent.futures import ThreadPoolExecutor
+
+    reference = LocalNeuroNluLibrary(DEMO_AGENT)
+
+    def handler(payload):
+        r = reference.extract(payload['utterance'], entities=payload.get('entities'))
+        return r._entities, r._intents
+
+    utterances = ['да', 'нет', 'оператор', 'у меня не работает интернет', 'повторите', 'алло']
+    with NluApiStubServer(handler, latency=random_latency(0.003, tail=0.05, tail_share=0.02)) as server:
+        for timeout in (1.0, 0.02):
+            client = NluApiClient(*server.address, timeout=timeout, pool_size=threads)
+            nlu = LocalNeuroNluLibrary(DEMO_AGENT, neuro_api=client)
+
+            def call(i):
+                started = time.perf_counter()
+                nlu.extract(utterances[i % len(utterances)], entities=['confirm', 'operator'],
+                            context='bench', use_neuro_api=True)
+                return time.perf_counter() - started
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                latencies = list(pool.map(call, range(count)))
+            _report('nlu api deadline=%.0fms' % (timeout * 1000), count, time.perf_counter() - started, 'call')
+            print('%-32s p50 %.2f ms  p99 %.2f ms  fallbacks %d  %s'
+                  % ('', _percentile(latencies, 0.5) * 1000, _percentile(latencies, 0.99) * 1000,
+                     nlu.neuro_api_fallbacks, client.info()))
+            client.close()
+
+
+def bench_gazetteer(count=200000, size=1000000):
+    """ Поиск в справочнике на mmap: построение индекса и скорость lookup """
+    rnd = random.Random(3)
+    alphabet = 'абвгдежзиклмнопрстуфхцчшщыэюя'
+    keys = [''.join(rnd.choice(alphabet) for _ in range(rnd.randint(5, 12))) for _ in range(size)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'names.idx')
+        started = time.perf_counter()
+        build_gazetteer(path, ((key, key.capitalize()) for key in keys))
+        _report('gazetteer build', size, time.perf_counter() - started, 'key')
+        print('%-32s file %.1f MB' % ('', os.path.getsize(path) / 1e6))
+        gazetteer = Gazetteer(path)
+        queries = [keys[rnd.randrange(size)] if i % 2 else keys[rnd.randrange(size)][:-1] for i in range(1024)]
+        started = time.perf_counter()
+        for i in range(count):
+            gazetteer.get(queries[i & 1023], normalized=True)
+        _report('gazetteer lookup', count, time.perf_counter() - started)
+        nlu = LocalNeuroNluLibrary(Agent(gazetteers={'first': path, 'last': path}))
+        started = time.perf_counter()
+        for i in range(count // 10):
+            nlu.extract_person('%s %s' % (queries[i & 1023], queries[(i + 1) & 1023]))
+        _report('extract_person', count // 10, time.perf_counter() - started)
+        gazetteer.close()
+        for opened in nlu.gazetteers.values():
+            opened.close()
+
+
+BENCHMARKS = {
+    'batch': bench_batch,
+    'call_many': bench_call_many,
+    'call_state': bench_call_state,
+    'counters': bench_counters,
+    'dialer': bench_dialer,
+    'dialogs': bench_dialogs,
+    'env': bench_env,
+    'extract': bench_extract,
+    'fuzzy': bench_fuzzy,
+    'gazetteer': bench_gazetteer,
+    'intents': bench_intents,
+    'scheduler': bench_scheduler,
+    'scope': bench_scope,
+    'settings': bench_settings,
+    'sms': bench_sms,
+    'stats': bench_stats,
+    'stream': bench_stream,
+    'match': bench_match,
+    'nlu_api': bench_nlu_api,
+    'normalize': bench_normalize,
+    'profile': bench_profile,
+    'result': bench_result,
+    'result_cache': bench_result_cache,
+    'trampoline': bench_trampoline,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='libneuro.local benchmarks')
+    parser.add_argument('names', nargs='*', help='one of: %s' % ', '.join(sorted(BENCHMARKS)))
+    parser.add_argument('--script', default=DEFAULT_SCRIPT)
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error('unknown benchmarks: %s' % ', '.join(sorted(unknown)))
+    for name in args.names or sorted(BENCHMARKS):
+        benchmark = BENCHMARKS[name]
+        if 'script' in benchmark.__code__.co_varnames:
+            benchmark(script=args.script)
+        else:
+            benchmark()
+
+
+if __name__ == '__main__':
+    main()
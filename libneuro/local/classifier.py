@@ -0,0 +1,198 @@
+import json
+import random
+import sys
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .fuzzy import _numpy
+
+
+class HashingVectorizer:
+    """ Признаки фразы – символьные n-граммы, хэшированные в n_features корзин
+
+    Хэш – zlib.crc32, поэтому номера признаков одинаковы во всех процессах и при обучении
+    и применении модели (встроенный hash() для строк рандомизирован). Фраза дополняется пробелами
+    по краям, чтобы начала и окончания слов давали отдельные n-граммы. Значения признаков –
+    количества n-грамм, нормированные по L2.
+
+    :param n_features: количество корзин, степень двойки
+    :param ngram_range: минимальная и максимальная длина n-граммы
+    """
+
+    def __init__(self, n_features: int = 1 << 18, ngram_range: Tuple[int, int] = (2, 4)):
+        if n_features <= 0 or n_features & (n_features - 1):
+            raise ValueError('n_features must be a power of two')
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+
+    def ngrams(self, text: str) -> List[int]:
+        """ Номера корзин всех n-грамм фразы (с повторами) """
+        text = ' %s ' % text
+        mask = self.n_features - 1
+        low, high = self.ngram_range
+        crc32 = zlib.crc32
+        return [crc32(text[i:i + size].encode('utf-8')) & mask
+                for size in range(low, high + 1)
+                for i in range(len(text) - size + 1)]
+
+    def transform(self, text: str):
+        """ (indices, values) – разреженный вектор фразы """
+        np = _numpy()
+        indices, counts = np.unique(np.array(self.ngrams(text), dtype=np.int64), return_counts=True)
+        values = counts.astype(np.float32)
+        norm = np.sqrt((values * values).sum())
+        return indices, values / norm if norm else values
+
+    def transform_many(self, texts: Iterable[str]):
+        """ Матрица фраз в формате CSR: (indptr, indices, values) """
+        np = _numpy()
+        indptr = [0]
+        indices = []
+        values = []
+        for text in texts:
+            row_indices, row_values = self.transform(text)
+            indices.append(row_indices)
+            values.append(row_values)
+            indptr.append(indptr[-1] + len(row_indices))
+        return (np.array(indptr, dtype=np.int64),
+                np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+                np.concatenate(values) if values else np.zeros(0, dtype=np.float32))
+
+
+class IntentClassifier:
+    """ Линейный классификатор интентов (мультиномиальная логистическая регрессия) поверх HashingVectorizer
+
+    Обучается заранее (train) и сохраняется в два файла: веса path.npy (n_features + 1 строк, последняя –
+    смещения) и описание path.json (метки, параметры векторизатора, порог). При загрузке веса
+    отображаются в память (mmap_mode='r'), поэтому процессы на одной машине делят страницы модели,
+    а предсказание читает только строки n-грамм фразы.
+
+    Метка '' – "нет интента". predict возвращает интент с вероятностью не ниже threshold.
+
+    Пример:
+    classifier = IntentClassifier.train(texts, labels)
+    classifier.save('models/intents')
+    agent = Agent(intent_model='models/intents')
+    """
+
+    def __init__(self, weights, labels: Sequence[str], vectorizer: HashingVectorizer, threshold: float = 0.5):
+        self.weights = weights
+        self.labels = [sys.intern(label) for label in labels]
+        self.vectorizer = vectorizer
+        self.threshold = threshold
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[Optional[str]], n_features: int = 1 << 18,
+              ngram_range: Tuple[int, int] = (2, 4), epochs: int = 10, learning_rate: float = 1.0,
+              batch_size: int = 64, l2: float = 1e-6, threshold: float = 0.5, seed: int = 0
+              ) -> 'IntentClassifier':
+        """ Обучение мини-батчевым градиентным спуском
+
+        :param texts: нормализованные фразы (см. LocalNeuroNluLibrary.normalize)
+        :param labels: интент каждой фразы, None или '' – без интента
+        """
+        np = _numpy()
+        vectorizer = HashingVectorizer(n_features, ngram_range)
+        names = sorted({label or '' for label in labels} | {''})
+        targets = np.array([names.index(label or '') for label in labels], dtype=np.int64)
+        indptr, indices, values = vectorizer.transform_many(texts)
+        weights = np.zeros((n_features + 1, len(names)), dtype=np.float32)
+        order = list(range(len(targets)))
+        rnd = random.Random(seed)
+        for _ in range(epochs):
+            rnd.shuffle(order)
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                rows = [np.arange(indptr[i], indptr[i + 1]) for i in batch]
+                sizes = np.array([len(row) for row in rows])
+                positions = np.concatenate(rows)
+                batch_indices = indices[positions]
+                batch_values = values[positions]
+                owner = np.repeat(np.arange(len(batch)), sizes)
+                logits = np.zeros((len(batch), len(names)), dtype=np.float32)
+                np.add.at(logits, owner, weights[batch_indices] * batch_values[:, None])
+                logits += weights[-1]
+                probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+                probabilities /= probabilities.sum(axis=1, keepdims=True)
+                probabilities[np.arange(len(batch)), targets[batch]] -= 1.0
+                gradient = probabilities * (learning_rate / len(batch))
+                touched = np.unique(batch_indices)
+                weights[touched] *= 1.0 - learning_rate * l2
+                np.add.at(weights, batch_indices, -gradient[owner] * batch_values[:, None])
+                weights[-1] -= gradient.sum(axis=0)
+        return cls(weights, names, vectorizer, threshold)
+
+    def save(self, path: str):
+        """ Записывает path.npy и path.json """
+        np = _numpy()
+        np.save(path + '.npy', np.asarray(self.weights, dtype=np.float32))
+        with open(path + '.json', 'w', encoding='utf-8') as f:
+            json.dump({'labels': self.labels, 'n_features': self.vectorizer.n_features,
+                       'ngram_range': list(self.vectorizer.ngram_range), 'threshold': self.threshold},
+                      f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, threshold: Optional[float] = None) -> 'IntentClassifier':
+        """ Загружает модель из path.npy / path.json, веса отображаются в память """
+        np = _numpy()
+        with open(path + '.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        weights = np.load(path + '.npy', mmap_mode='r')
+        vectorizer = HashingVectorizer(meta['n_features'], meta['ngram_range'])
+        if weights.shape != (vectorizer.n_features + 1, len(meta['labels'])):
+            raise ValueError('%s.npy does not match %s.json' % (path, path))
+        return cls(weights, meta['labels'], vectorizer, meta['threshold'] if threshold is None else threshold)
+
+    def probabilities(self, text: str):
+        """ Вероятности меток (в порядке labels) для одной фразы """
+        np = _numpy()
+        indices, values = self.vectorizer.transform(text)
+        logits = values @ self.weights[indices] + self.weights[-1]
+        exp = np.exp(logits - logits.max())
+        return exp / exp.sum()
+
+    def predict(self, text: str) -> Optional[str]:
+        """ Интент фразы или None """
+        probabilities = self.probabilities(text)
+        best = int(probabilities.argmax())
+        if probabilities[best] < self.threshold or not self.labels[best]:
+            return None
+        return self.labels[best]
+
+    def probabilities_many(self, texts: Sequence[str]):
+        """ Матрица вероятностей (фразы x labels) для пакета фраз """
+        np = _numpy()
+        indptr, indices, values = self.vectorizer.transform_many(texts)
+        owner = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        logits = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        np.add.at(logits, owner, self.weights[indices] * values[:, None])
+        logits += self.weights[-1]
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_many(self, texts: Sequence[str]) -> List[Optional[str]]:
+        """ Интенты пакета фраз (для оценки модели офлайн) """
+        probabilities = self.probabilities_many(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[label] or None) if probabilities[i, label] >= self.threshold else None
+                for i, label in enumerate(best)]
+
+    def evaluate(self, texts: Sequence[str], labels: Sequence[Optional[str]]) -> Dict[str, object]:
+        """ Точность и полнота по каждому интенту на размеченной выборке
+
+        :return: {'accuracy': float, 'intents': {intent: {'precision': float, 'recall': float, 'support': int}}}
+        """
+        predicted = self.predict_many(texts)
+        expected = [label or None for label in labels]
+        report = {}
+        for intent in self.labels:
+            if not intent:
+                continue
+            true_positive = sum(1 for p, e in zip(predicted, expected) if p == e == intent)
+            predicted_count = sum(1 for p in predicted if p == intent)
+            support = sum(1 for e in expected if e == intent)
+            report[intent] = {'precision': true_positive / predicted_count if predicted_count else 0.0,
+                              'recall': true_positive / support if support else 0.0,
+                              'support': support}
+        correct = sum(1 for p, e in zip(predicted, expected) if p == e)
+        return {'accuracy': correct / len(expected) if expected else 0.0, 'intents': report}
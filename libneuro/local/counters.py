@@ -0,0 +1,118 @@
+import threading
+from typing import Dict, Hashable, Optional
+
+
+class CounterEngine:
+    """ Счетчики nn.counter в памяти процесса с отложенным сохранением в backend
+
+    Счетчики хранятся по звонкам (scope – идентификатор звонка, см. LocalNeuroNetLibrary.call_id).
+    add атомарно возвращает текущее значение и затем изменяет его (семантика nn.counter) и не обращается
+    к backend. Измененные счетчики сохраняются одним запросом backend.save({(scope, name): value})
+    фоновым потоком раз в interval секунд и при завершении звонка (end_call), после которого счетчики
+    звонка удаляются из памяти. snapshot – копия всех счетчиков для аналитики.
+    Ошибки backend.save считаются в errors и не останавливают фоновый поток: счетчики из неудачного запроса
+    снова помечаются измененными и сохраняются следующим flush, счетчики завершенного звонка остаются
+    в памяти до успешного сохранения.
+
+    :param backend: объект с методом save(values), например MemoryEnvBackend; None – только память
+    :param interval: период фонового сохранения в секундах, 0 – только flush / end_call
+    """
+
+    def __init__(self, backend=None, interval: float = 1.0):
+        self.backend = backend
+        self.interval = interval
+        self._values = {}  # type: Dict[Hashable, Dict[str, int]]
+        self._dirty = set()
+        self._ended = set()  # завершенные звонки, чьи счетчики не удалось сохранить в end_call
+        self.errors = 0
+        self._lock = threading.Lock()
+        # сохранения идут по очереди, чтобы фоновый flush не перезаписал значения end_call более старыми
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if backend is not None and interval > 0:
+            self._thread = threading.Thread(target=self._run, name='counter-flush', daemon=True)
+            self._thread.start()
+
+    def add(self, scope: Hashable, name: str, delta: int = 0) -> int:
+        """ Значение счетчика до изменения на delta """
+        with self._lock:
+            counters = self._values.get(scope)
+            if counters is None:
+                counters = self._values[scope] = {}
+            value = counters.get(name, 0)
+            if delta:
+                counters[name] = value + delta
+                self._dirty.add(scope)
+            return value
+
+    def get(self, scope: Hashable, name: str) -> int:
+        counters = self._values.get(scope)
+        return counters.get(name, 0) if counters else 0
+
+    def snapshot(self, scope: Optional[Hashable] = None) -> Dict[Hashable, Dict[str, int]]:
+        """ {scope: {name: value}} всех звонков в памяти или одного scope """
+        with self._lock:
+            if scope is not None:
+                return {scope: dict(self._values[scope])} if scope in self._values else {}
+            return {key: dict(counters) for key, counters in self._values.items()}
+
+    def _save(self, values: Dict[tuple, int]) -> Optional[bool]:
+        """ Запрос к backend: True – сохранено, False – нечего сохранять, None – ошибка backend (в errors) """
+        if not values or self.backend is None:
+            return False
+        try:
+            self.backend.save(values)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return None
+        return True
+
+    def flush(self) -> bool:
+        """ Сохраняет измененные счетчики одним запросом, True – если запрос прошел """
+        with self._save_lock:
+            with self._lock:
+                scopes = self._dirty
+                self._dirty = set()
+                values = {(scope, name): value for scope in scopes
+                          for name, value in self._values.get(scope, {}).items()}
+            saved = self._save(values)
+            with self._lock:
+                if saved is None:
+                    self._dirty.update(scopes)
+                    return False
+                for scope in self._ended & scopes:
+                    if scope not in self._dirty:
+                        self._ended.discard(scope)
+                        self._values.pop(scope, None)
+            return saved
+
+    def end_call(self, scope: Hashable) -> bool:
+        """ Сохраняет измененные счетчики звонка и удаляет их из памяти """
+        with self._save_lock:
+            with self._lock:
+                counters = self._values.pop(scope, None)
+                if scope not in self._dirty:
+                    self._ended.discard(scope)
+                    return False
+                self._dirty.discard(scope)
+            saved = self._save({(scope, name): value for name, value in (counters or {}).items()})
+            if saved is None:
+                # сохранит следующий flush, после него счетчики звонка удалятся
+                with self._lock:
+                    self._values.setdefault(scope, counters or {})
+                    self._dirty.add(scope)
+                    self._ended.add(scope)
+            return bool(saved)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def close(self):
+        """ Останавливает фоновое сохранение и сохраняет оставшиеся изменения """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
@@ -0,0 +1,294 @@
+import heapq
+import itertools
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .scheduler import CallScheduler, ScheduledCall
+
+
+class _Window:
+    """ Среднее последних size значений """
+    __slots__ = ('values', 'total', 'initial')
+
+    def __init__(self, size: int, initial: float):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.initial = initial
+
+    def add(self, value: float):
+        values = self.values
+        if len(values) == values.maxlen:
+            self.total -= values[0]
+        values.append(value)
+        self.total += value
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.values) if self.values else self.initial
+
+
+class _Channel:
+    """ Состояние канала: линии, звонки в наборе и в разговоре, оценки и счетчики """
+    __slots__ = ('capacity', 'ringing', 'active', 'answer_rate', 'handle_time', 'ring_time', 'aggression',
+                 'waiting', 'dials', 'answered', 'abandoned', 'failed', 'finished')
+
+    def __init__(self, capacity: int, window: int, answer_rate: float, handle_time: float, ring_time: float):
+        self.capacity = capacity
+        self.ringing = 0
+        self.active = 0
+        self.answer_rate = _Window(window, answer_rate)
+        self.handle_time = _Window(window, handle_time)
+        self.ring_time = _Window(window, ring_time)
+        self.aggression = 1.0
+        self.waiting = []  # type: List[Tuple[int, int, ScheduledCall]]
+        self.dials = 0
+        self.answered = 0
+        self.abandoned = 0
+        self.failed = 0
+        self.finished = 0
+
+
+class PredictiveDialer:
+    """ Темп набора наступивших звонков CallScheduler по каналам (channel из nn.call)
+
+    capacity – сколько разговоров одновременно обслуживает канал. dispatch забирает наступившие звонки
+    из планировщика и возвращает те, которые нужно набрать сейчас; о результате набора сообщают
+    answered, failed и finished. Звонок, дозвонившийся, когда все линии канала заняты, считается
+    брошенным (answered возвращает False – его нужно завершить).
+
+    На каждый канал набирается не меньше, чем свободных линий без учета звонков в наборе (прогрессивный
+    режим, без брошенных звонков), и столько, чтобы ожидаемое количество ответов покрыло свободные линии
+    и линии, которые освободятся за время набора:
+        aggression * (capacity - active + active * ring_time / handle_time) / answer_rate - ringing
+    answer_rate, handle_time (длительность разговора) и ring_time (время до ответа или неудачи) – средние
+    по последним window исходам канала: ответы приходят раньше неудач, поэтому короткое окно после
+    пачки наборов сильно завышает, а потом занижает дозваниваемость. aggression подстраивается
+    по каждому ответу: брошенный звонок уменьшает ее в (1 - backoff) раз, обслуженный – немного
+    увеличивает, так что доля брошенных среди ответивших держится около max_abandon_rate.
+
+    Пример:
+    dialer = PredictiveDialer(scheduler, capacity={'sip-1': 30, 'sip-2': 10})
+    for call in dialer.dispatch():
+        start_call(call)  # потом dialer.answered / dialer.failed / dialer.finished с call.call_id
+
+    :param capacity: линии каждого канала {channel: количество} или одно количество для всех каналов
+    :param default_capacity: линии каналов, которых нет в capacity, в том числе channel=None (по умолчанию в nn.call)
+    :param max_abandon_rate: допустимая доля брошенных среди ответивших
+    :param answer_rate, handle_time, ring_time: начальные оценки, время в секундах
+    :param window: количество последних исходов канала для оценок
+    """
+
+    def __init__(self, scheduler: CallScheduler, capacity: Union[int, Dict[Optional[str], int]] = 30,
+                 default_capacity: int = 30, max_abandon_rate: float = 0.03, answer_rate: float = 0.3,
+                 handle_time: float = 60.0, ring_time: float = 20.0, window: int = 500,
+                 backoff: float = 0.1, min_aggression: float = 0.1, max_aggression: float = 3.0):
+        if not 0 < max_abandon_rate < 1:
+            raise ValueError('max_abandon_rate must be between 0 and 1')
+        # канал без линий никогда не наберет свои звонки – они ждали бы в dispatch бесконечно
+        capacities = [capacity] if isinstance(capacity, int) else list(capacity.values())
+        if default_capacity <= 0 or any(lines <= 0 for lines in capacities):
+            raise ValueError('channel capacity must be positive')
+        self.scheduler = scheduler
+        self.capacity = capacity
+        self.default_capacity = default_capacity
+        self.max_abandon_rate = max_abandon_rate
+        self.answer_rate = answer_rate
+        self.handle_time = handle_time
+        self.ring_time = ring_time
+        self.window = window
+        self.backoff = backoff
+        # рост, при котором aggression в среднем не меняется при доле брошенных max_abandon_rate
+        self.growth = (1 - backoff) ** (-max_abandon_rate / (1 - max_abandon_rate)) - 1
+        self.min_aggression = min_aggression
+        self.max_aggression = max_aggression
+        self._channels = {}  # type: Dict[Optional[str], _Channel]
+        self._calls = {}  # type: Dict[int, Tuple[_Channel, datetime]]
+        self._lock = threading.Lock()
+
+    def _channel(self, name: Optional[str]) -> _Channel:
+        channel = self._channels.get(name)
+        if channel is None:
+            if isinstance(self.capacity, int):
+                capacity = self.capacity
+            else:
+                capacity = self.capacity.get(name, self.default_capacity)
+            channel = self._channels[name] = _Channel(capacity, self.window, self.answer_rate, self.handle_time,
+                                                        self.ring_time)
+        return channel
+
+    @staticmethod
+    def _allowance(channel: _Channel) -> int:
+        """ Сколько звонков канала набрать сейчас """
+        free = channel.capacity - channel.active - channel.ringing
+        releasing = channel.active * min(1.0, channel.ring_time.mean / max(channel.handle_time.mean, 1e-3))
+        expected = channel.capacity - channel.active + releasing
+        predictive = int(channel.aggression * expected / max(channel.answer_rate.mean, 0.01)) - channel.ringing
+        return max(free, predictive, 0)
+
+    def dispatch(self, now: Optional[datetime] = None) -> List[ScheduledCall]:
+        """ Звонки, которые нужно набрать сейчас; остальные наступившие ждут свободных линий своего канала """
+        now = now or datetime.now()
+        with self._lock:
+            for call in self.scheduler.pop_due(now):
+                channel = self._channel(call.payload.get('channel'))
+                heapq.heappush(channel.waiting, (-call.priority, call.call_id, call))
+            dialed = []
+            for channel in self._channels.values():
+                if not channel.waiting:
+                    continue
+                for _ in range(min(self._allowance(channel), len(channel.waiting))):
+                    call = heapq.heappop(channel.waiting)[2]
+                    self._calls[call.call_id] = (channel, now)
+                    channel.ringing += 1
+                    channel.dials += 1
+                    dialed.append(call)
+            return dialed
+
+    @staticmethod
+    def _rang(channel: _Channel, dialed: datetime, now: datetime, answered: bool):
+        channel.ringing -= 1
+        channel.ring_time.add((now - dialed).total_seconds())
+        channel.answer_rate.add(answered)
+
+    def answered(self, call_id: int, now: Optional[datetime] = None) -> bool:
+        """ Абонент ответил; False – свободной линии нет, звонок брошен и его нужно завершить """
+        now = now or datetime.now()
+        with self._lock:
+            channel, dialed = self._calls[call_id]
+            self._rang(channel, dialed, now, True)
+            channel.answered += 1
+            if channel.active >= channel.capacity:
+                del self._calls[call_id]
+                channel.abandoned += 1
+                channel.aggression = max(self.min_aggression, channel.aggression * (1 - self.backoff))
+                return False
+            self._calls[call_id] = (channel, now)
+            channel.active += 1
+            channel.aggression = min(self.max_aggression, channel.aggression * (1 + self.growth))
+            return True
+
+    def failed(self, call_id: int, now: Optional[datetime] = None):
+        """ Набор не удался: нет ответа, занято, ошибка """
+        now = now or datetime.now()
+        with self._lock:
+            channel, dialed = self._calls.pop(call_id)
+            self._rang(channel, dialed, now, False)
+            channel.failed += 1
+
+    def finished(self, call_id: int, now: Optional[datetime] = None):
+        """ Разговор завершен, линия свободна """
+        now = now or datetime.now()
+        with self._lock:
+            channel, answered = self._calls.pop(call_id)
+            channel.active -= 1
+            channel.finished += 1
+            channel.handle_time.add((now - answered).total_seconds())
+
+    def waiting(self) -> int:
+        """ Наступившие звонки, ожидающие линий """
+        return sum(len(channel.waiting) for channel in self._channels.values())
+
+    def in_progress(self) -> int:
+        """ Звонки в наборе и в разговоре """
+        return len(self._calls)
+
+    def stats(self) -> Dict[Optional[str], Dict[str, Any]]:
+        """ {channel: {'capacity', 'ringing', 'active', 'waiting', 'dials', 'answered', 'abandoned', 'failed',
+        'abandon_rate', 'answer_rate', 'handle_time', 'ring_time', 'aggression'}}
+        """
+        with self._lock:
+            return {name: {'capacity': channel.capacity, 'ringing': channel.ringing, 'active': channel.active,
+                           'waiting': len(channel.waiting), 'dials': channel.dials, 'answered': channel.answered,
+                           'abandoned': channel.abandoned, 'failed': channel.failed,
+                           'abandon_rate': channel.abandoned / channel.answered if channel.answered else 0.0,
+                           'answer_rate': channel.answer_rate.mean, 'handle_time': channel.handle_time.mean,
+                           'ring_time': channel.ring_time.mean, 'aggression': channel.aggression}
+                    for name, channel in self._channels.items()}
+
+
+class DialerSimulator:
+    """ Офлайн прогон кампании через PredictiveDialer (или другой объект с тем же интерфейсом)
+    на модели абонентов, без реального времени
+
+    Набранный абонент отвечает с вероятностью answer_rate через экспоненциальное время со средним
+    ring_time (но не позже no_answer_timeout), иначе набор завершается неудачей через no_answer_timeout;
+    разговор длится экспоненциальное время со средним handle_time. answer_rate может быть функцией
+    от секунд с начала кампании – так проверяется подстройка под меняющуюся дозваниваемость.
+    dispatch вызывается каждые step секунд.
+
+    Пример:
+    scheduler = CallScheduler(now=start)
+    scheduler.add_many((start, None, {'channel': 'sip-1'}) for _ in range(10000))
+    report = DialerSimulator(answer_rate=0.25).run(PredictiveDialer(scheduler, capacity=30), start)
+
+    :param seed: seed генератора случайных чисел, для повторяемых сравнений политик
+    """
+
+    def __init__(self, answer_rate: Union[float, Callable[[float], float]] = 0.3, handle_time: float = 60.0,
+                 ring_time: float = 12.0, no_answer_timeout: float = 30.0, step: float = 1.0, seed: int = 0):
+        self.answer_rate = answer_rate
+        self.handle_time = handle_time
+        self.ring_time = ring_time
+        self.no_answer_timeout = no_answer_timeout
+        self.step = step
+        self.seed = seed
+
+    def run(self, dialer, start: datetime, until: Optional[float] = None) -> Dict[str, Any]:
+        """ Прогон до конца кампании (или until секунд), сводка
+        {'duration', 'dials', 'answered', 'abandoned', 'failed', 'undialed', 'abandon_rate', 'utilization',
+        'connected_per_hour'}
+
+        utilization – доля времени занятости линий (разговоры / (линии * длительность)).
+        Прогон заканчивается и тогда, когда в планировщике ничего не осталось, а ожидающие звонки
+        не набираются при всех свободных линиях (у dialer с собственной политикой набора): они в undialed.
+        """
+        rnd = random.Random(self.seed)
+        events = []  # type: List[Tuple[float, int, str, int]]
+        sequence = itertools.count()
+        answer_rate = self.answer_rate if callable(self.answer_rate) else lambda _: self.answer_rate
+        totals = {'dials': 0, 'answered': 0, 'abandoned': 0, 'failed': 0}
+        busy = 0.0
+        lines = 0
+        elapsed = 0.0
+        while True:
+            now = start + timedelta(seconds=elapsed)
+            while events and events[0][0] <= elapsed:
+                moment, _, kind, call_id = heapq.heappop(events)
+                at = start + timedelta(seconds=moment)
+                if kind == 'answer':
+                    totals['answered'] += 1
+                    if dialer.answered(call_id, at):
+                        duration = rnd.expovariate(1 / self.handle_time)
+                        busy += duration
+                        heapq.heappush(events, (moment + duration, next(sequence), 'finish', call_id))
+                    else:
+                        totals['abandoned'] += 1
+                elif kind == 'fail':
+                    totals['failed'] += 1
+                    dialer.failed(call_id, at)
+                else:
+                    dialer.finished(call_id, at)
+            for call in dialer.dispatch(now):
+                totals['dials'] += 1
+                if rnd.random() < answer_rate(elapsed):
+                    delay = min(rnd.expovariate(1 / self.ring_time), self.no_answer_timeout)
+                    heapq.heappush(events, (elapsed + delay, next(sequence), 'answer', call.call_id))
+                else:
+                    heapq.heappush(events, (elapsed + self.no_answer_timeout, next(sequence), 'fail', call.call_id))
+            # без звонков в наборе и разговоре dispatch больше ничего не наберет из ожидающих
+            if not events and not len(dialer.scheduler):
+                break
+            if until is not None and elapsed >= until:
+                break
+            elapsed += self.step
+        for channel in dialer.stats().values():
+            lines += channel['capacity']
+        # разговоры, начатые до конца прогона, учитываются целиком
+        duration = max(elapsed, max((event[0] for event in events), default=0.0), self.step)
+        return dict(totals, duration=duration, undialed=dialer.waiting(),
+                    abandon_rate=totals['abandoned'] / totals['answered'] if totals['answered'] else 0.0,
+                    utilization=busy / (lines * duration) if lines else 0.0,
+                    connected_per_hour=(totals['answered'] - totals['abandoned']) * 3600 / duration)
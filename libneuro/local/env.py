@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class MemoryEnvBackend:
+    """ Хранилище nn.env звонка, имитирующее удаленный backend: каждый save – один запрос
+
+    Подходит как env_backend для LocalNeuroNetLibrary и как backend CounterEngine,
+    round_trips – количество запросов к backend.
+
+    :param latency: задержка одного запроса в секундах
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.data = {}  # type: Dict[str, Any]
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def save(self, values: Dict[str, Optional[Any]]):
+        """ Записывает values одним запросом, None – удаление ключа """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.round_trips += 1
+            for key, value in values.items():
+                if value is None:
+                    self.data.pop(key, None)
+                else:
+                    self.data[key] = value
+
+
+class WriteBehindEnv:
+    """ nn.env звонка с отложенной записью
+
+    Чтения обслуживаются из локального словаря звонка, записи копятся в pending: несколько записей
+    одного ключа за ход схлопываются в последнюю. flush отправляет все накопленные изменения
+    в backend одним save – nn.flush вызывается на границе хода (перед nv.listen), при завершении
+    звонка и в конце диалога. С write_behind=False каждая запись сразу уходит в backend.
+    """
+
+    __slots__ = ('values', 'pending', 'backend', 'write_behind')
+
+    def __init__(self, backend=None, values: Optional[Dict[str, Any]] = None, write_behind: bool = True):
+        self.values = dict(values or {})
+        self.pending = {}  # type: Dict[str, Optional[Any]]
+        self.backend = backend
+        self.write_behind = write_behind
+
+    def update(self, values: Dict[str, Optional[Any]]):
+        for key, value in values.items():
+            if value is None:
+                self.values.pop(key, None)
+            else:
+                self.values[key] = value
+        if self.backend is None:
+            return
+        self.pending.update(values)
+        if not self.write_behind:
+            self.flush()
+
+    def flush(self) -> bool:
+        """ Отправляет накопленные изменения в backend, True – если был запрос """
+        if not self.pending:
+            return False
+        pending, self.pending = self.pending, {}
+        self.backend.save(pending)
+        return True
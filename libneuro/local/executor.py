@@ -0,0 +1,116 @@
+from typing import Any, Dict, Iterable, Optional
+
+from ..net import NeuroNetLibrary
+from ..nlu import NeuroNluLibrary
+from ..voice import InvalidCallStateError, NeuroVoiceLibrary
+from .agent import Agent
+from .counters import CounterEngine
+from .net import LocalNeuroNetLibrary
+from .nlu import LocalNeuroNluLibrary
+from .profiler import Profiler, interface_methods
+from .scheduler import CallScheduler
+from .sms import SmsDispatcher
+from .stats import StatsBuffer
+from .voice import LocalNeuroVoiceLibrary, check_call_state
+
+
+class ScriptExecutor:
+    """ Исполнение скрипта логики (например task_logic.py) в памяти процесса
+
+    Скрипт компилируется и загружается один раз, объекты nn, nv, nlu переиспользуются между диалогами.
+    Один экземпляр рассчитан на последовательное исполнение диалогов в одном потоке.
+
+    С trampoline=True юниты исполняются в цикле: юнит может вернуть следующий юнит (функцию без аргументов)
+    или Transition, а хвостовые вызовы (`return unit()`) декорированных функций сами превращаются в Transition.
+    Глубина стека не зависит от количества ходов в звонке.
+
+    С profiler время юнитов и методов nn, nv, nlu пишется в Profiler (см. Profiler).
+    С env_backend изменения nn.env уходят в него одним запросом за ход, с counters nn.counter работает
+    через общий CounterEngine, с stats_buffer записи nn.log / nn.dump пишутся пакетами
+    через StatsBuffer, с scheduler звонки nn.call ставятся в CallScheduler, с sms_dispatcher SMS отправляются
+    пакетами в фоне через SmsDispatcher (см. LocalNeuroNetLibrary).
+
+    Пример:
+    executor = ScriptExecutor.from_file('task_logic.py', agent)
+    dialog = executor.run('hello_main', ['у меня не работает интернет', 'да'], msisdn='79000000000')
+    print(dialog['stats'])
+    """
+
+    def __init__(self, source: str, agent: Optional[Agent] = None, filename: str = '<logic>',
+                 trampoline: bool = False, profiler: Optional[Profiler] = None, env_backend=None,
+                 counters: Optional[CounterEngine] = None, stats_buffer: Optional[StatsBuffer] = None,
+                 scheduler: Optional[CallScheduler] = None, sms_dispatcher: Optional[SmsDispatcher] = None):
+        self.agent = agent or Agent()
+        self.trampoline = trampoline
+        self.profiler = profiler
+        self.nlu = LocalNeuroNluLibrary(self.agent)
+        self.nn = LocalNeuroNetLibrary(self.agent, env_backend=env_backend, counters=counters,
+                                       stats_buffer=stats_buffer, scheduler=scheduler, sms_dispatcher=sms_dispatcher)
+        self.nv = LocalNeuroVoiceLibrary(self.nlu, trampoline=trampoline, profiler=profiler)
+        self.nv.turn_hooks.append(self.nn.flush)
+        self.nv.hangup_hooks.append(self.nn.end_call)
+        if profiler is not None:
+            profiler.instrument(self.nn, 'nn', interface_methods(NeuroNetLibrary))
+            # speech_input_detector сравнивается по ссылке в LocalNeuroVoiceLibrary._detect
+            profiler.instrument(self.nv, 'nv', interface_methods(NeuroVoiceLibrary, exclude=['speech_input_detector']))
+            profiler.instrument(self.nlu, 'nlu', interface_methods(NeuroNluLibrary) + ['recognize'])
+        self.namespace = {
+            '__name__': 'logic',
+            'nn': self.nn,
+            'nv': self.nv,
+            'nlu': self.nlu,
+            'InvalidCallStateError': InvalidCallStateError,
+            'check_call_state': check_call_state,
+        }
+        exec(compile(source, filename, 'exec'), self.namespace)
+
+    @classmethod
+    def from_file(cls, path: str, agent: Optional[Agent] = None, **kwargs) -> 'ScriptExecutor':
+        """ Загружает скрипт из файла, kwargs – параметры конструктора (trampoline, profiler, ...) """
+        with open(path, encoding='utf-8') as f:
+            return cls(f.read(), agent, filename=path, **kwargs)
+
+    def execute(self, unit, *args, **kwargs):
+        """ Исполняет юнит, в режиме trampoline – вместе со всеми последующими переходами """
+        result = unit(*args, **kwargs)
+        if not self.trampoline:
+            return result
+        while callable(result):  # Transition тоже callable
+            result = result()
+        return result
+
+    def close(self):
+        """ Дожидается записи буфера статистики (stats_buffer.flush). Общие stats_buffer, counters, scheduler
+        и sms_dispatcher закрывает их владелец
+        """
+        if self.nn.stats_buffer is not None:
+            self.nn.stats_buffer.flush()
+
+    def run(self, entry_point: str, utterances: Iterable[Optional[str]] = (), msisdn: str = '',
+            env: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """ Исполняет один диалог с точки входа entry_point
+
+        :param entry_point: название функции скрипта
+        :param utterances: реплики абонента для каждого nv.listen (None – тишина)
+        :param msisdn: номер абонента
+        :param env: начальные значения nn.env
+        :return dict: итог диалога (dialog, env, stats, calls, sms, transcription, actions, hangup_by)
+        """
+        self.nn.reset(msisdn=msisdn, entry_point=entry_point, env=env)
+        self.nv.reset(utterances)
+        try:
+            self.execute(self.namespace[entry_point])
+        except InvalidCallStateError:
+            pass
+        finally:
+            self.nn.end_call()
+        return {
+            'dialog': dict(self.nn.dialog),
+            'env': self.nn.env(),
+            'stats': self.nn.stats,
+            'calls': self.nn.calls,
+            'sms': self.nn.sms,
+            'transcription': self.nv.transcription,
+            'actions': self.nv.actions,
+            'hangup_by': self.nv.hangup_by,
+        }
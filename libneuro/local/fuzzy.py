@@ -0,0 +1,139 @@
+from typing import Collection, Dict, Iterable, List, Tuple
+
+from .matcher import literal_anchors
+
+Rule = Tuple[str, str, object]  # (name, value, скомпилированный паттерн)
+
+_STEM_PROBE = 'ы'
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - зависит от окружения
+        raise ImportError('numpy is required for fuzzy matching and intent classifier: pip install numpy')
+    return numpy
+
+
+class FuzzyMatcher:
+    """ Нечеткий поиск сущностей по ключевым словам паттернов, устойчивый к ошибкам ASR
+
+    Ключевые слова – литералы паттернов (см. literal_anchors). Каждое слово фразы и каждая
+    последовательность слов (до длины самого длинного ключевого слова) сравнивается со всеми
+    ключевыми словами сразу: расстояние Левенштейна считается в NumPy по строкам матрицы,
+    одна итерация на символ ключевого слова для всех пар (фрагмент, ключевое слово).
+
+    Сходство – 1 - расстояние / длина. Если паттерн не требует конца слова после литерала
+    (основа 'плат' в r'плат[её]ж'), ключевое слово сравнивается с началом фрагмента.
+    Ключевые слова, для которых даже одна ошибка дает сходство ниже threshold, не используются:
+    точное совпадение и так находят паттерны. Основа короче min_stem_length совпадает с началом фрагмента
+    только без ошибок, а с ошибками – только как целое слово: иначе 'работает' через 'работ'
+    находит основу 'робот'.
+
+    :param rules: [(name, value, compiled pattern), ...] в порядке объявления
+    :param threshold: минимальное сходство от 0 до 1
+    """
+
+    # предел размера строк DP в scores (фрагменты x ключевые слова x позиции), int16
+    max_cells = 1 << 18
+    # основы короче – без ошибок
+    min_stem_length = 6
+
+    def __init__(self, rules: Iterable[Rule], threshold: float = 0.75):
+        np = _numpy()
+        self.threshold = threshold
+        self.keywords = []  # type: List[Tuple[str, str, str, bool]]
+        for name, value, pattern in rules:
+            for anchor in literal_anchors(pattern.pattern) or ():
+                anchor = anchor.strip()
+                if not anchor or 1.0 - 1.0 / len(anchor) < threshold:
+                    continue
+                whole = pattern.search(anchor) is not None and pattern.search(anchor + _STEM_PROBE) is None
+                self.keywords.append((name, value, anchor, whole))
+        self.max_words = max((keyword[2].count(' ') + 1 for keyword in self.keywords), default=0)
+        # в матрицах ключевые слова упорядочены по длине: на i-м шаге DP считаются только слова длиннее i
+        order = sorted(range(len(self.keywords)), key=lambda keyword_id: len(self.keywords[keyword_id][2]))
+        lengths = [len(self.keywords[keyword_id][2]) for keyword_id in order]
+        self._codes = np.full((len(order), lengths[-1] if lengths else 0), -1, dtype=np.int32)
+        for row, keyword_id in enumerate(order):
+            self._codes[row, :lengths[row]] = [ord(char) for char in self.keywords[keyword_id][2]]
+        self._lengths = np.array(lengths, dtype=np.int16)
+        self._whole = np.array([self.keywords[keyword_id][3] for keyword_id in order], dtype=bool)
+        self._short = ~self._whole & (self._lengths < self.min_stem_length)
+        self._starts = np.searchsorted(self._lengths, np.arange(1, self._codes.shape[1] + 1))
+        self._declared = np.argsort(order)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def spans(self, text: str) -> List[str]:
+        """ Слова фразы и их последовательности длиной до max_words """
+        words = text.split()
+        return [' '.join(words[i:i + size])
+                for size in range(1, self.max_words + 1)
+                for i in range(len(words) - size + 1)]
+
+    def scores(self, spans: List[str]):
+        """ Матрица сходства (фрагменты x ключевые слова в порядке объявления)
+
+        Ключевые слова обрабатываются порциями, чтобы строки DP занимали не больше max_cells ячеек.
+        """
+        np = _numpy()
+        width = max(len(span) for span in spans)
+        codes = np.full((len(spans), width), -2, dtype=np.int32)
+        for i, span in enumerate(spans):
+            codes[i, :len(span)] = [ord(char) for char in span]
+        lengths = np.array([len(span) for span in spans], dtype=np.int16)
+        columns = np.arange(width + 1, dtype=np.int16)
+        outside = columns[None, None, :] > lengths[:, None, None]
+        rows = np.arange(len(spans))
+        count = len(self.keywords)
+        chunk = max(1, self.max_cells // (len(spans) * (width + 1)))
+        similarity = np.empty((len(spans), count))
+        for low in range(0, count, chunk):
+            high = min(low + chunk, count)
+            # строка DP для всех пар сразу: [фрагмент, ключевое слово, позиция во фрагменте]
+            row = np.broadcast_to(columns, (len(spans), high - low, width + 1)).copy()
+            for i in range(int(self._lengths[high - 1])):
+                # слова короче i + 1 уже досчитаны, их строки DP остаются последними
+                start = max(int(self._starts[i]) - low, 0)
+                current = row[:, start:]
+                mismatch = codes[:, None, :] != self._codes[None, low + start:high, i, None]
+                step = np.empty_like(current)
+                step[..., 0] = i + 1
+                np.minimum(current[..., 1:] + 1, current[..., :-1] + mismatch, out=step[..., 1:])
+                # вставки: D[j] = min(step[j], D[j - 1] + 1) = j + cummin(step - j)
+                step -= columns
+                np.minimum.accumulate(step, axis=2, out=current)
+                current += columns
+            whole = row[rows, :, lengths]
+            # для основ – лучшее совпадение с началом фрагмента, позиции за концом фрагмента не считаются
+            prefix = np.where(outside, np.iinfo(row.dtype).max, row).min(axis=2)
+            keyword_whole = self._whole[None, low:high]
+            keyword_lengths = self._lengths[None, low:high]
+            # короткие основы: точное начало фрагмента или целое слово с ошибками
+            as_whole = keyword_whole | (self._short[None, low:high] & (prefix > 0))
+            distance = np.where(as_whole, whole, prefix)
+            norm = np.where(as_whole, np.maximum(lengths[:, None], keyword_lengths), keyword_lengths)
+            similarity[:, low:high] = 1.0 - distance / norm
+        return similarity[:, self._declared]
+
+    def match(self, text: str, skip: Collection[str] = ()) -> Dict[str, str]:
+        """ {name: value} по ключевым словам со сходством не ниже threshold, для каждого имени – лучшее """
+        if not self.keywords:
+            return {}
+        spans = self.spans(text)
+        if not spans:
+            return {}
+        best = self.scores(spans).max(axis=0)
+        found = {}
+        found_score = {}
+        for keyword_id in _numpy().flatnonzero(best >= self.threshold):
+            name, value = self.keywords[keyword_id][:2]
+            if name in skip:
+                continue
+            score = best[keyword_id]
+            if score > found_score.get(name, 0.0):
+                found[name] = value
+                found_score[name] = score
+        return found
@@ -0,0 +1,113 @@
+import mmap
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .normalizer import Normalizer
+
+MAGIC = b'LNGAZ001'
+_HEADER = struct.Struct('<8sII')  # magic, количество записей, максимальное количество слов в ключе
+
+
+def build_gazetteer(path: str, entries: Iterable[Tuple[str, str]]) -> int:
+    """ Записывает индекс справочника (города, улицы, имена) в файл для Gazetteer
+
+    Формат: заголовок, массив смещений uint32 (count + 1) и записи "ключ\\tзначение" в UTF-8,
+    отсортированные по байтам ключа. Ключи нормализуются (Normalizer.basic: нижний регистр, ё -> е),
+    при повторе нормализованного ключа остается первое значение.
+
+    :param entries: пары (ключ, каноническое значение), например ('нижний новгород', 'Нижний Новгород')
+    :return: количество записей
+    """
+    records = {}
+    max_words = 0
+    for key, value in entries:
+        key = Normalizer.basic(key)
+        encoded = key.encode('utf-8')
+        if not key or encoded in records:
+            continue
+        records[encoded] = value.encode('utf-8')
+        max_words = max(max_words, key.count(' ') + 1)
+    keys = sorted(records)
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(key) + 1 + len(records[key]))
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(keys), max_words))
+        f.write(struct.pack('<%dI' % len(offsets), *offsets))
+        for key in keys:
+            f.write(key + b'\t' + records[key])
+    return len(keys)
+
+
+class Gazetteer:
+    """ Справочник только для чтения поверх mmap файла из build_gazetteer
+
+    Файл отображается в память, поэтому процессы-воркеры на одной машине делят одни и те же страницы
+    page cache, а не держат по копии словаря. Поиск – бинарный по отсортированному массиву, O(log n).
+
+    :param path: путь к файлу индекса
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.max_words = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not a gazetteer index' % path)
+        start = _HEADER.size
+        self._offsets = memoryview(self._mmap)[start:start + (self.count + 1) * 4].cast('I')
+        self._data = start + (self.count + 1) * 4
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, index: int) -> bytes:
+        return self._mmap[self._data + self._offsets[index]:self._data + self._offsets[index + 1]]
+
+    def _key(self, index: int) -> bytes:
+        start = self._data + self._offsets[index]
+        return self._mmap[start:self._mmap.find(b'\t', start)]
+
+    def get(self, key: str, normalized: bool = False) -> Optional[str]:
+        """ Каноническое значение для ключа или None """
+        needle = (key if normalized else Normalizer.basic(key)).encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < needle:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            record = self._record(low)
+            if record.startswith(needle + b'\t'):
+                return record[len(needle) + 1:].decode('utf-8')
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def find(self, words: List[str]) -> List[Tuple[int, int, str]]:
+        """ Самые длинные вхождения ключей в последовательности нормализованных слов: [(start, end, value)] """
+        found = []
+        i = 0
+        while i < len(words):
+            for size in range(min(self.max_words, len(words) - i), 0, -1):
+                value = self.get(' '.join(words[i:i + size]), normalized=True)
+                if value is not None:
+                    found.append((i, i + size, value))
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+    def close(self):
+        self._offsets.release()
+        self._mmap.close()
+
+
+def open_gazetteers(paths: Dict[str, str]) -> Dict[str, Gazetteer]:
+    """ Открывает справочники агента: {'city': path, 'street': path, 'first': path, 'last': path, 'middle': path} """
+    return {kind: Gazetteer(path) for kind, path in paths.items()}
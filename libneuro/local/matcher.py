@@ -0,0 +1,258 @@
+import re
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+Rule = Tuple[str, str, str]  # (name, value, pattern)
+
+_QUANTIFIERS = frozenset('?*{')
+# {m}, {m,}, {m,n}, {,n}: иначе, как и в re, '{' – обычный символ
+_REPEAT = re.compile(r'\{(?:\d+(?:,\d*)?|,\d*)\}')
+_ESCAPED_LITERALS = set('.^$*+?{}[]()|\\/-# \'"<>=!:,&~%@;`')
+
+
+def _is_quantifier(pattern: str, i: int) -> bool:
+    char = pattern[i:i + 1]
+    return char in _QUANTIFIERS and (char != '{' or _REPEAT.match(pattern, i) is not None)
+
+
+def literal_anchors(pattern: str) -> Optional[List[str]]:
+    """ Подстроки, без которых паттерн не может совпасть (по одной на каждую альтернативу верхнего уровня)
+
+    Разбор консервативный: учитываются только литералы вне групп и классов символов.
+    Если для какой-то альтернативы литерал найти не удалось, возвращается None – паттерн проверяется всегда.
+
+    r'\\bда\\b' -> ['да']
+    r'плат[её]ж' -> ['плат']
+    r'нет|не надо' -> ['нет', 'не надо']
+    """
+    if '(?' in pattern:
+        return None
+    alternatives = [[]]  # type: List[List[str]]
+    run = []  # type: List[str]
+    depth = 0
+    i, length = 0, len(pattern)
+
+    def close_run():
+        if run:
+            alternatives[-1].append(''.join(run))
+            del run[:]
+
+    while i < length:
+        char = pattern[i]
+        if char == '\\':
+            escaped = pattern[i + 1:i + 2]
+            i += 2
+            if depth == 0 and escaped in _ESCAPED_LITERALS:
+                if _is_quantifier(pattern, i):
+                    close_run()
+                else:
+                    run.append(escaped)
+                    if pattern[i:i + 1] == '+':
+                        close_run()
+            else:
+                close_run()
+            continue
+        if char == '[':
+            close_run()
+            i += 1
+            if pattern[i:i + 1] == '^':
+                i += 1
+            if pattern[i:i + 1] == ']':
+                i += 1
+            while i < length and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+            continue
+        i += 1
+        if char == '(':
+            close_run()
+            depth += 1
+        elif char == ')':
+            close_run()
+            depth -= 1
+        elif depth:
+            continue
+        elif char == '|':
+            close_run()
+            alternatives.append([])
+        elif char in '.^$+':
+            close_run()
+        elif _is_quantifier(pattern, i - 1):
+            if run:
+                run.pop()
+            close_run()
+            if char == '{':
+                i = _REPEAT.match(pattern, i - 1).end()
+        else:
+            run.append(char)
+            if pattern[i:i + 1] == '+':
+                close_run()
+    close_run()
+    anchors = []
+    for runs in alternatives:
+        if not runs:
+            return None
+        anchors.append(max(runs, key=len))
+    return anchors
+
+
+class AhoCorasick:
+    """ Автомат Ахо-Корасик: за один проход по тексту находит все вхождения всех ключей (в том числе перекрывающиеся) """
+
+    def __init__(self, keys: Iterable[Tuple[str, object]]):
+        self._goto = [{}]  # type: List[Dict[str, int]]
+        self._fail = [0]
+        self._out = [()]  # type: List[tuple]
+        for key, payload in keys:
+            node = 0
+            for char in key:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = next_node
+            self._out[node] += (payload,)
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                state = self._fail[node]
+                while state and char not in self._goto[state]:
+                    state = self._fail[state]
+                fail = self._goto[state].get(char, 0)
+                self._fail[child] = fail if fail != child else 0
+                self._out[child] += self._out[self._fail[child]]
+
+    def scan(self, text: str, node: int = 0, offset: int = 0) -> Tuple[int, List[Tuple[object, int]]]:
+        """ Потоковый проход: продолжает с состояния node, возвращает новое состояние и [(payload, end), ...]
+
+        :param offset: позиция text в общем потоке, прибавляется к end
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = []
+        for position, char in enumerate(text, offset + 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.extend((payload, position) for payload in out[node])
+        return node, found
+
+    def search(self, text: str) -> set:
+        """ Множество payload всех ключей, встретившихся в text """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class PatternMatcher:
+    """ Мультипаттерновый поиск сущностей / интентов за один проход по строке
+
+    Из каждого паттерна извлекаются обязательные литералы, и все они собираются в один автомат Ахо-Корасик.
+    Проход автомата по строке дает кандидатов, и регулярные выражения проверяются только у них
+    (плюс у паттернов, для которых литерал извлечь не удалось). Стоимость растет с длиной строки
+    и количеством кандидатов, а не с количеством сущностей агента.
+    Результат совпадает с последовательной проверкой паттернов: для каждого имени берется первое
+    по порядку объявления значение, у которого совпал хотя бы один паттерн.
+
+    :param rules: [(name, value, pattern), ...] в порядке объявления
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = [(name, value, re.compile(pattern)) for name, value, pattern in rules]
+        anchored = []
+        self.unanchored = []
+        for rule_id, (name, value, pattern) in enumerate(self.rules):
+            anchors = literal_anchors(pattern.pattern)
+            if anchors is None:
+                self.unanchored.append(rule_id)
+            else:
+                anchored.extend((anchor, rule_id) for anchor in anchors)
+        self.max_anchor = max((len(anchor) for anchor, _ in anchored), default=0)
+        self.automaton = AhoCorasick(anchored)
+
+    def candidates(self, text: str) -> List[int]:
+        """ Номера правил, которые могут совпасть с text, в порядке объявления """
+        found = self.automaton.search(text)
+        found.update(self.unanchored)
+        return sorted(found)
+
+    def match(self, text: str, check: Optional[Callable[[str], bool]] = None,
+              skip: Collection[str] = ()) -> Dict[str, str]:
+        """ {name: value} для совпавших правил
+
+        :param check: фильтр имен (область поиска), None – все имена
+        :param skip: имена, которые уже найдены другим способом
+        """
+        rules = self.rules
+        found = {}
+        for rule_id in self.candidates(text):
+            name, value, pattern = rules[rule_id]
+            if name in found or name in skip or (check is not None and not check(name)):
+                continue
+            if pattern.search(text):
+                found[name] = value
+        return found
+
+
+class StreamingMatch:
+    """ Потоковый поиск по растущей строке (частичные гипотезы ASR)
+
+    Состояние автомата сохраняется между вызовами, поэтому каждый символ проходит автомат один раз.
+    Регулярные выражения кандидатов проверяются только в окне вокруг нового текста:
+    от (конец литерала - max_anchor - lookbehind) до конца стабильной части строки.
+    Совпадения длиннее окна в потоке могут быть не найдены, итоговое распознавание этим не ограничено.
+
+    :param matcher: PatternMatcher области поиска
+    :param lookbehind: сколько символов перед литералом может занимать паттерн
+    """
+
+    def __init__(self, matcher: PatternMatcher, lookbehind: int = 64):
+        self.matcher = matcher
+        self.window = matcher.max_anchor + lookbehind
+        self.found = {}  # type: Dict[str, str]
+        self._node = 0
+        self._scanned = 0
+        self._stable = 0
+        self._pending = {}  # type: Dict[int, int]  # rule_id -> начало окна проверки
+
+    def update(self, text: str, stable: int) -> Dict[str, str]:
+        """ Продолжает поиск по text, который начинается с ранее переданной строки
+
+        :param stable: длина стабильной части text (последнее слово гипотезы еще может измениться)
+        :return: все найденные к этому моменту {name: value}
+        """
+        matcher = self.matcher
+        self._node, hits = matcher.automaton.scan(text[self._scanned:], self._node, self._scanned)
+        self._scanned = len(text)
+        pending = self._pending
+        for rule_id, end in hits:
+            if rule_id not in pending:
+                pending[rule_id] = max(0, end - self.window)
+        if stable <= self._stable:
+            return self.found
+        start = max(0, self._stable - self.window)
+        for rule_id in matcher.unanchored:
+            pending.setdefault(rule_id, start)
+        rules, found = matcher.rules, self.found
+        for rule_id in sorted(pending):
+            name, value, pattern = rules[rule_id]
+            if name in found:
+                del pending[rule_id]
+                continue
+            if pattern.search(text, max(pending[rule_id], start), stable):
+                found[name] = value
+                del pending[rule_id]
+            else:
+                pending[rule_id] = max(pending[rule_id], start)
+        self._stable = stable
+        return found
@@ -0,0 +1,359 @@
+import itertools
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+from uuid import UUID
+
+from ..net import DialogAttributes, NeuroNetLibrary
+from .agent import Agent
+from .counters import CounterEngine
+from .env import WriteBehindEnv
+from .scheduler import CallScheduler
+from .sms import SmsDispatcher
+from .stats import StatsBuffer
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_CALL_IDS = itertools.count(1)
+
+# аргументы nn.call по порядку
+CALL_FIELDS = ('msisdn', 'date', 'channel', 'script', 'entry_point', 'transport', 'on_success_call', 'on_failed_call',
+               'use_default_prefix', 'proto_additional', 'priority')
+_CALL_FIELD_SET = frozenset(CALL_FIELDS)
+_DATE_CACHE_LIMIT = 4096
+_SMS_CHUNK_SIZE = 1000  # сообщений nn.send_sms_many в одной постановке в очередь
+
+
+def _parse_absolute_date(date: str) -> datetime:
+    # fromisoformat в разы быстрее strptime, но принимает больше форматов – сначала проверяется шаблон
+    if len(date) == 19 and date[4] == date[7] == '-' and date[10] == ' ' and date[13] == date[16] == ':':
+        return datetime.fromisoformat(date)
+    return datetime.strptime(date, DATE_FORMAT)
+
+
+def parse_call_date(date: Union[None, datetime, str], now: Optional[datetime] = None) -> datetime:
+    """ Разбор даты звонка в формате nn.call
+
+    None -> now
+    '2020-05-20 14:20:00' -> абсолютная дата
+    '01:00:00' -> now + 1 час
+    '02:00' -> now + 2 часа
+    """
+    if now is None:
+        now = datetime.now()
+    if date is None:
+        return now
+    if isinstance(date, datetime):
+        return date
+    if not isinstance(date, str):
+        raise ValueError('Invalid call date: %r' % (date,))
+    date = date.strip()
+    if ' ' in date or len(date) > 8:
+        return _parse_absolute_date(date)
+    parts = date.split(':')
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError('Invalid call date: %r' % (date,))
+    hours, minutes, seconds = (int(part) for part in (parts + ['0'])[:3])
+    return now + timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+class LocalDialogAttributes(DialogAttributes):
+    """ Атрибуты диалога с поддержкой nn.dialog['key'] = value """
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+
+class LocalNeuroNetLibrary(NeuroNetLibrary):
+    """ Реализация nn в памяти процесса
+
+    Запланированные звонки копятся в calls, SMS – в sms, записи dialog_stats – в stats
+    в виде кортежей (action, name, data). calls и sms начинаются заново в reset, как и stats.
+
+    Если задан env_backend (например MemoryEnvBackend), изменения nn.env отправляются в него
+    одним запросом за ход (см. WriteBehindEnv и flush), с env_write_behind=False – при каждой записи.
+    Если задан counters, nn.counter работает через общий для звонков CounterEngine, счетчики звонка
+    сохраняются при end_call. Если задан stats_buffer, записи nn.log / nn.dump (call_id, action, name, data)
+    также отправляются в него и пишутся в sink пакетами, при end_call – StatsBuffer.hangup.
+    Если задан scheduler, nn.call / nn.call_many ставят звонки в CallScheduler, а не в список calls.
+    Если задан sms_dispatcher, nn.send_sms / nn.send_sms_many ставят сообщения в его очередь
+    (отправка пакетами в фоне, см. SmsDispatcher), а не в список sms.
+    """
+
+    def __init__(self, agent: Optional[Agent] = None, env_backend=None, env_write_behind: bool = True,
+                 counters: Optional[CounterEngine] = None, stats_buffer: Optional[StatsBuffer] = None,
+                 scheduler: Optional[CallScheduler] = None, sms_dispatcher: Optional[SmsDispatcher] = None):
+        self.agent = agent or Agent()
+        self.env_backend = env_backend
+        self.env_write_behind = env_write_behind
+        self.counters = counters
+        self.stats_buffer = stats_buffer
+        self.scheduler = scheduler
+        self.sms_dispatcher = sms_dispatcher
+        self.calls = []  # type: List[Dict[str, Any]]
+        self.call_inserts = 0
+        self.sms = []  # type: List[Dict[str, str]]
+        self.reset()
+
+    def reset(self, msisdn: str = '', entry_point: str = '', env: Optional[Dict[str, Any]] = None):
+        """ Начало нового диалога """
+        self.call_id = next(_CALL_IDS)
+        self._dialog = LocalDialogAttributes({'msisdn': msisdn, 'params': {'entry_point': entry_point},
+                                              'result': ''})
+        self._env = WriteBehindEnv(self.env_backend, env, self.env_write_behind)
+        self._counters = {}
+        self.stats = []
+        self.calls = []
+        self.sms = []
+
+    @property
+    def dialog(self) -> LocalDialogAttributes:
+        return self._dialog
+
+    @dialog.setter
+    def dialog(self, *args):
+        raise ValueError('Can not change dialog property')
+
+    def env(self, *args, **kwargs):
+        if not args and not kwargs:
+            return dict(self._env.values)
+        if len(args) == 1 and isinstance(args[0], str) and not kwargs:
+            return self._env.values.get(args[0])
+        if len(args) == 1 and isinstance(args[0], dict):
+            values = dict(args[0], **kwargs)
+        elif len(args) == 2:
+            values = {args[0]: args[1]}
+        elif not args:
+            values = kwargs
+        else:
+            raise ValueError('Invalid nn.env arguments: %r, %r' % (args, kwargs))
+        self._env.update(values)
+
+    def flush(self):
+        """ Отправляет отложенные изменения звонка в backend: граница хода, завершение звонка, конец диалога """
+        self._env.flush()
+
+    def end_call(self):
+        """ Завершение диалога: отправка отложенных изменений nn.env, сохранение счетчиков звонка
+        и запись буфера статистики (см. StatsBuffer.hangup)
+        """
+        self.flush()
+        if self.counters is not None:
+            self.counters.end_call(self.call_id)
+        if self.stats_buffer is not None:
+            self.stats_buffer.hangup()
+
+    def _stat(self, action: str, name: Optional[str], data: str):
+        self.stats.append((action, name, data))
+        if self.stats_buffer is not None:
+            self.stats_buffer.put((self.call_id, action, name, data))
+
+    def storage(self, *keys: str):
+        if len(keys) == 1:
+            return self.agent.storage.get(keys[0])
+        return {key: self.agent.storage.get(key) for key in keys}
+
+    def counter(self, name, op=None):
+        if op is None:
+            delta = 0
+        elif op == '+':
+            delta = 1
+        elif op == '-':
+            delta = -1
+        else:
+            raise ValueError('Invalid counter operation: %r' % (op,))
+        if self.counters is not None:
+            return self.counters.add(self.call_id, name, delta)
+        value = self._counters.get(name, 0)
+        if delta:
+            self._counters[name] = value + delta
+        return value
+
+    def has_record(self, name: str, value: Union[str, None] = None) -> bool:
+        if value is None:
+            return name in self.agent.prompts
+        return (name, value) in self.agent.prompts
+
+    def has_records(self, *args, **kwargs):
+        records = []
+        for arg in args:
+            if isinstance(arg, (list, tuple)):
+                records.extend(arg)
+            else:
+                records.append(arg)
+        records.append(kwargs)
+        for record in records:
+            if isinstance(record, dict):
+                for name, values in record.items():
+                    for value in values if isinstance(values, list) else [values]:
+                        if not self.has_record(name, value):
+                            return False
+            elif not self.has_record(record):
+                return False
+        return True
+
+    def call(self, msisdn: str, date: (datetime, str) = None, channel: str = None, script: (str, UUID) = None,
+             entry_point: str = None,
+             transport: str = 'sip', on_success_call: Union[None, str] = None, on_failed_call=None,
+             use_default_prefix=False,
+             proto_additional: dict=None, priority: int=None):
+        self._insert_calls([self._call_record(msisdn, parse_call_date(date), channel, script, entry_point, transport,
+                                              on_success_call, on_failed_call, use_default_prefix,
+                                              proto_additional, priority)])
+
+    @staticmethod
+    def _call_record(msisdn, date, channel, script, entry_point, transport, on_success_call, on_failed_call,
+                     use_default_prefix, proto_additional, priority) -> Dict[str, Any]:
+        return {'msisdn': msisdn, 'date': date, 'channel': channel,
+                'script': script, 'entry_point': entry_point or 'main', 'transport': transport,
+                'on_success_call': on_success_call, 'on_failed_call': on_failed_call,
+                'use_default_prefix': use_default_prefix, 'proto_additional': proto_additional,
+                'priority': priority}
+
+    def _insert_calls(self, calls: List[Dict[str, Any]]):
+        """ Постановка порции звонков в очередь – одна вставка """
+        self.call_inserts += 1
+        if self.scheduler is None:
+            self.calls.extend(calls)
+            return
+        self.scheduler.add_many((call['date'], call['priority'], {key: value for key, value in call.items()
+                                                                  if key != 'date'})
+                                for call in calls)
+
+    def call_many(self, specs, chunk_size: int = 1000, errors: Optional[List[Tuple[int, str]]] = None) -> int:
+        """ Пакетное планирование звонков, см. NeuroNetLibrary.call_many
+
+        Абсолютные даты кампании обычно повторяются, поэтому разобранные даты кэшируются,
+        относительные ('01:00:00') отсчитываются от одного момента на порцию.
+        Значения из CSV (csv.DictReader) приводятся к типам nn.call: пустые строки – None,
+        priority – int, use_default_prefix – bool, proto_additional – JSON.
+        """
+        if chunk_size <= 0:
+            raise ValueError('chunk_size must be positive')
+        scheduled = 0
+        dates = {}  # type: Dict[str, datetime]
+        now = datetime.now()
+        chunk = []
+        for index, spec in enumerate(specs):
+            try:
+                record = self._call_spec(spec, now, dates)
+            except (TypeError, ValueError) as e:
+                if errors is None:
+                    raise ValueError('Invalid call spec #%d: %s' % (index, e)) from e
+                errors.append((index, str(e)))
+                continue
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                self._insert_calls(chunk)
+                scheduled += len(chunk)
+                chunk = []
+                now = datetime.now()
+        if chunk:
+            self._insert_calls(chunk)
+            scheduled += len(chunk)
+        return scheduled
+
+    def _call_spec(self, spec, now: datetime, dates: Dict[str, datetime]) -> Dict[str, Any]:
+        """ Проверенная запись звонка из элемента call_many """
+        if isinstance(spec, dict):
+            fields = spec
+            if not fields.keys() <= _CALL_FIELD_SET:
+                unknown = sorted(str(key) for key in fields.keys() - _CALL_FIELD_SET)
+                raise TypeError('unexpected fields: %s' % ', '.join(unknown))
+        elif isinstance(spec, str):
+            fields = {'msisdn': spec}
+        elif isinstance(spec, (tuple, list)):
+            if len(spec) > len(CALL_FIELDS):
+                raise TypeError('too many call arguments: %d' % len(spec))
+            fields = dict(zip(CALL_FIELDS, spec))
+        else:
+            raise TypeError('expected dict, tuple or str, got %s' % type(spec).__name__)
+        msisdn = fields.get('msisdn')
+        if not isinstance(msisdn, str) or not msisdn.strip():
+            raise ValueError('msisdn is required')
+        date = fields.get('date') or None
+        if isinstance(date, str):
+            parsed = dates.get(date)
+            if parsed is None:
+                parsed = parse_call_date(date, now)
+                stripped = date.strip()
+                if ' ' in stripped or len(stripped) > 8:  # абсолютная дата, не зависит от now
+                    if len(dates) >= _DATE_CACHE_LIMIT:
+                        dates.clear()
+                    dates[date] = parsed
+            date = parsed
+        elif date is None:
+            date = now
+        elif not isinstance(date, datetime):
+            raise ValueError('Invalid call date: %r' % (date,))
+        priority = fields.get('priority')
+        if priority == '':
+            priority = None
+        elif isinstance(priority, str):
+            priority = int(priority)
+        elif priority is not None and not isinstance(priority, int):
+            raise ValueError('Invalid call priority: %r' % (priority,))
+        use_default_prefix = fields.get('use_default_prefix', False)
+        if isinstance(use_default_prefix, str):
+            use_default_prefix = use_default_prefix.strip().lower() in ('1', 'true', 'yes')
+        proto_additional = fields.get('proto_additional') or None
+        if isinstance(proto_additional, str):
+            proto_additional = json.loads(proto_additional)
+        if proto_additional is not None and not isinstance(proto_additional, dict):
+            raise ValueError('Invalid proto_additional: %r' % (proto_additional,))
+        return self._call_record(msisdn, date, fields.get('channel') or None, fields.get('script') or None,
+                                 fields.get('entry_point') or None, fields.get('transport') or 'sip',
+                                 fields.get('on_success_call') or None, fields.get('on_failed_call') or None,
+                                 use_default_prefix, proto_additional, priority)
+
+    def send_sms(self, dest_number: str, text: str, channel: str):
+        if self.sms_dispatcher is None:
+            self.sms.append({'dest_number': dest_number, 'text': text, 'channel': channel})
+        else:
+            self.sms_dispatcher.send(dest_number, text, channel)
+
+    def send_sms_many(self, messages, channel: str = None) -> int:
+        """ Пакетная отправка SMS, см. NeuroNetLibrary.send_sms_many
+
+        Источник читается по мере обработки: сообщения проверяются и ставятся в очередь порциями
+        по _SMS_CHUNK_SIZE (при ошибке сообщения из предыдущих порций уже в очереди).
+        """
+        sent = 0
+        chunk = []
+        for message in messages:
+            if isinstance(message, dict):
+                fields = (message.get('dest_number'), message.get('text'), message.get('channel') or channel)
+            elif isinstance(message, (tuple, list)) and len(message) in (2, 3):
+                fields = (message[0], message[1], message[2] if len(message) == 3 and message[2] else channel)
+            else:
+                raise ValueError('Invalid sms: %r' % (message,))
+            if not fields[0] or fields[1] is None or not fields[2]:
+                raise ValueError('Invalid sms: %r' % (message,))
+            chunk.append(fields)
+            if len(chunk) >= _SMS_CHUNK_SIZE:
+                sent += self._send_sms_chunk(chunk)
+                chunk = []
+        if chunk:
+            sent += self._send_sms_chunk(chunk)
+        return sent
+
+    def _send_sms_chunk(self, chunk: List[Tuple[str, str, str]]) -> int:
+        """ Постановка порции SMS в очередь, возвращает количество поставленных без повторов """
+        if self.sms_dispatcher is None:
+            self.sms.extend({'dest_number': dest_number, 'text': text, 'channel': channel}
+                            for dest_number, text, channel in chunk)
+            return len(chunk)
+        return sum(1 for message_id in self.sms_dispatcher.send_many(chunk) if message_id is not None)
+
+    def log(self, *args):
+        if len(args) == 1:
+            name, data = None, args[0]
+        elif len(args) == 2:
+            name, data = args
+        else:
+            raise ValueError('nn.log takes 1 or 2 arguments')
+        self._stat('nn.log', name, str(data))
+
+    def dump(self):
+        data = {key: self._env.values.get(key) for key in self.agent.output_entities}
+        self._stat('nn.dump', 'output_data', json.dumps(data, ensure_ascii=False, default=str))
@@ -0,0 +1,616 @@
+import json
+import multiprocessing
+import re
+import sys
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from json.encoder import encode_basestring
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from ..nlu import MatchRules, NeuroNluLibrary, NeuroNluRecognitionRequest, NeuroNluRecognitionResult, NoneStrList
+from .agent import Agent
+from .cache import LRUCache, TTLCache
+from .classifier import IntentClassifier
+from .fuzzy import FuzzyMatcher
+from .gazetteer import Gazetteer, open_gazetteers
+from .matcher import PatternMatcher, StreamingMatch
+from .normalizer import Normalizer
+from .nlu_api import NluApiError
+
+NeuroApi = Callable[[str, Optional[str], 'LocalNeuroNluRecognitionRequest'], Tuple[Dict[str, str], Dict[str, str]]]
+
+
+@lru_cache(maxsize=1024)
+def _parse_names(names: Union[str, Tuple[str, ...]]) -> FrozenSet[str]:
+    if isinstance(names, str):
+        names = names.split(',')
+    return frozenset(name.strip() for name in names if name and name.strip())
+
+
+def parse_names(names: NoneStrList) -> Optional[FrozenSet[str]]:
+    """ Приводит список сущностей / интентов к frozenset, результат разбора кэшируется
+
+    'entity1, entity2' -> frozenset({'entity1', 'entity2'})
+    ['entity1', 'entity2'] -> frozenset({'entity1', 'entity2'})
+    None -> None (без ограничений)
+    """
+    if names is None:
+        return None
+    if isinstance(names, frozenset):
+        return names
+    return _parse_names(names if isinstance(names, str) else tuple(names))
+
+
+def scope_key(names: Optional[FrozenSet[str]], names_exclude: Optional[FrozenSet[str]]):
+    """ Нормализованная область поиска: None – все, ('-', names) – все кроме, ('+', names) – только """
+    if names_exclude is not None:
+        return '-', names_exclude
+    if names is None:
+        return None
+    return '+', names
+
+
+class LocalNeuroNluRecognitionRequest(NeuroNluRecognitionRequest):
+    """ Область поиска сущностей и интентов для одного распознавания """
+
+    def __init__(self, entities: NoneStrList = None, intents: NoneStrList = None,
+                 entities_exclude: NoneStrList = None, intents_exclude: NoneStrList = None):
+        self._entities = parse_names(entities)
+        self._intents = parse_names(intents)
+        self._entities_exclude = parse_names(entities_exclude)
+        self._intents_exclude = parse_names(intents_exclude)
+
+    @staticmethod
+    def _check(name, names, names_exclude) -> bool:
+        if names_exclude is not None:
+            return name not in names_exclude
+        return names is None or name in names
+
+    def check_entity(self, entity_name) -> bool:
+        return self._check(entity_name, self._entities, self._entities_exclude)
+
+    def has_entities(self) -> bool:
+        return self._entities_exclude is not None or self._entities is None or bool(self._entities)
+
+    def set_entities(self, entities: (str, list)):
+        self._entities = parse_names(entities)
+
+    def check_intent(self, intent_name) -> bool:
+        return self._check(intent_name, self._intents, self._intents_exclude)
+
+    def has_intents(self) -> bool:
+        return self._intents_exclude is not None or self._intents is None or bool(self._intents)
+
+    def set_intents(self, intents: (str, list)):
+        self._intents = parse_names(intents)
+
+    def dump(self) -> Dict[str, Optional[List[str]]]:
+        """ Область поиска для передачи в Nlu API """
+        return {key: sorted(value) if value is not None else None
+                for key, value in (('entities', self._entities), ('entities_exclude', self._entities_exclude),
+                                   ('intents', self._intents), ('intents_exclude', self._intents_exclude))}
+
+    def scope(self) -> tuple:
+        """ Ключ области поиска: одинаковый для одинаковых ограничений, заданных строкой или списком """
+        return (scope_key(self._entities, self._entities_exclude),
+                scope_key(self._intents, self._intents_exclude))
+
+
+_JSON_KEYS = {}  # type: Dict[str, str]  # имя -> '"имя": '
+_JSON_KEYS_LIMIT = 4096
+
+
+def _json_key(name: str) -> str:
+    key = _JSON_KEYS.get(name)
+    if key is None:
+        key = (encode_basestring(name) if type(name) is str else json.dumps(str(name), ensure_ascii=False)) + ': '
+        if len(_JSON_KEYS) < _JSON_KEYS_LIMIT:
+            _JSON_KEYS[name] = key
+    return key
+
+
+def _json_value(value) -> str:
+    return encode_basestring(value) if type(value) is str else json.dumps(value, ensure_ascii=False)
+
+
+def _json_object(names: Tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return '{}'
+    return '{' + ', '.join([_json_key(name) + _json_value(value) for name, value in zip(names, values)]) + '}'
+
+
+def _merge(names: Tuple[str, ...], values: tuple, update: Dict[str, str]) -> Tuple[Tuple[str, ...], tuple]:
+    names, values = list(names), list(values)
+    for name, value in update.items():
+        try:
+            values[names.index(name)] = value
+        except ValueError:
+            names.append(name)
+            values.append(value)
+    return tuple(names), tuple(values)
+
+
+class LocalNeuroNluRecognitionResult(NeuroNluRecognitionResult):
+    """ Результат распознавания: имена и значения хранятся в кортежах
+
+    Имена интернированы: LocalNeuroNluLibrary интернирует имена правил и ответов Nlu API один раз,
+    конструктор и распаковка из pickle – сами.
+
+    Объект создается на каждый nv.listen, поэтому словари entities / intents (для match и dump)
+    строятся только при обращении. dump_json собирает JSON из заранее закодированных ключей
+    и совпадает с json.dumps(self.dump(), ensure_ascii=False).
+    """
+
+    # _utterance – слот базового класса, его _entities / _intents заменены свойствами
+    __slots__ = ('_entity_names', '_entity_values', '_intent_names', '_intent_values', '_entity_view', '_intent_view')
+
+    def __init__(self, utterance: Optional[str] = None,
+                 entities: Optional[Dict[str, str]] = None,
+                 intents: Optional[Dict[str, str]] = None):
+        self._utterance = utterance
+        self._entity_names = self._entity_values = self._intent_names = self._intent_values = ()
+        self._entity_view = self._intent_view = None
+        if entities:
+            self._entity_names, self._entity_values = tuple(map(sys.intern, entities)), tuple(entities.values())
+        if intents:
+            self._intent_names, self._intent_values = tuple(map(sys.intern, intents)), tuple(intents.values())
+
+    def __str__(self):
+        return self.dump_json()
+
+    def __bool__(self):
+        return bool(self._utterance)
+
+    def __getstate__(self):
+        return self._utterance, self._entity_names, self._entity_values, self._intent_names, self._intent_values
+
+    def __setstate__(self, state):
+        utterance, entity_names, entity_values, intent_names, intent_values = state
+        self._utterance = utterance
+        self._entity_names = tuple(map(sys.intern, entity_names))
+        self._entity_values = entity_values
+        self._intent_names = tuple(map(sys.intern, intent_names))
+        self._intent_values = intent_values
+        self._entity_view = self._intent_view = None
+
+    def match(self, rules: Union[MatchRules, Mapping[Tuple[str, str], Any]], default=None):
+        if not isinstance(rules, MatchRules):
+            rules = MatchRules(rules)
+        return rules.resolve_items(zip(self._entity_names, self._entity_values), default)
+
+    @property
+    def _entities(self) -> Dict[str, str]:
+        """ Словарь найденных сущностей, строится при первом обращении (используется match) """
+        if self._entity_view is None:
+            self._entity_view = dict(zip(self._entity_names, self._entity_values))
+        return self._entity_view
+
+    @property
+    def _intents(self) -> Dict[str, str]:
+        if self._intent_view is None:
+            self._intent_view = dict(zip(self._intent_names, self._intent_values))
+        return self._intent_view
+
+    def utterance(self) -> Union[None, str]:
+        return self._utterance
+
+    def entity(self, entity_name: str) -> Union[None, str]:
+        try:
+            return self._entity_values[self._entity_names.index(entity_name)]
+        except ValueError:
+            return None
+
+    def intent(self, intent_name: str) -> Union[None, str]:
+        try:
+            return self._intent_values[self._intent_names.index(intent_name)]
+        except ValueError:
+            return None
+
+    def has_entity(self, entity_name) -> bool:
+        return entity_name in self._entity_names
+
+    def has_entities(self) -> bool:
+        return bool(self._entity_names)
+
+    def has_intent(self, intent_name) -> bool:
+        return intent_name in self._intent_names
+
+    def has_intents(self) -> bool:
+        return bool(self._intent_names)
+
+    def set_utterance(self, utterance: str):
+        self._utterance = utterance
+
+    def update_entities(self, entities: dict):
+        if not entities:
+            return
+        if self._entity_names:
+            self._entity_names, self._entity_values = _merge(self._entity_names, self._entity_values, entities)
+        else:
+            self._entity_names, self._entity_values = tuple(entities), tuple(entities.values())
+        self._entity_view = None
+
+    def update_intents(self, intents: dict):
+        if not intents:
+            return
+        if self._intent_names:
+            self._intent_names, self._intent_values = _merge(self._intent_names, self._intent_values, intents)
+        else:
+            self._intent_names, self._intent_values = tuple(intents), tuple(intents.values())
+        self._intent_view = None
+
+    def dump(self) -> dict:
+        return {'utterance': self._utterance, 'entities': dict(zip(self._entity_names, self._entity_values)),
+                'intents': dict(zip(self._intent_names, self._intent_values))}
+
+    def dump_json(self) -> str:
+        utterance = self._utterance
+        return ''.join(('{"utterance": ', 'null' if utterance is None else _json_value(utterance),
+                        ', "entities": ', _json_object(self._entity_names, self._entity_values),
+                        ', "intents": ', _json_object(self._intent_names, self._intent_values), '}'))
+
+
+_worker_nlu = None  # type: Optional[LocalNeuroNluLibrary]
+_worker_request = None  # type: Optional[LocalNeuroNluRecognitionRequest]
+
+
+def _init_extract_worker(nlu: Union['LocalNeuroNluLibrary', Agent], request: LocalNeuroNluRecognitionRequest):
+    """ Инициализация процесса extract_many: при fork nlu с готовыми матчерами наследуется без копирования """
+    global _worker_nlu, _worker_request
+    _worker_nlu = nlu if isinstance(nlu, LocalNeuroNluLibrary) else LocalNeuroNluLibrary(nlu)
+    _worker_request = request
+
+
+def _extract_chunk(chunk: List[str]) -> List[Tuple[Optional[str], Dict[str, str], Dict[str, str]]]:
+    return [_worker_nlu.extract_compact(text, _worker_request) for text in chunk]
+
+
+_WORD = re.compile(r'\S+')
+
+
+def _word_end(text: str, count: int) -> int:
+    """ Позиция конца count-го слова в text (нормализация не меняет границ слов) """
+    for number, match in enumerate(_WORD.finditer(text), 1):
+        if number == count:
+            return match.end()
+    return len(text)
+
+
+class StreamingExtractor:
+    """ Поиск сущностей и интентов по частичным гипотезам ASR во время nv.listen
+
+    Каждая следующая гипотеза обычно продолжает предыдущую: нормализуется и сканируется только
+    дописанный хвост. Если гипотеза переписала начало строки, состояние сбрасывается.
+    Последнее слово гипотезы считается нестабильным и проверяется, когда за ним появится пробел
+    или будет вызван feed(..., final=True). Слова, которые еще могут войти в замену исключения
+    или число (Normalizer.stable_words), ждут следующих слов, остальные нормализуются один раз. Значение сущности – первое найденное по ходу речи,
+    итоговый результат распознавания считается по всей фразе через extract / nv.listen.
+
+    Пример:
+    stream = nlu.stream(entities=['operator', 'repeat'])
+    for partial in partials:
+        entities, intents = stream.feed(partial)
+        if 'operator' in entities:
+            break
+    """
+
+    def __init__(self, nlu: 'LocalNeuroNluLibrary', request: LocalNeuroNluRecognitionRequest):
+        self._nlu = nlu
+        self._request = request
+        self._reset()
+
+    def _reset(self):
+        entity_matcher, intent_matcher = self._nlu.matchers(self._request)
+        self._entities = StreamingMatch(entity_matcher)
+        self._intents = StreamingMatch(intent_matcher)
+        self._raw = ''
+        self._offset = 0  # начало в гипотезе слов, еще не перенесенных в _done
+        self._done = ''
+        self._pending = []  # type: List[str]
+
+    def feed(self, hypothesis: str, final: bool = False) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """ Обрабатывает очередную гипотезу, возвращает найденные к этому моменту (entities, intents) """
+        if not hypothesis.startswith(self._raw):
+            self._reset()
+        self._raw = hypothesis
+        normalizer = self._nlu.normalizer
+        tail = hypothesis[self._offset:]
+        words = normalizer.words(tail)
+        stable = len(words) if final or tail[-1:].isspace() else len(words) - 1
+        count = stable if final else normalizer.stable_words(words[:stable])
+        if count:
+            done = normalizer.replace(' '.join(words[:count]))
+            if done:
+                self._done = self._done + ' ' + done if self._done else done
+            if count == len(words):
+                self._offset = len(hypothesis)
+            elif count == stable:
+                self._offset += len(tail) - len(tail.rsplit(None, 1)[-1])
+            else:
+                self._offset += _word_end(tail, count)
+        self._pending = words[count:]
+        text = self._done
+        return self._entities.update(text, len(text)), self._intents.update(text, len(text))
+
+    @property
+    def text(self) -> str:
+        """ Нормализованная гипотеза целиком, включая еще не окончательные слова """
+        if not self._pending:
+            return self._done
+        pending = self._nlu.normalizer.replace(' '.join(self._pending))
+        return self._done + ' ' + pending if self._done and pending else self._done or pending
+
+
+class LocalNeuroNluLibrary(NeuroNluLibrary):
+    """ Распознавание сущностей и интентов по паттернам агента в памяти процесса
+
+    :param agent: конфигурация агента с паттернами
+    :param neuro_api: функция (utterance, context, request) -> (entities, intents) для use_neuro_api=True,
+                      например NluApiClient. Если не задана или бросила NluApiError (в том числе по дедлайну),
+                      используются только паттерны
+    :param matcher_cache_size: количество областей поиска (entities / intents из nv.listen),
+                               для которых хранятся скомпилированные матчеры
+    :param result_cache_size: если больше 0, результаты распознавания частых реплик ("да", "алло")
+                              кэшируются по ключу (нормализованная строка, область поиска, context)
+    :param result_cache_ttl: время жизни результата в кэше, секунды
+    :param cache_neuro_api: разрешить кэширование вызовов с use_neuro_api=True (по умолчанию не кэшируются)
+    :param fuzzy_threshold: минимальное сходство (от 0 до 1) для нечеткого поиска сущностей при fuzzy=True,
+                            см. FuzzyMatcher. Нечеткий поиск требует numpy
+    """
+
+    _ADDRESS_KEYWORDS = r'(?:город|гор|г|улица|ул|проспект|пр|переулок|пер|дом|д|квартира|кв)\b'
+    _ADDRESS_PATTERNS = (
+        ('city', re.compile(r'\b(?:город|гор|г)\.?\s+([а-яa-z-]+(?:\s+(?!%s)[а-яa-z-]+)?)' % _ADDRESS_KEYWORDS)),
+        ('street', re.compile(r'\b(?:улица|ул|проспект|пр|переулок|пер)\.?\s+([а-яa-z0-9-]+(?:\s+(?!%s)[а-яa-z-]+)?)'
+                              % _ADDRESS_KEYWORDS)),
+        ('building', re.compile(r'\b(?:дом|д)\.?\s*(\d+[а-я]?(?:/\d+)?)')),
+        ('appartment', re.compile(r'\b(?:квартира|кв)\.?\s*(\d+)')),
+    )
+    _MIDDLE_NAME = re.compile(r'(?:вич|вна|чна|тична|ич|кызы|оглы)$')
+    _WORD = re.compile(r'\w+(?:-\w+)*')  # слово для справочников: без знаков препинания, с дефисами
+
+    def __init__(self, agent: Optional[Agent] = None, neuro_api: Optional[NeuroApi] = None,
+                 matcher_cache_size: int = 128, result_cache_size: int = 0, result_cache_ttl: float = 300.0,
+                 cache_neuro_api: bool = False, fuzzy_threshold: float = 0.75):
+        self.agent = agent or Agent()
+        self.neuro_api = neuro_api
+        self.cache_neuro_api = cache_neuro_api
+        self.neuro_api_fallbacks = 0
+        self.fuzzy_threshold = fuzzy_threshold
+        self.normalizer = Normalizer(self.agent.exceptions, self.agent.number_words)
+        self._results = TTLCache(result_cache_size, result_cache_ttl) if result_cache_size > 0 else None
+        self._entity_rules = [(sys.intern(entity), value, re.compile(pattern))
+                              for entity, values in self.agent.entities.items()
+                              for value, patterns in values.items()
+                              for pattern in patterns]
+        self._intent_rules = [(sys.intern(intent), 'true', re.compile(pattern))
+                              for intent, patterns in self.agent.intents.items()
+                              for pattern in patterns]
+        self._matchers = LRUCache(matcher_cache_size)
+        self._fuzzy_matchers = LRUCache(matcher_cache_size)
+        self._gazetteers = None  # type: Optional[Dict[str, Gazetteer]]
+        self._intent_classifier = None  # type: Optional[IntentClassifier]
+
+    def matchers(self, request: LocalNeuroNluRecognitionRequest) -> Tuple[PatternMatcher, PatternMatcher]:
+        """ Матчеры сущностей и интентов, собранные только из паттернов области поиска request """
+        key = request.scope()
+        matchers = self._matchers.get(key)
+        if matchers is None:
+            matchers = (PatternMatcher(rule for rule in self._entity_rules if request.check_entity(rule[0])),
+                        PatternMatcher(rule for rule in self._intent_rules if request.check_intent(rule[0])))
+            self._matchers.put(key, matchers)
+        return matchers
+
+    def fuzzy_matcher(self, request: LocalNeuroNluRecognitionRequest) -> FuzzyMatcher:
+        """ Нечеткий матчер по ключевым словам сущностей области поиска request """
+        key = request.scope()[0]
+        matcher = self._fuzzy_matchers.get(key)
+        if matcher is None:
+            matcher = FuzzyMatcher((rule for rule in self._entity_rules if request.check_entity(rule[0])),
+                                   self.fuzzy_threshold)
+            self._fuzzy_matchers.put(key, matcher)
+        return matcher
+
+    def matcher_cache_info(self) -> Dict[str, int]:
+        """ Статистика кэша матчеров: hits, misses, size, maxsize """
+        return self._matchers.info()
+
+    def result_cache_info(self) -> Optional[Dict[str, int]]:
+        """ Статистика кэша результатов или None, если кэш выключен """
+        return self._results.info() if self._results is not None else None
+
+    def normalize(self, text: str) -> str:
+        """ Нормализация реплики по правилам агента (см. Normalizer), результат – utterance() """
+        return self.normalizer.normalize(text)
+
+    def recognize(self, result: LocalNeuroNluRecognitionResult, recognition_result: Optional[str],
+                  request: LocalNeuroNluRecognitionRequest, context=None, use_neuro_api=False, fuzzy=False):
+        """ Заполняет result результатом распознавания строки recognition_result (используется nv.listen) """
+        if recognition_result is None:
+            return result
+        text = self.normalize(recognition_result)
+        result.set_utterance(text)
+        if not text:
+            return result
+        use_neuro_api = use_neuro_api and self.neuro_api is not None
+        cache = self._results
+        if cache is not None and (not use_neuro_api or self.cache_neuro_api):
+            key = (text, request.scope(), context, use_neuro_api, fuzzy)
+            cached = cache.get(key)
+            if cached is None:
+                entities, intents, complete = self._recognize(text, request, context, use_neuro_api, fuzzy)
+                if complete:
+                    cache.put(key, (entities, intents))
+            else:
+                entities, intents = cached
+        else:
+            entities, intents, _ = self._recognize(text, request, context, use_neuro_api, fuzzy)
+        result.update_entities(entities)
+        result.update_intents(intents)
+        return result
+
+    def _recognize(self, text: str, request: LocalNeuroNluRecognitionRequest, context, use_neuro_api: bool,
+                   fuzzy: bool = False) -> Tuple[Dict[str, str], Dict[str, str], bool]:
+        """ (entities, intents, complete), complete=False – Nlu API не ответил и использованы только паттерны """
+        entities, intents = {}, {}
+        complete = True
+        if use_neuro_api:
+            try:
+                api_entities, api_intents = self.neuro_api(text, context, request)
+            except NluApiError:
+                self.neuro_api_fallbacks += 1
+                complete = False
+            else:
+                entities.update((sys.intern(name), value) for name, value in api_entities.items())
+                intents.update((sys.intern(name), value) for name, value in api_intents.items())
+        entity_matcher, intent_matcher = self.matchers(request)
+        entities.update(entity_matcher.match(text, skip=entities))
+        if fuzzy:
+            entities.update(self.fuzzy_matcher(request).match(text, skip=entities))
+        intents.update(intent_matcher.match(text))
+        self._classify(text, request, intents)
+        return entities, intents, complete
+
+    @property
+    def intent_classifier(self) -> Optional[IntentClassifier]:
+        """ Классификатор интентов из agent.intent_model, загружается при первом обращении """
+        if self._intent_classifier is None and self.agent.intent_model:
+            self._intent_classifier = IntentClassifier.load(self.agent.intent_model)
+        return self._intent_classifier
+
+    def _classify(self, text: str, request: LocalNeuroNluRecognitionRequest, intents: Dict[str, str]):
+        """ Добавляет интент классификатора, если он в области поиска и не найден паттернами """
+        classifier = self.intent_classifier
+        if classifier is None or not request.has_intents():
+            return
+        intent = classifier.predict(text)
+        if intent is not None and intent not in intents and request.check_intent(intent):
+            intents[intent] = 'true'
+
+    def stream(self, entities: NoneStrList = None, entities_exclude: NoneStrList = None,
+               intents: NoneStrList = None, intents_exclude: NoneStrList = None) -> StreamingExtractor:
+        """ Потоковый поиск для частичных гипотез с той же областью поиска, что и у extract """
+        return StreamingExtractor(self, LocalNeuroNluRecognitionRequest(entities, intents,
+                                                                        entities_exclude, intents_exclude))
+
+    def extract_compact(self, recognition_result: Optional[str], request: LocalNeuroNluRecognitionRequest
+                        ) -> Tuple[Optional[str], Dict[str, str], Dict[str, str]]:
+        """ Распознавание по паттернам в виде кортежа (utterance, entities, intents) """
+        if recognition_result is None:
+            return None, {}, {}
+        text = self.normalize(recognition_result)
+        if not text:
+            return text, {}, {}
+        entity_matcher, intent_matcher = self.matchers(request)
+        intents = intent_matcher.match(text)
+        self._classify(text, request, intents)
+        return text, entity_matcher.match(text), intents
+
+    def extract_many(self, recognition_results: Iterable[str],
+                     entities: NoneStrList = None, entities_exclude: NoneStrList = None,
+                     intents: NoneStrList = None, intents_exclude: NoneStrList = None,
+                     workers: Optional[int] = None, chunk_size: int = 256, as_dict: bool = False
+                     ) -> Iterator[Union[LocalNeuroNluRecognitionResult, dict]]:
+        """ Пакетное распознавание по паттернам и классификатору интентов (Nlu API не используется)
+
+        Вход читается порциями: в работе не больше 2 * workers задач, результаты отдаются по порядку.
+        Матчеры компилируются один раз в текущем процессе, процессы пула получают их через fork.
+        """
+        request = LocalNeuroNluRecognitionRequest(entities, intents, entities_exclude, intents_exclude)
+        self.matchers(request)
+        self.intent_classifier
+        if as_dict:
+            def build(item):
+                return {'utterance': item[0], 'entities': item[1], 'intents': item[2]}
+        else:
+            def build(item):
+                return LocalNeuroNluRecognitionResult(*item)
+        if not workers or workers <= 1:
+            for text in recognition_results:
+                yield build(self.extract_compact(text, request))
+            return
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            initargs = (self, request)
+        else:
+            context = multiprocessing.get_context()
+            initargs = (self.agent, request)
+        source = iter(recognition_results)
+        with context.Pool(workers, initializer=_init_extract_worker, initargs=initargs) as pool:
+            in_flight = deque()
+            while True:
+                while len(in_flight) < 2 * workers:
+                    chunk = list(islice(source, chunk_size))
+                    if not chunk:
+                        break
+                    in_flight.append(pool.apply_async(_extract_chunk, (chunk,)))
+                if not in_flight:
+                    break
+                for item in in_flight.popleft().get():
+                    yield build(item)
+
+    def extract(self, recognition_result: str,
+                entities: NoneStrList = None, entities_exclude: NoneStrList = None,
+                intents: NoneStrList = None, intents_exclude: NoneStrList = None,
+                context=None, use_neuro_api=False, fuzzy=False
+                ) -> LocalNeuroNluRecognitionResult:
+        """ См. NeuroNluLibrary.extract
+
+        Расширение локального рантайма – fuzzy: если True, сущности, не найденные паттернами, ищутся нечетко
+        по ключевым словам паттернов с учетом ошибок распознавания речи (нужен numpy, см. FuzzyMatcher)
+        """
+        request = LocalNeuroNluRecognitionRequest(entities, intents, entities_exclude, intents_exclude)
+        return self.recognize(LocalNeuroNluRecognitionResult(), recognition_result, request,
+                              context=context, use_neuro_api=use_neuro_api, fuzzy=fuzzy)
+
+    @property
+    def gazetteers(self) -> Dict[str, Gazetteer]:
+        """ Справочники агента (agent.gazetteers), открываются при первом обращении """
+        if self._gazetteers is None:
+            self._gazetteers = open_gazetteers(self.agent.gazetteers)
+        return self._gazetteers
+
+    def extract_address(self, address: str) -> Dict[str, List[Optional[str]]]:
+        """ Город и улица ищутся по справочникам агента, если они заданы, иначе и в остальном – по ключевым словам """
+        text = self.normalize(address)
+        result = {'city': [], 'street': [], 'building': [], 'appartment': None}
+        for key, pattern in self._ADDRESS_PATTERNS:
+            values = pattern.findall(text)
+            if key == 'appartment':
+                result[key] = values[0] if values else None
+            else:
+                result[key] = values
+        words = self._WORD.findall(text)
+        for key in ('city', 'street'):
+            gazetteer = self.gazetteers.get(key)
+            if gazetteer is not None:
+                values = [value for _, _, value in gazetteer.find(words)]
+                if values:
+                    result[key] = values
+        return result
+
+    def extract_person(self, person: str) -> Dict[str, Optional[str]]:
+        """ Слова ищутся в справочниках agent.gazetteers (middle, first, last),
+        для остальных – эвристика: отчество определяется по окончанию, порядок – имя, фамилия
+        """
+        gazetteers = self.gazetteers
+        result = {'first': None, 'last': None, 'middle': None}
+        rest = []
+        for word in self._WORD.findall(self.normalize(person)):
+            for key in ('middle', 'first', 'last'):
+                gazetteer = gazetteers.get(key)
+                if result[key] is None and gazetteer is not None:
+                    value = gazetteer.get(word, normalized=True)
+                    if value is not None:
+                        result[key] = value
+                        break
+            else:
+                if result['middle'] is None and self._MIDDLE_NAME.search(word):
+                    result['middle'] = word.capitalize()
+                else:
+                    rest.append(word.capitalize())
+        for key in ('first', 'last'):
+            if result[key] is None and rest:
+                result[key] = rest.pop(0)
+        return result
@@ -0,0 +1,183 @@
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+NluApiResult = Tuple[Dict[str, str], Dict[str, str]]
+
+
+class NluApiError(Exception):
+    """ Ошибка или превышение дедлайна при обращении к Nlu API """
+    pass
+
+
+class NluApiClient:
+    """ Клиент Nlu API для use_neuro_api=True с пулом keep-alive соединений
+
+    - соединения HTTP/1.1 переиспользуются между запросами (не больше pool_size одновременно);
+    - одинаковые запросы (utterance, context, область поиска), выполняющиеся одновременно,
+      объединяются в один HTTP запрос;
+    - каждый вызов ограничен жестким дедлайном timeout: по его истечении бросается NluApiError,
+      а запрос дорабатывает в фоне и его соединение возвращается в пул.
+      LocalNeuroNluLibrary в этом случае распознает сущности по паттернам.
+
+    Подходит как neuro_api для LocalNeuroNluLibrary:
+    nlu = LocalNeuroNluLibrary(agent, neuro_api=NluApiClient('127.0.0.1', 8080, timeout=0.3))
+    """
+
+    def __init__(self, host: str, port: int, path: str = '/extract', timeout: float = 0.5, pool_size: int = 8,
+                 socket_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.timeout = timeout
+        self.socket_timeout = socket_timeout
+        self.requests = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self._connections = queue.LifoQueue()
+        self._executor = ThreadPoolExecutor(pool_size, thread_name_prefix='nlu-api')
+        self._in_flight = {}  # type: Dict[tuple, Future]
+        self._lock = threading.RLock()
+
+    def __call__(self, utterance: str, context, request) -> NluApiResult:
+        deadline = time.monotonic() + self.timeout
+        key = (utterance, context, request.scope())
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._executor.submit(self._post, {'utterance': utterance, 'context': context,
+                                                            **request.dump()})
+                self._in_flight[key] = future
+                future.add_done_callback(lambda _, key=key: self._forget(key))
+            else:
+                self.coalesced += 1
+        try:
+            return future.result(max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise NluApiError('Nlu API deadline %.3fs exceeded' % self.timeout)
+
+    def _forget(self, key):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def _post(self, payload: dict) -> NluApiResult:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        while True:
+            try:
+                connection, reused = self._connections.get_nowait(), True
+            except queue.Empty:
+                connection, reused = http.client.HTTPConnection(self.host, self.port,
+                                                                timeout=self.socket_timeout), False
+            try:
+                connection.request('POST', self.path, body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                connection.close()
+                # keep-alive соединение могло быть закрыто сервером, повторяем на новом
+                if reused:
+                    continue
+                raise NluApiError('Nlu API request failed: %s' % e)
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                raise NluApiError('Nlu API request failed: %s' % e)
+            with self._lock:
+                self.requests += 1
+            self._connections.put(connection)
+            if response.status != 200:
+                raise NluApiError('Nlu API responded %d' % response.status)
+            try:
+                result = json.loads(data)
+                return result.get('entities') or {}, result.get('intents') or {}
+            except (ValueError, AttributeError) as e:
+                raise NluApiError('Invalid Nlu API response: %s' % e)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def info(self) -> Dict[str, int]:
+        return {'requests': self.requests, 'coalesced': self.coalesced, 'timeouts': self.timeouts}
+
+
+class NluApiStubServer:
+    """ Локальная заглушка Nlu API для бенчмарков без сети
+
+    Отвечает на POST {"utterance": ..., "context": ..., "entities": [...], ...}
+    словарем {"entities": {...}, "intents": {...}}, распознанным функцией handler.
+
+    :param handler: функция (payload) -> (entities, intents)
+    :param latency: функция без аргументов, возвращающая задержку ответа в секундах
+
+    Пример:
+    with NluApiStubServer(handler, latency=lambda: random.uniform(0.001, 0.005)) as server:
+        client = NluApiClient(*server.address)
+    """
+
+    def __init__(self, handler: Callable[[dict], NluApiResult],
+                 latency: Optional[Callable[[], float]] = None, host: str = '127.0.0.1', port: int = 0):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if stub.latency is not None:
+                    time.sleep(stub.latency())
+                entities, intents = stub.handler(payload)
+                body = json.dumps({'entities': entities, 'intents': intents}, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.handler = handler
+        self.latency = latency
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> 'NluApiStubServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='nlu-api-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def random_latency(median: float = 0.003, tail: float = 0.05, tail_share: float = 0.02) -> Callable[[], float]:
+    """ Задержка для заглушки: логнормальная вокруг median, с долей tail_share медленных ответов """
+    def latency():
+        if random.random() < tail_share:
+            return tail
+        return random.lognormvariate(0, 0.5) * median
+    return latency
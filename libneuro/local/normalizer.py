@@ -0,0 +1,131 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+_UNITS = {'ноль': 0, 'один': 1, 'одна': 1, 'одно': 1, 'два': 2, 'две': 2, 'три': 3, 'четыре': 4, 'пять': 5,
+          'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9}
+_TEENS = {'десять': 10, 'одиннадцать': 11, 'двенадцать': 12, 'тринадцать': 13, 'четырнадцать': 14,
+          'пятнадцать': 15, 'шестнадцать': 16, 'семнадцать': 17, 'восемнадцать': 18, 'девятнадцать': 19}
+_TENS = {'двадцать': 20, 'тридцать': 30, 'сорок': 40, 'пятьдесят': 50, 'шестьдесят': 60, 'семьдесят': 70,
+         'восемьдесят': 80, 'девяносто': 90}
+_HUNDREDS = {'сто': 100, 'двести': 200, 'триста': 300, 'четыреста': 400, 'пятьсот': 500, 'шестьсот': 600,
+             'семьсот': 700, 'восемьсот': 800, 'девятьсот': 900}
+_MULTIPLIERS = {'тысяча': 1000, 'тысячи': 1000, 'тысяч': 1000,
+                'миллион': 1000000, 'миллиона': 1000000, 'миллионов': 1000000}
+
+# слово -> (значение, ранг слова, ранг после слова): следующее слово того же числа должно иметь ранг меньше
+_NUMBER_WORDS = {}  # type: Dict[str, Tuple[int, int, int]]
+_NUMBER_WORDS.update((word, (value, 0, 0)) for word, value in _UNITS.items())
+_NUMBER_WORDS.update((word, (value, 1, 0)) for word, value in _TEENS.items())
+_NUMBER_WORDS.update((word, (value, 2, 1)) for word, value in _TENS.items())
+_NUMBER_WORDS.update((word, (value, 3, 3)) for word, value in _HUNDREDS.items())
+
+_TABLE = str.maketrans({'ё': 'е'})
+
+
+def parse_number_words(words: List[str]) -> List[int]:
+    """ Числа из последовательности числительных
+
+    ['двадцать', 'пять'] -> [25]
+    ['две', 'тысячи', 'двадцать', 'четыре'] -> [2024]
+    ['девять', 'один', 'шесть'] -> [9, 1, 6] (диктовка по цифрам)
+    """
+    numbers = []
+    total, group, rank, scale = 0, 0, 4, None
+    active = False
+    for word in words:
+        multiplier = _MULTIPLIERS.get(word)
+        if multiplier is not None:
+            if active and scale is not None and multiplier >= scale:
+                numbers.append(total + group)
+                total, group = 0, 0
+            total += (group or 1) * multiplier
+            group, rank, scale, active = 0, 4, multiplier, True
+            continue
+        value, word_rank, next_rank = _NUMBER_WORDS[word]
+        if active and word_rank >= rank:
+            numbers.append(total + group)
+            total, group, scale = 0, 0, None
+        group += value
+        rank, active = next_rank, True
+    if active:
+        numbers.append(total + group)
+    return numbers
+
+
+class Normalizer:
+    """ Нормализация реплики, после которой ищутся сущности: результат NeuroNluRecognitionResult.utterance()
+
+    Шаги: нижний регистр и ё -> е (таблица str.translate), схлопывание пробелов, затем за один проход
+    одного регулярного выражения – замены исключений агента и, если включено,
+    числительные -> цифры ("двадцать пять" -> "25").
+    Собирается один раз на агента (LocalNeuroNluLibrary.normalizer) и используется и extract, и потоковым
+    поиском по частичным гипотезам.
+
+    :param exceptions: замены целых слов и фраз {'интернэт': 'интернет', 'не могу говорить': 'перезвоните'}
+    :param number_words: заменять числительные цифрами
+    """
+
+    def __init__(self, exceptions: Optional[Dict[str, str]] = None, number_words: bool = False):
+        self.exceptions = {self.basic(key): self.basic(value) for key, value in (exceptions or {}).items()
+                           if self.basic(key)}
+        self.number_words = number_words
+        alternatives = []
+        if self.exceptions:
+            keys = sorted(self.exceptions, key=len, reverse=True)
+            alternatives.append('(?P<exception>%s)' % '|'.join(re.escape(key) for key in keys))
+        if number_words:
+            words = '|'.join(sorted(list(_NUMBER_WORDS) + list(_MULTIPLIERS), key=len, reverse=True))
+            alternatives.append('(?P<number>(?:%s)(?: (?:%s))*)' % (words, words))
+        self._regex = re.compile(r'\b(?:%s)\b' % '|'.join(alternatives)) if alternatives else None
+        # сколько слов справа может изменить нормализацию уже полученных слов (см. stable_words)
+        self.lookahead = max((key.count(' ') for key in self.exceptions), default=0)
+        self._collapse = '' in self.exceptions.values()
+
+    @staticmethod
+    def basic(text: str) -> str:
+        """ Нижний регистр, ё -> е, одиночные пробелы """
+        return ' '.join(text.lower().translate(_TABLE).split())
+
+    @staticmethod
+    def words(text: str) -> List[str]:
+        """ Слова text после basic """
+        return text.lower().translate(_TABLE).split()
+
+    def _replace(self, match) -> str:
+        if match.lastgroup == 'exception':
+            return self.exceptions[match.group()]
+        return ' '.join(str(number) for number in parse_number_words(match.group().split(' ')))
+
+    def __call__(self, text: str) -> str:
+        return self.normalize(text)
+
+    def normalize(self, text: str) -> str:
+        return self.replace(' '.join(text.lower().translate(_TABLE).split()))
+
+    def replace(self, text: str) -> str:
+        """ Замены исключений и числительных в строке, уже прошедшей basic """
+        if self._regex is None:
+            return text
+        text = self._regex.sub(self._replace, text)
+        return ' '.join(text.split()) if self._collapse else text
+
+    def stable_words(self, words: List[str]) -> int:
+        """ Сколько первых слов (после basic) можно нормализовать окончательно, если за ними будут еще слова
+
+        Граница не должна проходить внутри замены или числа, а замены, начинающиеся до нее, должны
+        целиком помещаться в words. Число, которым заканчивается words, может продолжиться.
+        """
+        if self._regex is None:
+            return len(words)
+        cut = len(words) - self.lookahead
+        if cut <= 0:
+            return 0
+        text = ' '.join(words)
+        for match in self._regex.finditer(text):
+            start = text.count(' ', 0, match.start())
+            end = start + match.group().count(' ') + 1
+            if match.lastgroup == 'number' and end == len(words):
+                end += 1
+            if start < cut < end:
+                cut = start
+        return cut
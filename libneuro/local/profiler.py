@@ -0,0 +1,267 @@
+import inspect
+import json
+import os
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def _bucket(value: int, bits: int) -> int:
+    """ Номер корзины: значения до 2 ** (bits + 1) – точно, дальше 2 ** bits корзин на каждую степень двойки """
+    if value >> (bits + 1) == 0:
+        return value
+    shift = value.bit_length() - bits - 1
+    return (shift + 1 << bits) + (value >> shift) - (1 << bits)
+
+
+def _bucket_low(index: int, bits: int) -> int:
+    """ Наименьшее значение корзины index """
+    shift = (index >> bits) - 1
+    if shift <= 0:
+        return index
+    return (index - (shift << bits)) << shift
+
+
+class Histogram:
+    """ Гистограмма задержек в наносекундах с логарифмически-линейными корзинами (как HdrHistogram)
+
+    Относительная ошибка квантилей не больше 2 ** -bits (bits=5 – около 3%) на любом диапазоне значений,
+    запись – вычисление номера корзины и инкремент элемента списка.
+    Гистограмма не потокобезопасна: Profiler ведет отдельные гистограммы для каждого потока.
+    """
+    __slots__ = ('bits', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, bits: int = 5):
+        self.bits = bits
+        self.counts = []  # type: List[int]
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        index = _bucket(value, self.bits)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: 'Histogram'):
+        """ Добавляет значения other (с тем же bits) """
+        if other.bits != self.bits:
+            raise ValueError('can not merge histograms with different precision')
+        if not other.count:
+            return
+        counts = list(other.counts)  # other может пополняться в своем потоке
+        if len(counts) > len(self.counts):
+            self.counts.extend([0] * (len(counts) - len(self.counts)))
+        for index, count in enumerate(counts):
+            if count:
+                self.counts[index] += count
+        self.min = min(self.min, other.min) if self.count else other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, share: float) -> int:
+        """ Значение, не больше которого share значений (верхняя граница корзины) """
+        if not self.count:
+            return 0
+        rank = max(1, int(share * self.count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_low(index + 1, self.bits) - 1, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """ {'count', 'mean', 'min', 'p50', 'p90', 'p99', 'p999', 'max'}, значения в наносекундах """
+        return {'count': self.count,
+                'mean': self.total // self.count if self.count else 0,
+                'min': self.min,
+                'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99),
+                'p999': self.percentile(0.999),
+                'max': self.max}
+
+
+def interface_methods(interface: type, exclude: Iterable[str] = ()) -> List[str]:
+    """ Публичные методы интерфейса (NeuroVoiceLibrary, NeuroNetLibrary, ...) для Profiler.instrument """
+    exclude = set(exclude)
+    return [name for name, member in vars(interface).items()
+            if not name.startswith('_') and name not in exclude
+            and (inspect.isfunction(member) or isinstance(member, staticmethod))]
+
+
+class Profiler:
+    """ Время исполнения юнитов скрипта и экшенов nv / nn / nlu: реальное (perf_counter) и процессорное
+    (thread_time) в гистограммах по каждому имени
+
+    Каждый поток пишет в свои гистограммы без блокировок, блокировка берется только при первой записи
+    потока. dump сливает гистограммы всех потоков. Пока профайлер не подключен, накладных
+    расходов нет: обертки ставятся только при подключении (ScriptExecutor(profiler=...)), а выключенный
+    профайлер (enabled = False) – одна проверка атрибута на вызов.
+
+    Юниты пишутся как 'unit:<имя функции>' (check_call_state), экшены – 'nv.say', 'nlu.extract' и т.д.
+    Время nv.listen – от вызова до выхода из блока with, вместе с вложенным nlu.recognize.
+    Без trampoline время юнита включает вызванные из него юниты.
+
+    Пример:
+    profiler = Profiler()
+    executor = ScriptExecutor.from_file('task_logic.py', agent, profiler=profiler)
+    ...
+    profiler.dump('profile-{pid}.json')
+
+    :param bits: точность гистограмм (см. Histogram)
+    """
+
+    def __init__(self, bits: int = 5):
+        self.bits = bits
+        self.enabled = True
+        self._local = threading.local()
+        self._threads = []  # type: List[Dict[str, Tuple[Histogram, Histogram]]]
+        self._lock = threading.Lock()
+
+    def _histograms(self) -> Dict[str, Tuple[Histogram, Histogram]]:
+        histograms = {}  # type: Dict[str, Tuple[Histogram, Histogram]]
+        with self._lock:
+            self._threads.append(histograms)
+        self._local.histograms = histograms
+        return histograms
+
+    def record(self, name: str, wall_ns: int, cpu_ns: int):
+        """ Записывает одно исполнение name """
+        try:
+            histograms = self._local.histograms
+        except AttributeError:
+            histograms = self._histograms()
+        pair = histograms.get(name)
+        if pair is None:
+            pair = histograms[name] = (Histogram(self.bits), Histogram(self.bits))
+        pair[0].record(wall_ns)
+        pair[1].record(cpu_ns)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """ func, записывающая свое время под именем name; для @contextmanager – время до выхода из with """
+        if inspect.isgeneratorfunction(getattr(func, '__wrapped__', None)):
+            return self._wrap_context(name, func)
+        record = self.record
+        wall_clock = time.perf_counter_ns
+        cpu_clock = time.thread_time_ns
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            wall, cpu = wall_clock(), cpu_clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, wall_clock() - wall, cpu_clock() - cpu)
+        return wrapper
+
+    def _wrap_context(self, name: str, func: Callable) -> Callable:
+        record = self.record
+        wall_clock = time.perf_counter_ns
+        cpu_clock = time.thread_time_ns
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            return _TimedContext(func(*args, **kwargs), name, record, wall_clock, cpu_clock)
+        return wrapper
+
+    def timed(self, name: Optional[str] = None):
+        """ Декоратор для функций вне check_call_state
+
+        @profiler.timed('tariff_lookup')
+        def tariff_lookup(msisdn):
+            ...
+        """
+        def decorator(func):
+            return self.wrap(name or func.__name__, func)
+        return decorator
+
+    def instrument(self, obj: Any, prefix: str, names: Iterable[str]):
+        """ Подменяет методы names объекта obj (nv, nn, nlu) обертками с записью времени '<prefix>.<name>' """
+        for name in names:
+            method = getattr(obj, name, None)
+            if callable(method):
+                setattr(obj, name, self.wrap('%s.%s' % (prefix, name), method))
+
+    def histograms(self) -> Dict[str, Tuple[Histogram, Histogram]]:
+        """ {name: (реальное время, процессорное время)} – гистограммы всех потоков вместе """
+        with self._lock:
+            threads = list(self._threads)
+        merged = {}  # type: Dict[str, Tuple[Histogram, Histogram]]
+        for histograms in threads:
+            for name, (wall, cpu) in list(histograms.items()):
+                pair = merged.get(name)
+                if pair is None:
+                    pair = merged[name] = (Histogram(self.bits), Histogram(self.bits))
+                pair[0].merge(wall)
+                pair[1].merge(cpu)
+        return merged
+
+    def reset(self):
+        """ Очищает накопленные гистограммы всех потоков """
+        with self._lock:
+            for histograms in self._threads:
+                histograms.clear()
+
+    def dump(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """ Сводка {'pid': ..., 'metrics': {name: {'wall': summary, 'cpu': summary}}}
+
+        :param path: если задан, сводка пишется в JSON файл, '{pid}' в пути заменяется на pid процесса
+        """
+        report = {'pid': os.getpid(),
+                  'metrics': {name: {'wall': wall.summary(), 'cpu': cpu.summary()}
+                              for name, (wall, cpu) in sorted(self.histograms().items())}}
+        if path is not None:
+            with open(path.format(pid=os.getpid()), 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+    def table(self) -> str:
+        """ Сводка в виде текстовой таблицы, времена в микросекундах """
+        lines = ['%-36s %8s %10s %10s %10s %10s %10s' % ('name', 'count', 'wall p50', 'wall p99', 'wall max',
+                                                      'cpu p50', 'cpu p99')]
+        for name, (wall, cpu) in sorted(self.histograms().items()):
+            lines.append('%-36s %8d %10.1f %10.1f %10.1f %10.1f %10.1f'
+                         % (name, wall.count, wall.percentile(0.5) / 1e3, wall.percentile(0.99) / 1e3,
+                            wall.max / 1e3, cpu.percentile(0.5) / 1e3, cpu.percentile(0.99) / 1e3))
+        return '\n'.join(lines)
+
+
+class _TimedContext:
+    """ Контекстный менеджер, записывающий время от создания до выхода из with """
+    __slots__ = ('_context', '_name', '_record', '_wall_clock', '_cpu_clock', '_wall', '_cpu')
+
+    def __init__(self, context, name, record, wall_clock, cpu_clock):
+        self._wall, self._cpu = wall_clock(), cpu_clock()
+        self._context = context
+        self._name = name
+        self._record = record
+        self._wall_clock = wall_clock
+        self._cpu_clock = cpu_clock
+
+    def __enter__(self):
+        return self._context.__enter__()
+
+    def __exit__(self, *exc_info):
+        try:
+            return self._context.__exit__(*exc_info)
+        finally:
+            self._record(self._name, self._wall_clock() - self._wall, self._cpu_clock() - self._cpu)
@@ -0,0 +1,279 @@
+import itertools
+import json
+import os
+from collections import deque
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+EPOCH = datetime(2000, 1, 1)
+
+_BY_ID = attrgetter('call_id')
+
+
+class ScheduledCall(NamedTuple):
+    call_id: int
+    date: datetime
+    priority: int
+    payload: Dict[str, Any]
+
+
+class _Entry:
+    __slots__ = ('call_id', 'date', 'tick', 'priority', 'payload', 'cancelled')
+
+    def __init__(self, call_id: int, date: datetime, tick: int, priority: int, payload: Dict[str, Any]):
+        self.call_id = call_id
+        self.date = date
+        self.tick = tick
+        self.priority = priority
+        self.payload = payload
+        self.cancelled = False
+
+
+class CallScheduler:
+    """ Очередь запланированных звонков на иерархическом timing wheel
+
+    Время делится на тики по tick секунд. Уровень 0 – slots ячеек по одному тику, в ячейке – очереди
+    по приоритетам; уровень L – slots ячеек по slots ** L тиков. Звонок кладется на самый нижний уровень,
+    куда помещается его срок, и опускается ниже, когда текущее время доходит до начала его ячейки
+    (каждый звонок опускается не больше levels раз). Сроки дальше slots ** levels тиков ждут в overflow.
+
+    - add – O(1): вычисление ячейки и добавление в список;
+    - cancel – O(1): звонок помечается отмененным и пропускается при выдаче;
+    - pop_due – O(1) на наступивший тик и на выданный звонок, пустые уровни пропускаются целиком.
+    Наступившие звонки выдаются по убыванию priority (None – 0), при равном приоритете – по сроку
+    с точностью до тика.
+
+    Если задан log_path, операции дописываются в журнал (JSON строка на операцию или пакет) и при создании
+    планировщика очередь восстанавливается из него; compact переписывает журнал только с живыми звонками.
+    payload должен сериализоваться в JSON (прочие значения пишутся как str).
+
+    :param tick: длительность тика в секундах
+    :param slots: ячеек на уровне, степень двойки
+    :param levels: количество уровней
+    :param now: текущее время планировщика, по умолчанию datetime.now()
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 256, levels: int = 4, log_path: Optional[str] = None,
+                 now: Optional[datetime] = None):
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError('slots must be a power of two')
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.log_path = log_path
+        self._bits = slots.bit_length() - 1
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._current = self._tick_of(now or datetime.now())
+        # уровень 0: ячейка – {priority: [entry, ...]}, уровни 1..levels-1: ячейка – [entry, ...]
+        self._wheel = [{} for _ in range(slots)]  # type: List[Dict[int, List[_Entry]]]
+        self._wheels = [None] + [[[] for _ in range(slots)] for _ in range(1, levels)]
+        self._counts = [0] * levels
+        self._overflow = []  # type: List[_Entry]
+        self._ready = {}  # type: Dict[int, Deque[_Entry]]
+        self._entries = {}  # type: Dict[int, _Entry]
+        self._ids = itertools.count(1)
+        self._log = None
+        if log_path is not None:
+            if os.path.exists(log_path):
+                self._replay(log_path)
+            self._log = open(log_path, 'a', encoding='utf-8')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, call_id: int):
+        return call_id in self._entries
+
+    def _tick_of(self, date: datetime) -> int:
+        return int((date - EPOCH).total_seconds() // self.tick)
+
+    def _place(self, entry: _Entry):
+        delta = entry.tick - self._current
+        if delta <= 0:
+            queue = self._ready.get(entry.priority)
+            if queue is None:
+                queue = self._ready[entry.priority] = deque()
+            queue.append(entry)
+            return
+        # уровень – номер группы из bits двоичных разрядов, в которой старший разряд delta
+        level = (delta.bit_length() - 1) // self._bits
+        if level == 0:
+            bucket = self._wheel[entry.tick & self.slots - 1]
+            entries = bucket.get(entry.priority)
+            if entries is None:
+                bucket[entry.priority] = [entry]
+            else:
+                entries.append(entry)
+        elif level < self.levels:
+            self._wheels[level][entry.tick >> level * self._bits & self.slots - 1].append(entry)
+        else:
+            self._overflow.append(entry)
+            return
+        self._counts[level] += 1
+
+    def _add(self, date: datetime, priority: Optional[int], payload: Dict[str, Any]) -> _Entry:
+        call_id = next(self._ids)
+        entry = _Entry(call_id, date, int((date - EPOCH).total_seconds() // self.tick), priority or 0, payload)
+        self._entries[call_id] = entry
+        self._place(entry)
+        return entry
+
+    @staticmethod
+    def _add_record(entry: _Entry) -> str:
+        return json.dumps(['A', entry.call_id, entry.date.isoformat(), entry.priority, entry.payload],
+                          ensure_ascii=False, default=str)
+
+    def _write(self, record):
+        if self._log is not None:
+            self._log.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def add(self, date: datetime, payload: Dict[str, Any], priority: Optional[int] = None) -> int:
+        """ Планирует звонок на date, возвращает его call_id """
+        entry = self._add(date, priority, payload)
+        if self._log is not None:
+            self._log.write(self._add_record(entry) + '\n')
+            self._log.flush()
+        return entry.call_id
+
+    def add_many(self, calls: Iterable[Tuple[datetime, Optional[int], Dict[str, Any]]]) -> List[int]:
+        """ Планирует пакет звонков (date, priority, payload) с одной записью в журнал """
+        ids = []
+        records = []
+        for date, priority, payload in calls:
+            entry = self._add(date, priority, payload)
+            ids.append(entry.call_id)
+            if self._log is not None:
+                records.append(self._add_record(entry))
+        if records:
+            self._log.write('\n'.join(records) + '\n')
+            self._log.flush()
+        return ids
+
+    def cancel(self, call_id: int) -> bool:
+        """ Отменяет звонок, False – если его нет в очереди (уже выдан или отменен) """
+        entry = self._entries.pop(call_id, None)
+        if entry is None:
+            return False
+        entry.cancelled = True
+        if self._log is not None:
+            self._write(['C', call_id])
+            self._log.flush()
+        return True
+
+    def _cascade(self, level: int, index: int):
+        entries = self._wheels[level][index]
+        if not entries:
+            return
+        self._wheels[level][index] = []
+        self._counts[level] -= len(entries)
+        for entry in entries:
+            if not entry.cancelled:
+                self._place(entry)
+
+    def _process(self, tick: int):
+        """ Текущее время дошло до tick: опускание ячеек верхних уровней и выдача ячейки уровня 0 """
+        if self._overflow and tick % self._spans[self.levels] == 0:
+            overflow, self._overflow = self._overflow, []
+            for entry in overflow:
+                if not entry.cancelled:
+                    self._place(entry)
+        for level in range(self.levels - 1, 0, -1):
+            if tick % self._spans[level] == 0:
+                self._cascade(level, tick >> level * self._bits & self.slots - 1)
+        bucket = self._wheel[tick & self.slots - 1]
+        if not bucket:
+            return
+        for priority, entries in bucket.items():
+            self._counts[0] -= len(entries)
+            queue = self._ready.get(priority)
+            if queue is None:
+                self._ready[priority] = deque(entries)
+            else:
+                queue.extend(entries)
+        bucket.clear()
+
+    def advance(self, now: datetime):
+        """ Сдвигает текущее время планировщика к now, наступившие звонки переходят в очередь выдачи """
+        target = self._tick_of(now)
+        while self._current < target:
+            level = 0
+            while level < self.levels and not self._counts[level]:
+                level += 1
+            if level == self.levels and not self._overflow:
+                self._current = target
+                return
+            # уровни ниже level пусты: ближайшее событие – начало следующей ячейки уровня level
+            span = self._spans[level]
+            following = (self._current // span + 1) * span
+            if following > target:
+                self._current = target
+                return
+            self._current = following
+            self._process(following)
+
+    def pop_due(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[ScheduledCall]:
+        """ Наступившие к now звонки (не больше limit) по убыванию приоритета, выданные удаляются из очереди """
+        self.advance(now or datetime.now())
+        due = []
+        for priority in sorted(self._ready, reverse=True):
+            queue = self._ready[priority]
+            while queue and (limit is None or len(due) < limit):
+                entry = queue.popleft()
+                if entry.cancelled:
+                    continue
+                del self._entries[entry.call_id]
+                due.append(ScheduledCall(entry.call_id, entry.date, entry.priority, entry.payload))
+            if not queue:
+                del self._ready[priority]
+            if limit is not None and len(due) >= limit:
+                break
+        if due and self._log is not None:
+            self._write(['D', [call.call_id for call in due]])
+            self._log.flush()
+        return due
+
+    def _replay(self, path: str):
+        live = {}  # type: Dict[int, list]
+        last_id = 0
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record[0] == 'A':
+                    live[record[1]] = record
+                    last_id = max(last_id, record[1])
+                elif record[0] == 'C':
+                    live.pop(record[1], None)
+                elif record[0] == 'D':
+                    for call_id in record[1]:
+                        live.pop(call_id, None)
+                elif record[0] == 'N':  # следующий call_id на момент compact
+                    last_id = max(last_id, record[1] - 1)
+        self._ids = itertools.count(last_id + 1)
+        for _, call_id, date, priority, payload in live.values():
+            date = datetime.fromisoformat(date)
+            entry = _Entry(call_id, date, self._tick_of(date), priority, payload)
+            self._entries[call_id] = entry
+            self._place(entry)
+
+    def compact(self):
+        """ Переписывает журнал: только звонки, которые еще в очереди """
+        if self.log_path is None:
+            return
+        self._log.close()
+        temporary = self.log_path + '.tmp'
+        next_id = next(self._ids)
+        self._ids = itertools.count(next_id)
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(['N', next_id]) + '\n')
+            for entry in sorted(self._entries.values(), key=_BY_ID):
+                f.write(self._add_record(entry) + '\n')
+        os.replace(temporary, self.log_path)
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,237 @@
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+STATUS_DELIVERED = 'delivered'
+STATUS_FAILED = 'failed'
+
+
+class SmsMessage(NamedTuple):
+    message_id: int
+    dest_number: str
+    text: str
+    channel: str
+
+
+class FakeSmsGateway:
+    """ SMS шлюз для нагрузочного тестирования: каждый send_batch – один запрос с задержкой latency
+
+    Сообщение не доставляется с вероятностью failure_rate. requests – количество запросов,
+    messages – количество принятых сообщений по каналам.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.messages = {}  # type: Dict[str, int]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send_batch(self, channel: str, messages: List[SmsMessage]) -> List[str]:
+        """ Отправляет пакет сообщений одного канала, возвращает статусы доставки по порядку """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            self.messages[channel] = self.messages.get(channel, 0) + len(messages)
+            return [STATUS_FAILED if self.failure_rate and self._random.random() < self.failure_rate
+                    else STATUS_DELIVERED for _ in messages]
+
+
+class TokenBucket:
+    """ Ограничение скорости: rate токенов в секунду, не больше burst накопленных """
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: Optional[float] = None, now: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.burst = max(burst if burst is not None else rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, count: int, now: float) -> int:
+        """ Забирает до count токенов, возвращает сколько получилось """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        taken = min(count, int(self.tokens))
+        self.tokens -= taken
+        return taken
+
+    def delay(self, now: float) -> float:
+        """ Время до появления следующего токена """
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        return max(0.0, (1 - tokens) / self.rate)
+
+
+class SmsDispatcher:
+    """ Неблокирующая отправка SMS из логики звонка пакетами по каналам
+
+    send / send_many только ставят сообщения в очередь своего канала и сразу возвращают управление,
+    фоновый поток отправляет их пакетами до batch_size сообщений одного канала за запрос
+    gateway.send_batch(channel, messages). Скорость каждого канала ограничена token bucket:
+    rate сообщений в секунду (число или {channel: rate}, каналы не из словаря – default_rate),
+    с накоплением до burst. Одинаковые (dest_number, text) в пределах dedup_window секунд
+    отбрасываются. Статусы доставки приходят асинхронно в on_report(message, status) из фонового потока,
+    исключения on_report не останавливают отправку и считаются в report_errors;
+    delivered, failed и duplicates – счетчики. flush ждет отправки всего, что в очереди.
+
+    :param gateway: объект с методом send_batch(channel, messages) -> [status, ...], например FakeSmsGateway
+    """
+
+    def __init__(self, gateway, rate: Union[float, Dict[str, float]] = 10.0, default_rate: float = 10.0,
+                 burst: Optional[float] = None, batch_size: int = 100, dedup_window: float = 300.0,
+                 on_report: Optional[Callable[[SmsMessage, str], None]] = None):
+        self.gateway = gateway
+        self.rate = rate
+        self.default_rate = default_rate
+        self.burst = burst
+        self.batch_size = batch_size
+        self.dedup_window = dedup_window
+        self.on_report = on_report
+        self.enqueued = 0
+        self.duplicates = 0
+        self.delivered = 0
+        self.failed = 0
+        self.requests = 0
+        self.report_errors = 0
+        self._ids = itertools.count(1)
+        self._queues = {}  # type: Dict[str, Deque[SmsMessage]]
+        self._buckets = {}  # type: Dict[str, TokenBucket]
+        self._recent = {}  # type: Dict[Tuple[str, str], float]
+        self._expiry = deque()  # type: Deque[Tuple[float, Tuple[str, str]]]
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='sms-dispatcher', daemon=True)
+        self._thread.start()
+
+    def _bucket(self, channel: str) -> TokenBucket:
+        bucket = self._buckets.get(channel)
+        if bucket is None:
+            rate = self.rate if not isinstance(self.rate, dict) else self.rate.get(channel, self.default_rate)
+            bucket = self._buckets[channel] = TokenBucket(rate, self.burst)
+        return bucket
+
+    def _duplicate(self, key: Tuple[str, str], now: float) -> bool:
+        """ key отправлялся в пределах dedup_window; иначе запоминается """
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            moment, expired = expiry.popleft()
+            if self._recent.get(expired) == moment:
+                del self._recent[expired]
+        if key in self._recent:
+            return True
+        if self.dedup_window > 0:
+            moment = now + self.dedup_window
+            self._recent[key] = moment
+            expiry.append((moment, key))
+        return False
+
+    def _enqueue(self, dest_number: str, text: str, channel: str, now: float) -> Optional[int]:
+        if self._duplicate((dest_number, text), now):
+            self.duplicates += 1
+            return None
+        message = SmsMessage(next(self._ids), dest_number, text, channel)
+        queue = self._queues.get(channel)
+        if queue is None:
+            queue = self._queues[channel] = deque()
+            self._bucket(channel)
+        queue.append(message)
+        self.enqueued += 1
+        self._pending += 1
+        return message.message_id
+
+    def send(self, dest_number: str, text: str, channel: str) -> Optional[int]:
+        """ Ставит сообщение в очередь, возвращает message_id или None для повтора в пределах dedup_window """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('SmsDispatcher is closed')
+            message_id = self._enqueue(dest_number, text, channel, time.monotonic())
+            if message_id is not None:
+                self._ready.notify()
+            return message_id
+
+    def send_many(self, messages: Iterable[Tuple[str, str, str]]) -> List[Optional[int]]:
+        """ Ставит в очередь сообщения (dest_number, text, channel) под одной блокировкой """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('SmsDispatcher is closed')
+            now = time.monotonic()
+            ids = [self._enqueue(dest_number, text, channel, now) for dest_number, text, channel in messages]
+            self._ready.notify()
+            return ids
+
+    def _take(self, now: float) -> Tuple[List[Tuple[str, List[SmsMessage]]], Optional[float]]:
+        """ Пакеты каналов, которые можно отправить сейчас, и время ожидания следующих токенов """
+        batches = []
+        wait = None
+        for channel, queue in self._queues.items():
+            if not queue:
+                continue
+            bucket = self._buckets[channel]
+            count = bucket.take(min(len(queue), self.batch_size), now)
+            if count:
+                batches.append((channel, [queue.popleft() for _ in range(count)]))
+            if queue:
+                delay = bucket.delay(now)
+                wait = delay if wait is None else min(wait, delay)
+        return batches, wait
+
+    def _send(self, channel: str, batch: List[SmsMessage]):
+        try:
+            statuses = self.gateway.send_batch(channel, batch)
+        except Exception:
+            statuses = [STATUS_FAILED] * len(batch)
+        delivered = sum(1 for status in statuses if status == STATUS_DELIVERED)
+        with self._lock:
+            self.requests += 1
+            self.delivered += delivered
+            self.failed += len(batch) - delivered
+        if self.on_report is not None:
+            for message, status in zip(batch, statuses):
+                try:
+                    self.on_report(message, status)
+                except Exception:
+                    with self._lock:
+                        self.report_errors += 1
+
+    def _run(self):
+        while True:
+            with self._lock:
+                batches, wait = self._take(time.monotonic())
+                if not batches:
+                    if self._closed and not self._pending:
+                        return
+                    self._ready.wait(wait)
+                    continue
+            try:
+                for channel, batch in batches:
+                    self._send(channel, batch)
+            finally:
+                with self._lock:
+                    self._pending -= sum(len(batch) for _, batch in batches)
+                    if not self._pending:
+                        self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """ Ждет отправки всех сообщений очереди, False – если не дождались за timeout секунд """
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def pending(self) -> int:
+        """ Сообщения в очереди и в отправке """
+        return self._pending
+
+    def close(self, timeout: Optional[float] = None):
+        """ Запрещает новые сообщения, дожидается отправки очереди и останавливает фоновый поток """
+        with self._lock:
+            self._closed = True
+            self._ready.notify_all()
+        self._thread.join(timeout)
@@ -0,0 +1,234 @@
+import atexit
+import collections
+import json
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+StatsRecord = Tuple[int, str, Optional[str], str]  # (call_id, action, name, data)
+
+POLICY_DROP_OLDEST = 'drop_oldest'
+POLICY_DROP_NEWEST = 'drop_newest'
+POLICY_BLOCK = 'block'
+
+
+class SqliteStatsSink:
+    """ Запись dialog_stats в таблицу SQLite (журнал WAL), пакет – одна транзакция executemany """
+
+    def __init__(self, path: str, table: str = 'dialog_stats'):
+        self.path = path
+        self.table = table
+        # пишет то фоновый поток StatsBuffer, то поток flush – по очереди, под блокировкой StatsBuffer
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL без fsync на каждый коммит: пакеты при завершении звонков пишутся часто и небольшими
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS %s (call_id INTEGER, action TEXT, name TEXT, data TEXT)'
+                                 % table)
+        self._insert = 'INSERT INTO %s (call_id, action, name, data) VALUES (?, ?, ?, ?)' % table
+
+    def write(self, records: List[StatsRecord]):
+        with self._connection:
+            self._connection.executemany(self._insert, records)
+
+    def close(self):
+        self._connection.close()
+
+
+class FileStatsSink:
+    """ Запись dialog_stats в файл, по записи JSON на строку """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, records: List[StatsRecord]):
+        self._file.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class StatsBuffer:
+    """ Общий для звонков процесса буфер записей nn.log / nn.dump с пакетной записью в sink
+
+    Запись в буфер (put) не ждет sink: фоновый поток забирает накопленные записи пакетами до batch_size,
+    как только их набирается batch_size или раз в interval секунд, и пишет их одним sink.write.
+    Буфер ограничен capacity записями, при переполнении действует policy:
+    - POLICY_DROP_OLDEST – вытесняется самая старая запись;
+    - POLICY_DROP_NEWEST – новая запись отбрасывается;
+    - POLICY_BLOCK – put ждет места до block_timeout секунд, потом запись отбрасывается.
+    Отброшенные записи считаются в dropped. Пакеты пишутся в sink по очереди и в порядке поступления записей.
+    Ошибки sink.write считаются в errors, пакет возвращается в начало буфера и пишется повторно
+    не раньше чем через interval секунд.
+
+    При завершении звонка LocalNeuroNetLibrary.end_call вызывает hangup: с hangup_timeout > 0 диалог ждет
+    (не дольше hangup_timeout секунд), пока фоновый поток запишет все записи, поставленные до завершения
+    звонка, с hangup_timeout=0 – только будит фоновый поток. flush и close синхронно пишут все, что
+    есть в буфере; при выходе процесса (atexit) буфер дописывается сам, если не был закрыт.
+    Записи все же теряются: вытесненные и отброшенные политикой переполнения (dropped), при ошибках sink,
+    не прошедших до close или выхода процесса, и при аварийном завершении процесса (kill -9, os._exit) –
+    все, что еще в буфере.
+
+    :param sink: объект с методами write(records) и close(), например SqliteStatsSink
+    :param hangup_timeout: сколько секунд nn.end_call ждет записи статистики звонка
+    """
+
+    def __init__(self, sink, capacity: int = 65536, batch_size: int = 1024, interval: float = 0.1,
+                 policy: str = POLICY_DROP_OLDEST, block_timeout: float = 1.0, hangup_timeout: float = 0.0):
+        if policy not in (POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_BLOCK):
+            raise ValueError('Invalid stats buffer policy: %r' % (policy,))
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.interval = interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.hangup_timeout = hangup_timeout
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self._settled = 0  # записи, покинувшие буфер насовсем: записанные в sink или вытесненные
+        self._records = collections.deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._space = threading.Condition(self._lock)
+        self._settle = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='stats-buffer', daemon=True)
+        self._thread.start()
+        # фоновый поток – daemon и не доживает до конца процесса: буфер дописывается при выходе
+        atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._records)
+
+    def put(self, record: StatsRecord) -> bool:
+        """ Добавляет запись в буфер, False – если запись отброшена """
+        with self._lock:
+            records = self._records
+            if len(records) >= self.capacity:
+                if self.policy == POLICY_DROP_OLDEST:
+                    records.popleft()
+                    self.dropped += 1
+                    self._settled += 1
+                elif self.policy == POLICY_DROP_NEWEST or not self._wait_space():
+                    self.dropped += 1
+                    return False
+            records.append(record)
+            self.enqueued += 1
+            if len(records) == self.batch_size:
+                self._ready.notify()
+            return True
+
+    def put_many(self, records: Iterable[StatsRecord]) -> int:
+        """ Добавляет записи, возвращает количество принятых """
+        return sum(1 for record in records if self.put(record))
+
+    def _wait_space(self) -> bool:
+        deadline = time.monotonic() + self.block_timeout
+        while len(self._records) >= self.capacity:
+            self._ready.notify()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._closed:
+                return False
+            self._space.wait(remaining)
+        return True
+
+    def _take(self, limit: int) -> List[StatsRecord]:
+        records = self._records
+        count = min(limit, len(records))
+        batch = [records.popleft() for _ in range(count)]
+        if batch:
+            self._space.notify_all()
+        return batch
+
+    def _restore(self, batch: List[StatsRecord]):
+        """ Возвращает незаписанный пакет в начало буфера, лишнее сверх capacity отбрасывается с начала пакета """
+        records = self._records
+        excess = min(max(0, len(records) + len(batch) - self.capacity), len(batch))
+        self.dropped += excess
+        self._settled += excess
+        records.extendleft(reversed(batch[excess:]))
+
+    def _write(self, limit: int) -> Optional[int]:
+        """ Забирает из буфера и пишет в sink до limit записей, вызывается под _write_lock.
+        None – sink.write завершился ошибкой, пакет возвращен в буфер
+        """
+        with self._lock:
+            batch = self._take(limit)
+        if batch:
+            try:
+                self.sink.write(batch)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                    self._restore(batch)
+                return None
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+                self._settled += len(batch)
+                self._settle.notify_all()
+        return len(batch)
+
+    def _run(self):
+        failed = False
+        while True:
+            with self._lock:
+                if not self._closed and (failed or len(self._records) < self.batch_size):
+                    self._ready.wait(self.interval)
+                if self._closed:
+                    return
+            with self._write_lock:
+                count = self._write(self.batch_size)
+                while count == self.batch_size:
+                    count = self._write(self.batch_size)
+            failed = count is None
+
+    def wake(self):
+        """ Будит фоновый поток, чтобы он записал накопленные записи, не дожидаясь batch_size или interval """
+        with self._lock:
+            self._ready.notify()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """ Будит фоновый поток и ждет записи всех уже поставленных записей, False – не дождались за timeout """
+        with self._lock:
+            target = self.enqueued
+            self._ready.notify()
+            return self._settle.wait_for(lambda: self._settled >= target, timeout)
+
+    def hangup(self):
+        """ Завершение звонка: ждет записи его статистики до hangup_timeout секунд или только будит поток """
+        if self.hangup_timeout > 0:
+            self.wait(self.hangup_timeout)
+        else:
+            self.wake()
+
+    def flush(self) -> int:
+        """ Синхронно пишет в sink все записи буфера, возвращает их количество.
+        При ошибке sink.write останавливается, неотправленные записи остаются в буфере
+        """
+        written = 0
+        with self._write_lock:
+            while True:
+                count = self._write(self.batch_size)
+                if not count:
+                    return written
+                written += count
+
+    def close(self):
+        """ Останавливает фоновый поток, дописывает буфер и закрывает sink """
+        with self._lock:
+            self._closed = True
+            self._ready.notify_all()
+            self._space.notify_all()
+        self._thread.join()
+        atexit.unregister(self.flush)
+        self.flush()
+        self.sink.close()
@@ -0,0 +1,391 @@
+import dis
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+from types import CodeType
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from ..voice import InvalidCallStateError, NeuroVoiceLibrary, NoneStrList
+from .nlu import LocalNeuroNluLibrary, LocalNeuroNluRecognitionRequest, LocalNeuroNluRecognitionResult, parse_names
+from .profiler import Profiler
+
+CALL_STATE_RUNNING = 'running'
+CALL_STATE_HANGUP = 'hangup'
+
+
+def parse_detect_policy(detect_policy) -> Optional[Tuple[NoneStrList, NoneStrList, Optional[int], str]]:
+    """ Приводит detect_policy из nv.listen к полному виду (search_entities, search_intents, characters_count, operator)
+
+    60 -> (None, None, 60, 'AND')
+    'hello,bye' -> ('hello,bye', None, None, 'AND')
+    ('bye', 'callback') -> ('bye', 'callback', None, 'OR')
+    """
+    if detect_policy is None:
+        return None
+    if isinstance(detect_policy, int):
+        return None, None, detect_policy, 'AND'
+    if isinstance(detect_policy, (str, list)):
+        return detect_policy, None, None, 'AND'
+    search_entities, search_intents, characters_count, operator = (tuple(detect_policy) + (None, None, None, 'OR'))[:4]
+    return search_entities, search_intents, characters_count, (operator or 'OR').upper()
+
+
+_JUMPS = frozenset(('JUMP_FORWARD', 'JUMP_ABSOLUTE', 'JUMP', 'JUMP_NO_INTERRUPT'))
+_TAIL_CALLS = {}  # type: Dict[CodeType, FrozenSet[int]]
+_UNIT_CODES = set()  # type: Set[CodeType]  # код функций, декорированных check_call_state в режиме trampoline
+
+
+def _tail_call_offsets(code: CodeType) -> FrozenSet[int]:
+    """ Смещения инструкций вызова (вместе с их CACHE в python 3.11+), результат которых сразу возвращается:
+    следующая инструкция – RETURN_VALUE или безусловный переход на RETURN_VALUE (`return a() if x else b()`)
+    """
+    instructions = list(dis.get_instructions(code))
+    returns = {instruction.offset for instruction in instructions if instruction.opname == 'RETURN_VALUE'}
+    offsets = set()
+    for instruction, following in zip(instructions, instructions[1:]):
+        if not instruction.opname.startswith('CALL'):
+            continue
+        if following.offset in returns or following.opname in _JUMPS and following.argval in returns:
+            offsets.update(range(instruction.offset, following.offset, 2))
+    return frozenset(offsets)
+
+
+def _is_tail_call(frame) -> bool:
+    """ Результат текущего вызова из frame сразу возвращается: `return unit()` """
+    code = frame.f_code
+    offsets = _TAIL_CALLS.get(code)
+    if offsets is None:
+        offsets = _TAIL_CALLS[code] = _tail_call_offsets(code)
+    return frame.f_lasti in offsets
+
+
+class Transition:
+    """ Токен перехода в следующий юнит для исполнения без рекурсии (см. ScriptExecutor(trampoline=True)) """
+    __slots__ = ('unit', 'args', 'kwargs')
+
+    def __init__(self, unit, args=(), kwargs=None):
+        self.unit = unit
+        self.args = args
+        self.kwargs = kwargs or {}
+
+    def __call__(self):
+        return self.unit(*self.args, **self.kwargs)
+
+    def __repr__(self):
+        return 'Transition(%s)' % getattr(self.unit, '__name__', self.unit)
+
+
+class CallState:
+    """ Состояние текущего звонка, общее для nv и всех юнитов, декорированных check_call_state
+
+    Ячейка создается один раз на nv и переиспользуется между звонками (reset меняет поля на месте),
+    поэтому декоратор захватывает ее при декорировании, и проверка статуса на каждом переходе –
+    чтение одного атрибута running без обращения к nv. running сбрасывается в момент завершения звонка.
+    """
+    __slots__ = ('state', 'running', 'in_unit')
+
+    def __init__(self):
+        self.set(CALL_STATE_RUNNING)
+        self.in_unit = False
+
+    def set(self, state: str):
+        self.state = state
+        self.running = state == CALL_STATE_RUNNING
+
+
+def check_call_state(nv: 'LocalNeuroVoiceLibrary'):
+    """ Декоратор для проверки статуса звонка в пользовательских функциях (см. libneuro.check_call_state)
+
+    Статус читается из nv.call (CallState), а не запрашивается у nv: пока звонок идет, проверка – одно
+    чтение атрибута. После завершения звонка (nv.hangup или абонент положил трубку) первый же вызов
+    декорированной функции бросает InvalidCallStateError.
+
+    Если nv.trampoline включен, хвостовой вызов декорированной функции изнутри другой декорированной функции
+    (результат сразу возвращается: `return hello_main_play_and_detect()`) не исполняется, а возвращает
+    Transition, который исполнит цикл ScriptExecutor, и стек не растет от хода к ходу. Вызывающая функция
+    определяется по коду кадра (код декорированных функций запоминается при декорировании), хвостовой
+    вызов – по ее байткоду. Остальные вложенные вызовы (`name = get_name()`, а также любые вызовы
+    из недекорированных функций) исполняются сразу вместе со своими переходами и возвращают значение.
+    Режим выбирается при декорировании, nv.trampoline задается при создании nv.
+
+    Если у nv задан profiler, время каждого исполнения юнита пишется в него как 'unit:<имя функции>'.
+
+    Пример:
+    @check_call_state(nv)
+    def hello_main():
+        ...
+    """
+    call = nv.call
+    profiler = nv.profiler
+
+    def decorator(func):
+        if nv.trampoline and hasattr(func, '__code__'):
+            _UNIT_CODES.add(func.__code__)
+        if profiler is not None:
+            func = profiler.wrap('unit:%s' % func.__name__, func)
+        if nv.trampoline:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                nested = call.in_unit
+                if nested:
+                    caller = sys._getframe(1)
+                    if caller.f_code in _UNIT_CODES and _is_tail_call(caller):
+                        return Transition(wrapper, args, kwargs)
+                if not call.running:
+                    raise InvalidCallStateError('Call is not running: %s' % call.state)
+                call.in_unit = True
+                try:
+                    result = func(*args, **kwargs)
+                    if nested:
+                        # значение нужно вызывающему юниту сейчас: переходы исполняются здесь, как на верхнем уровне
+                        call.in_unit = False
+                        while isinstance(result, Transition):
+                            result = result()
+                    return result
+                finally:
+                    call.in_unit = nested
+            return wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not call.running:
+                raise InvalidCallStateError('Call is not running: %s' % call.state)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LocalNeuroVoiceLibrary(NeuroVoiceLibrary):
+    """ Реализация nv в памяти процесса
+
+    Реплики абонента задаются списком utterances в reset(): каждый nv.listen забирает следующую реплику,
+    None – тишина. Когда реплики заканчиваются, абонент кладет трубку.
+    Реплика – строка (частичные гипотезы ASR получаются по словам) или список гипотез, последняя – итоговая.
+    Если у nv.listen задан detect_policy, speech_input_detector проверяется на каждой гипотезе,
+    и первое срабатывание пишется в actions как ('barge_in', гипотеза).
+    Все действия бота пишутся в actions в виде кортежей (action, *args).
+
+    :param trampoline: режим исполнения юнитов без рекурсии (см. check_call_state)
+    :param profiler: Profiler для времени юнитов (см. check_call_state)
+
+    turn_hooks – функции без аргументов, вызываемые на границе хода: перед ожиданием реплики в nv.listen
+    и при завершении звонка (ScriptExecutor подключает сюда nn.flush), hangup_hooks – вызываемые только
+    при завершении звонка, после turn_hooks (nn.end_call).
+    """
+
+    def __init__(self, nlu: LocalNeuroNluLibrary, trampoline: bool = False, profiler: Optional[Profiler] = None):
+        self.nlu = nlu
+        self.trampoline = trampoline
+        self.profiler = profiler
+        self.turn_hooks = []  # type: List[Callable[[], None]]
+        self.hangup_hooks = []  # type: List[Callable[[], None]]
+        self.call = CallState()
+        self._defaults = {}
+        self._media_params = {}
+        self.reset()
+
+    def reset(self, utterances: Iterable[Optional[str]] = ()):
+        """ Начало нового звонка """
+        self.call.set(CALL_STATE_RUNNING)
+        self.call.in_unit = False
+        self.hangup_by = None
+        self.actions = []
+        self.transcription = []
+        self._utterances = iter(utterances)
+        self._listening = False
+        self.listen_options = {}
+        self._started = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        return self.call.state
+
+    @property
+    def in_unit(self) -> bool:
+        return self.call.in_unit
+
+    def is_running(self) -> bool:
+        return self.call.running
+
+    def _end_turn(self):
+        for hook in self.turn_hooks:
+            hook()
+
+    def _hangup(self, hangup_by: str):
+        self.call.set(CALL_STATE_HANGUP)
+        self.hangup_by = hangup_by
+        self._end_turn()
+        for hook in self.hangup_hooks:
+            hook()
+
+    def _action(self, *action) -> bool:
+        if not self.call.running:
+            return False
+        self.actions.append(action)
+        return True
+
+    def get_call_duration(self) -> int:
+        return int(time.monotonic() - self._started)
+
+    def get_call_transcription(self, return_format: str = NeuroVoiceLibrary.TRANSCRIPTION_FORMAT_RAW):
+        if return_format == self.TRANSCRIPTION_FORMAT_TXT:
+            return '; '.join('%s: %s' % (item['type'], item['message']) for item in self.transcription)
+        return [dict(item) for item in self.transcription]
+
+    def media_params(self, *args):
+        if len(args) == 1 and isinstance(args[0], str):
+            return self._media_params.get(args[0])
+        if len(args) == 1 and isinstance(args[0], dict):
+            self._media_params.update(args[0])
+        elif len(args) == 2:
+            self._media_params[args[0]] = args[1]
+        else:
+            raise ValueError('Invalid nv.media_params arguments: %r' % (args,))
+
+    def set_default(self, section, *args, **kwargs) -> None:
+        if len(args) == 1 and isinstance(args[0], dict):
+            values = args[0]
+        elif len(args) == 2:
+            values = {args[0]: args[1]}
+        elif not args:
+            values = kwargs
+        else:
+            raise ValueError('Invalid nv.set_default arguments: %r' % (args,))
+        self._defaults.setdefault(section, {}).update(values)
+
+    def get_default(self, section) -> Dict[str, Union[int, str]]:
+        return dict(self._defaults.get(section, {}))
+
+    def say(self, name: str, value: Union[str, None] = None) -> None:
+        if self._action('say', name, value):
+            self.transcription.append({'type': 'bot', 'message': name if value is None else '%s %s' % (name, value)})
+
+    def background(self, name: Union[str, None]):
+        self._action('background', name)
+
+    def template_synthesize(self, template_audio_file, template_text, replacement_text_list):
+        self._action('template_synthesize', template_audio_file, template_text, replacement_text_list)
+
+    def synthesize(self, text: str, ssml: bool = False):
+        if self._action('synthesize', text, ssml):
+            self.transcription.append({'type': 'bot', 'message': text})
+
+    def random_sound(self, min_delay: Union[None, int] = None, max_delay: Union[None, int] = None):
+        defaults = self._defaults.get('random_sound', {})
+        min_delay = defaults.get('min_delay') if min_delay is None else min_delay
+        max_delay = defaults.get('max_delay') if max_delay is None else max_delay
+        if min_delay is None or max_delay is None:
+            raise ValueError('nv.random_sound requires min_delay and max_delay')
+        self._action('random_sound', min_delay, max_delay)
+
+    def bridge(self, uri: str, channel: str = None, **kwargs):
+        self._action('bridge', uri, channel, kwargs)
+
+    def hangup(self):
+        if self._action('hangup'):
+            self._hangup('bot')
+
+    def exec_after(self, sec: int, func, *args, **kwargs):
+        self._action('exec_after', sec, func, args, kwargs)
+
+    def detect_speech_start(self, detect_policy=None,
+                            entities=None, entities_exclude=None,
+                            intents=None, intents_exclude=None,
+                            context=None, use_neuro_api=False,
+                            **kwargs):
+        self._action('detect_speech_start', detect_policy)
+
+    def hold_and_call(self, msisdn: str, channel: str = None,
+                      script: (str, int, UUID) = None, entry_point: str = None,
+                      transport: str = 'sip',
+                      use_default_prefix=False):
+        self._action('hold_and_call', msisdn, channel, script, entry_point)
+
+    def bridge_to_caller(self):
+        self._action('bridge_to_caller')
+
+    def detect_speech_stop(self):
+        self._action('detect_speech_stop')
+
+    def _next_utterance(self) -> Optional[str]:
+        """ Следующая реплика абонента, если реплик не осталось – абонент кладет трубку """
+        try:
+            return next(self._utterances)
+        except StopIteration:
+            self._hangup('caller')
+            return None
+
+    @contextmanager
+    def listen(self, detect_policy: Union[Tuple[NoneStrList, NoneStrList], str, int, list, None] = None,
+               entities: NoneStrList = None, entities_exclude: NoneStrList = None,
+               intents: NoneStrList = None, intents_exclude: NoneStrList = None,
+               context=None, use_neuro_api=False,
+               **kwargs):
+        if self._listening:
+            raise RuntimeError('nv.listen can not be started inside nv.listen')
+        result = LocalNeuroNluRecognitionResult()
+        if not self.call.running:
+            yield result
+            return
+        self.listen_options = self.get_default('listen')
+        self.listen_options.update(kwargs)
+        self._end_turn()
+        self._listening = True
+        try:
+            yield result
+        finally:
+            self._listening = False
+        utterance = self._next_utterance()
+        if utterance is None:
+            return
+        if isinstance(utterance, str):
+            words = utterance.split()
+            hypotheses = [' '.join(words[:i]) for i in range(1, len(words))] + [utterance]
+        else:
+            hypotheses = list(utterance)
+            utterance = hypotheses[-1]
+        policy = parse_detect_policy(detect_policy)
+        if policy is not None:
+            self._detect(hypotheses, policy, entities, entities_exclude, intents, intents_exclude)
+        self.transcription.append({'type': 'human', 'message': utterance})
+        request = LocalNeuroNluRecognitionRequest(entities, intents, entities_exclude, intents_exclude)
+        self.nlu.recognize(result, utterance, request, context=context, use_neuro_api=use_neuro_api,
+                           fuzzy=self.listen_options.get('fuzzy', False))
+
+    def _detect(self, hypotheses, policy, entities, entities_exclude, intents, intents_exclude):
+        """ Проверка speech_input_detector по частичным гипотезам с потоковым поиском сущностей """
+        last = len(hypotheses) - 1
+        if policy[0] is None and policy[1] is None \
+                and self.speech_input_detector is LocalNeuroVoiceLibrary.speech_input_detector:
+            # правило только по количеству символов, поиск сущностей не нужен
+            for hypothesis in hypotheses:
+                if self.speech_input_detector(hypothesis, [], [], *policy):
+                    self.actions.append(('barge_in', hypothesis))
+                    return
+            return
+        stream = self.nlu.stream(entities, entities_exclude, intents, intents_exclude)
+        for i, hypothesis in enumerate(hypotheses):
+            found_entities, found_intents = stream.feed(hypothesis, final=i == last)
+            if self.speech_input_detector(stream.text, list(found_entities), list(found_intents), *policy):
+                self.actions.append(('barge_in', hypothesis))
+                return
+
+    @staticmethod
+    def speech_input_detector(recognition_result: str,
+                              found_entities: list,
+                              found_intents: list,
+                              *args) -> bool:
+        """ Правила остановки проигрывания по detect_policy (см. nv.listen) """
+        search_entities, search_intents, characters_count, operator = args
+        checks = []
+        if search_entities is not None:
+            checks.append(bool(parse_names(search_entities).intersection(found_entities)))
+        if search_intents is not None:
+            checks.append(bool(parse_names(search_intents).intersection(found_intents)))
+        if characters_count is not None:
+            checks.append(len(recognition_result or '') >= characters_count)
+        if not checks:
+            return False
+        return any(checks) if operator == 'OR' else all(checks)
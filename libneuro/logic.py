@@ -0,0 +1,59 @@
+from typing import Callable, Mapping, Optional, Tuple
+
+from .nlu import MatchRules
+
+Unit = Callable[[], object]
+
+
+def condition_label(entity: str, value: str) -> str:
+    """ Подпись условия для nn.log('condition', ...): ('repeat', 'true') -> 'repeat=True' """
+    if value in ('true', 'false'):
+        value = value.capitalize()
+    return '%s=%s' % (entity, value)
+
+
+class TransitionTable:
+    """ Таблица переходов юнита по распознанным сущностям
+
+    Заменяет цепочку проверок r.has_entity(x) / r.entity(x) == 'true' в *_logic.
+    Правила компилируются в MatchRules, выбор перехода – r.match(): по одному поиску в словаре правил
+    на найденную сущность, время не зависит от количества правил.
+    При совпадении нескольких правил срабатывает объявленное раньше, как и в цепочке if.
+    Условия логируются автоматически через nn.log('condition', ...).
+
+    :param rules: упорядоченный словарь {(entity, value): unit}
+    :param null: юнит для пустого результата (тишина), логируется condition NULL
+    :param default: юнит, если сущностей нет (логируется condition DEFAULT) или ни одно правило не подошло
+
+    Пример:
+    hello_transitions = TransitionTable({
+        ('repeat', 'true'): hello_repeat,
+        ('operator', 'true'): goodbye_operator_demand,
+    }, null=hello_null, default=hello_default)
+
+    def hello_logic(r):
+        ...
+        return hello_transitions.dispatch(nn, r)
+    """
+
+    def __init__(self, rules: Mapping[Tuple[str, str], Unit],
+                 null: Optional[Unit] = None, default: Optional[Unit] = None):
+        self.rules = dict(rules)
+        self.null = null
+        self.default = default
+        self._rules = MatchRules({(entity, value): (condition_label(entity, value), unit)
+                                  for (entity, value), unit in rules.items()})
+
+    def dispatch(self, nn, r):
+        """ Выбирает и вызывает следующий юнит по результату распознавания r """
+        if not r:
+            nn.log('condition', 'NULL')
+            return self.null() if self.null is not None else None
+        if not r.has_entities():
+            nn.log('condition', 'DEFAULT')
+            return self.default() if self.default is not None else None
+        rule = r.match(self._rules)
+        if rule is None:
+            return self.default() if self.default is not None else None
+        nn.log('condition', rule[0])
+        return rule[1]()
@@ -1,7 +1,7 @@
 from abc import ABCMeta, abstractmethod
 from datetime import datetime
 from uuid import UUID
-from typing import Any, List, Dict, Optional, Type, Union
+from typing import Any, Iterable, List, Dict, Optional, Tuple, Type, Union
 
 
 class DialogEnumResult:
@@ -238,6 +238,33 @@ class NeuroNetLibrary:
         """
         pass
 
+    @abstractmethod
+    def call_many(self, specs: Iterable[Union[str, tuple, Dict[str, Any]]], chunk_size: int = 1000,
+                  errors: Optional[List[Tuple[int, str]]] = None) -> int:
+        """ Пакетное планирование звонков (загрузка кампании)
+
+        Источник читается по мере обработки и целиком в память не загружается: звонки проверяются,
+        даты разбираются и звонки ставятся в очередь порциями по chunk_size.
+
+        Аргументы:
+        :param specs: итерируемый источник звонков, каждый – словарь с аргументами nn.call
+               (обязателен msisdn), кортеж аргументов nn.call по порядку или строка msisdn
+        :param chunk_size: количество звонков в одной вставке в очередь
+        :param errors: если передан список, некорректные звонки пропускаются и добавляются в него
+               как (номер в источнике, описание ошибки), иначе бросается ValueError
+               (звонки из предыдущих порций при этом уже запланированы)
+        :return int: количество запланированных звонков
+
+        Пример:
+        nn.call_many({'msisdn': msisdn, 'date': '2020-05-20 14:20:00', 'entry_point': 'main_online'}
+                     for msisdn in msisdns)
+
+        errors = []
+        with open('campaign.csv') as f:
+            count = nn.call_many(csv.DictReader(f), errors=errors)
+        """
+        pass
+
     @abstractmethod
     def send_sms(self, dest_number: str, text: str, channel: str):
         """ Отправка SMS
@@ -252,6 +279,24 @@ class NeuroNetLibrary:
         """
         pass
 
+    @abstractmethod
+    def send_sms_many(self, messages: Iterable[Union[tuple, Dict[str, str]]], channel: str = None) -> int:
+        """ Пакетная отправка SMS
+
+        Сообщения ставятся в очередь и отправляются пакетами по каналам, не блокируя диалог.
+        Одинаковые (номер, текст) в пределах окна дедупликации повторно не отправляются.
+
+        Аргументы:
+        :param messages: сообщения – кортежи (dest_number, text) или (dest_number, text, channel)
+               или словари с этими ключами
+        :param str channel: канал для сообщений, в которых он не указан
+        :return int: количество поставленных в очередь сообщений (без повторов)
+
+        Пример:
+        nn.send_sms_many([(msisdn, 'Ваш код: 1234'), (manager_msisdn, 'Новая заявка')], 'ispirin_test_client')
+        """
+        pass
+
     @abstractmethod
     def log(self, *args):
         """ Логирование данных в лог теущего диалога или звонка
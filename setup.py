@@ -8,6 +8,7 @@ setup(
     url='https://git.neuro.net/neurov2/libneuro-interface',               # package URL
     install_requires=[],                    # list of packages this package depends
                                             # on.
-    packages=['libneuro'],                  # List of module names that installing
+    extras_require={'numpy': ['numpy']},    # fuzzy matching in libneuro.local
+    packages=['libneuro', 'libneuro.local'], # List of module names that installing
                                             # this package will provide.
 )
\ No newline at end of file
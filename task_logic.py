@@ -410,8 +410,55 @@ def goodbye_internet_green():
 
 # //--//--//--//--//--//--//
 
+# Таблицы переходов *_logic: {(сущность, значение): юнит}. Выбор перехода – в самом скрипте,
+# только через nn и публичные методы r, которые есть и у Logic Executor
+
+
+def compile_transitions(rules):
+    """ {(entity, value): unit} -> {entity: {value: (порядок правила, условие для nn.log, unit)}} """
+    table = {}
+    for position, ((entity, value), unit) in enumerate(rules.items()):
+        label = '%s=%s' % (entity, value.capitalize() if value in ('true', 'false') else value)
+        table.setdefault(entity, {}).setdefault(value, (position, label, unit))
+    return table
+
+
+def transition(r, table, null, default):
+    """ Юнит перехода по таблице compile_transitions, условие пишется в nn.log('condition', ...)
+
+    По одному r.entity() на сущность таблицы, при совпадении нескольких правил – объявленное раньше,
+    как в цепочке if. Юнит возвращается, а не вызывается: вызов остается в *_logic.
+    """
+    if not r:
+        nn.log('condition', 'NULL')
+        return null
+    if not r.has_entities():
+        nn.log('condition', 'DEFAULT')
+        return default
+    best = None
+    for entity, values in table.items():
+        rule = values.get(r.entity(entity))
+        if rule is not None and (best is None or rule[0] < best[0]):
+            best = rule
+    if best is None:
+        return default
+    nn.log('condition', best[1])
+    return best[2]
+
+# //--//--//--//--//--//--//
+
 # Логика условий для hello_unit
 
+hello_transitions = compile_transitions({
+    ('repeat', 'true'): hello_repeat,
+    ('payment_problem', 'true'): payment_main,
+    ('internet_problem', 'true'): internet_main,
+    ('tv_problem', 'true'): tv_main,
+    ('robot', 'true'): hello_robot,
+    ('operator', 'true'): goodbye_operator_demand,
+})
+
+
 @check_call_state(nv)
 def hello_logic(r):
     """Функция проверки сущностей """
@@ -426,50 +473,23 @@ def hello_logic(r):
             nn.log("Recursive execution detected")
             return
 
-    if not r:
-        nn.log("condition", "NULL")
-        return hello_null()
-
-    if not r.has_entities():
-        nn.log('condition', 'DEFAULT')
-        return hello_default()
-
-    if r.has_entity("repeat"):
-        if r.entity("repeat") == 'true':
-            nn.log("condition", "repeat=True")
-            return hello_repeat()
-
-    if r.has_entity("payment_problem"):
-        if r.entity("payment_problem") == 'true':
-            nn.log("condition", "payment_problem=True")
-            return payment_main()
-
-    if r.has_entity("internet_problem"):
-        if r.entity("internet_problem") == 'true':
-            nn.log("condition", "internet_problem=True")
-            return internet_main()
-
-    if r.has_entity("tv_problem"):
-        if r.entity("tv_problem") == 'true':
-            nn.log("condition", "tv_problem=True")
-            return tv_main()
-
-    if r.has_entity("robot"):
-        if r.entity("robot") == 'true':
-            nn.log("condition", "robot=True")
-            return hello_robot()
-
-    if r.has_entity("operator"):
-        if r.entity("operator") == 'true':
-            nn.log("condition", "operator=True")
-            return goodbye_operator_demand()
-
-    return hello_default()
+    return transition(r, hello_transitions, hello_null, hello_default)()
 
 # //--//--//--//--//--//--//
 
 # Логика условий для payment_unit
 
+payment_transitions = compile_transitions({
+    ('repeat', 'true'): payment_repeat,
+    ('operator', 'true'): goodbye_operator_demand,
+    ('pay_site', 'true'): payment_site,
+    ('offices', 'true'): payment_offices,
+    ('promise_pay', 'true'): payment_promise_pay,
+    ('confirm', 'true'): more_question_main,
+    ('confirm', 'false'): goodbye_main,
+})
+
+
 @check_call_state(nv)
 def payment_logic(r):
     nn.log('unit', 'payment_unit')
@@ -483,53 +503,21 @@ def payment_logic(r):
             nn.log("Recursive execution detected")
             return
 
-    if not r:
-        nn.log("condition", "NULL")
-        return payment_null()
-
-    if not r.has_entities():
-        nn.log('condition', 'DEFAULT')
-        return payment_default()
-
-    if r.has_entity("repeat"):
-        if r.entity("repeat") == 'true':
-            nn.log("condition", "repeat=True")
-            return payment_repeat()
-
-    if r.has_entity("operator"):
-        if r.entity("operator") == 'true':
-            nn.log("condition", "operator=True")
-            return goodbye_operator_demand()
-
-    if r.has_entity("pay_site"):
-        if r.entity("pay_site") == 'true':
-            nn.log("condition", "pay_site=True")
-            return payment_site()
-
-    if r.has_entity("offices"):
-        if r.entity("offices") == 'true':
-            nn.log("condition", "offices=True")
-            return payment_offices()
-
-    if r.has_entity("promise_pay"):
-        if r.entity("promise_pay") == 'true':
-            nn.log("condition", "promise_pay=True")
-            return payment_promise_pay()
-
-    if r.has_entity("confirm"):
-        if r.entity("confirm") == 'true':
-            nn.log("condition", "confirm=True")
-            return more_question_main()
-        if r.entity("confirm") == 'false':
-            nn.log("condition", "confirm=False")
-            return goodbye_main()
-
-    return payment_default()
+    return transition(r, payment_transitions, payment_null, payment_default)()
 
 # //--//--//--//--//--//--//
 
 # Логика условий для tv_unit
 
+tv_transitions = compile_transitions({
+    ('repeat', 'true'): tv_repeat,
+    ('robot', 'true'): tv_robot,
+    ('operator', 'true'): goodbye_operator_demand,
+    ('confirm', 'true'): more_question_main,
+    ('confirm', 'false'): goodbye_main,
+})
+
+
 @check_call_state(nv)
 def tv_logic(r):
     nn.log('unit', 'tv_unit')
@@ -543,43 +531,21 @@ def tv_logic(r):
             nn.log("Recursive execution detected")
             return
 
-    if not r:
-        nn.log("condition", "NULL")
-        return tv_null()
-
-    if not r.has_entities():
-        nn.log('condition', 'DEFAULT')
-        return tv_default()
-
-    if r.has_entity("repeat"):
-        if r.entity("repeat") == 'true':
-            nn.log("condition", "repeat=True")
-            return tv_repeat()
-
-    if r.has_entity("robot"):
-        if r.entity("robot") == 'true':
-            nn.log("condition", "robot=True")
-            return tv_robot()
-
-    if r.has_entity("operator"):
-        if r.entity("operator") == 'true':
-            nn.log("condition", "operator=True")
-            return goodbye_operator_demand()
-
-    if r.has_entity("confirm"):
-        if r.entity("confirm") == 'true':
-            nn.log("condition", "confirm=True")
-            return more_question_main()
-        if r.entity("confirm") == 'false':
-            nn.log("condition", "confirm=False")
-            return goodbye_main()
-
-    return tv_default()
+    return transition(r, tv_transitions, tv_null, tv_default)()
 
 # //--//--//--//--//--//--//
 
 # Логика условий для internet_unit
 
+internet_transitions = compile_transitions({
+    ('repeat', 'true'): internet_repeat,
+    ('robot', 'true'): internet_robot,
+    ('operator', 'true'): goodbye_operator_demand,
+    ('confirm', 'true'): goodbye_operator,
+    ('confirm', 'false'): internet_green_main,
+})
+
+
 @check_call_state(nv)
 def internet_logic(r):
     nn.log('unit', 'internet_unit')
@@ -593,43 +559,21 @@ def internet_logic(r):
             nn.log("Recursive execution detected")
             return
 
-    if not r:
-        nn.log("condition", "NULL")
-        return internet_null()
-
-    if not r.has_entities():
-        nn.log('condition', 'DEFAULT')
-        return internet_default()
-
-    if r.has_entity("repeat"):
-        if r.entity("repeat") == 'true':
-            nn.log("condition", "repeat=True")
-            return internet_repeat()
-
-    if r.has_entity("robot"):
-        if r.entity("robot") == 'true':
-            nn.log("condition", "robot=True")
-            return internet_robot()
-
-    if r.has_entity("operator"):
-        if r.entity("operator") == 'true':
-            nn.log("condition", "operator=True")
-            return goodbye_operator_demand()
-
-    if r.has_entity("confirm"):
-        if r.entity("confirm") == 'true':
-            nn.log("condition", "confirm=True")
-            return goodbye_operator()
-        if r.entity("confirm") == 'false':
-            nn.log("condition", "confirm=False")
-            return internet_green_main()
-
-    return internet_default()
+    return transition(r, internet_transitions, internet_null, internet_default)()
 
 # //--//--//--//--//--//--//
 
 # Логика условий для internet_green_unit
 
+internet_green_transitions = compile_transitions({
+    ('repeat', 'true'): internet_green_repeat,
+    ('robot', 'true'): internet_green_robot,
+    ('operator', 'true'): goodbye_operator_demand,
+    ('confirm', 'true'): more_question_main,
+    ('confirm', 'false'): goodbye_internet_green,
+})
+
+
 @check_call_state(nv)
 def internet_green_logic(r):
     nn.log('unit', 'internet_green_unit')
@@ -643,43 +587,23 @@ def internet_green_logic(r):
             nn.log("Recursive execution detected")
             return
 
-    if not r:
-        nn.log("condition", "NULL")
-        return internet_green_null()
-
-    if not r.has_entities():
-        nn.log('condition', 'DEFAULT')
-        return internet_green_default()
-
-    if r.has_entity("repeat"):
-        if r.entity("repeat") == 'true':
-            nn.log("condition", "repeat=True")
-            return internet_green_repeat()
-
-    if r.has_entity("robot"):
-        if r.entity("robot") == 'true':
-            nn.log("condition", "robot=True")
-            return internet_green_robot()
-
-    if r.has_entity("operator"):
-        if r.entity("operator") == 'true':
-            nn.log("condition", "operator=True")
-            return goodbye_operator_demand()
-
-    if r.has_entity("confirm"):
-        if r.entity("confirm") == 'true':
-            nn.log("condition", "confirm=True")
-            return more_question_main()
-        if r.entity("confirm") == 'false':
-            nn.log("condition", "confirm=False")
-            return goodbye_internet_green()
-
-    return internet_green_default()
+    return transition(r, internet_green_transitions, internet_green_null, internet_green_default)()
 
 # //--//--//--//--//--//--//
 
 # Логика условий для more_question_unit
 
+more_question_transitions = compile_transitions({
+    ('payment_problem', 'true'): payment_main,
+    ('internet_problem', 'true'): internet_main,
+    ('tv_problem', 'true'): tv_main,
+    ('robot', 'true'): more_question_robot,
+    ('no_question', 'true'): goodbye_main,
+    ('operator', 'true'): goodbye_operator_demand,
+    ('confirm', 'true'): more_question_confirm,
+})
+
+
 @check_call_state(nv)
 def more_question_logic(r):
     nn.log('unit', 'more_question_unit')
@@ -693,47 +617,4 @@ def more_question_logic(r):
             nn.log("Recursive execution detected")
             return
 
-    if not r:
-        nn.log("condition", "NULL")
-        return more_question_null()
-
-    if not r.has_entities():
-        nn.log('condition', 'DEFAULT')
-        return more_question_default()
-
-    if r.has_entity("payment_problem"):
-        if r.entity("payment_problem") == 'true':
-            nn.log("condition", "payment_problem=True")
-            return payment_main()
-
-    if r.has_entity("internet_problem"):
-        if r.entity("internet_problem") == 'true':
-            nn.log("condition", "internet_problem=True")
-            return internet_main()
-
-    if r.has_entity("tv_problem"):
-        if r.entity("tv_problem") == 'true':
-            nn.log("condition", "tv_problem=True")
-            return tv_main()
-
-    if r.has_entity("robot"):
-        if r.entity("robot") == 'true':
-            nn.log("condition", "robot=True")
-            return more_question_robot()
-
-    if r.has_entity("no_question"):
-        if r.entity("no_question") == 'true':
-            nn.log("condition", "no_question=True")
-            return goodbye_main()
-
-    if r.has_entity("operator"):
-        if r.entity("operator") == 'true':
-            nn.log("condition", "operator=True")
-            return goodbye_operator_demand()
-
-    if r.has_entity("confirm"):
-        if r.entity("confirm") == 'true':
-            nn.log("condition", "confirm=True")
-            return more_question_confirm()
-
-    return more_question_default()
+    return transition(r, more_question_transitions, more_question_null, more_question_default)()
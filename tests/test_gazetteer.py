@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from libneuro.local import Agent, LocalNeuroNluLibrary
+from libneuro.local.gazetteer import Gazetteer, build_gazetteer
+
+CITIES = [
+    ('Москва', 'Москва'),
+    ('москва', 'Вторая Москва'),
+    ('Нижний Новгород', 'Нижний Новгород'),
+    ('нижний', 'Нижний Тагил'),
+    ('Орёл', 'Орёл'),
+    ('ор', 'Ор'),
+    ('Санкт-Петербург', 'Санкт-Петербург'),
+    ('', 'Пусто'),
+]
+
+
+class GazetteerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'city.gaz')
+        self.count = build_gazetteer(self.path, CITIES)
+        self.gazetteer = Gazetteer(self.path)
+
+    def tearDown(self):
+        self.gazetteer.close()
+        shutil.rmtree(self.directory)
+
+    def test_duplicates_and_empty_keys(self):
+        # повтор нормализованного ключа и пустой ключ не записываются, остается первое значение
+        self.assertEqual(self.count, 6)
+        self.assertEqual(len(self.gazetteer), 6)
+        self.assertEqual(self.gazetteer.get('МОСКВА'), 'Москва')
+
+    def test_normalization(self):
+        self.assertEqual(self.gazetteer.get('орел'), 'Орёл')
+        self.assertEqual(self.gazetteer.get('ОРЁЛ'), 'Орёл')
+        self.assertEqual(self.gazetteer.get('орел', normalized=True), 'Орёл')
+        self.assertIn('Санкт-Петербург', self.gazetteer)
+
+    def test_prefix_keys(self):
+        # ключ, который является префиксом другого ключа, не должен находить чужую запись
+        self.assertEqual(self.gazetteer.get('ор'), 'Ор')
+        self.assertEqual(self.gazetteer.get('нижний'), 'Нижний Тагил')
+        self.assertIsNone(self.gazetteer.get('о'))
+        self.assertIsNone(self.gazetteer.get('нижний новгород область'))
+        self.assertNotIn('тверь', self.gazetteer)
+        self.assertNotIn('', self.gazetteer)
+
+    def test_same_as_dict(self):
+        entries = [('город %d' % i, 'Город %d' % i) for i in range(1000, 0, -1)]
+        path = os.path.join(self.directory, 'many.gaz')
+        build_gazetteer(path, entries)
+        gazetteer = Gazetteer(path)
+        try:
+            expected = dict(entries)
+            for key, value in expected.items():
+                self.assertEqual(gazetteer.get(key), value)
+            for key in ('город 0', 'город 1001', 'город', 'город 10000', 'я'):
+                self.assertIsNone(gazetteer.get(key))
+        finally:
+            gazetteer.close()
+
+    def test_find_longest(self):
+        words = 'я из нижний новгород а брат из нижний и орел'.split()
+        self.assertEqual(self.gazetteer.find(words), [
+            (2, 4, 'Нижний Новгород'), (7, 8, 'Нижний Тагил'), (9, 10, 'Орёл'),
+        ])
+        self.assertEqual(self.gazetteer.find([]), [])
+
+    def test_not_an_index(self):
+        path = os.path.join(self.directory, 'broken.gaz')
+        with open(path, 'wb') as f:
+            f.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            Gazetteer(path)
+
+
+class GazetteerNluTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        paths = {}
+        for kind, entries in (('city', CITIES), ('street', [('Тверская', 'Тверская')]),
+                              ('first', [('Иван', 'Иван')]), ('last', [('Петров', 'Петров')])):
+            paths[kind] = os.path.join(self.directory, kind + '.gaz')
+            build_gazetteer(paths[kind], entries)
+        self.nlu = LocalNeuroNluLibrary(Agent(gazetteers=paths))
+
+    def tearDown(self):
+        for gazetteer in self.nlu.gazetteers.values():
+            gazetteer.close()
+        shutil.rmtree(self.directory)
+
+    def test_extract_address(self):
+        result = self.nlu.extract_address('Нижний Новгород, Тверская дом 5 кв 12')
+        self.assertEqual(result['city'], ['Нижний Новгород'])
+        self.assertEqual(result['street'], ['Тверская'])
+        self.assertEqual(result['building'], ['5'])
+        self.assertEqual(result['appartment'], '12')
+
+    def test_extract_person(self):
+        # порядок слов не важен, если они есть в справочниках
+        self.assertEqual(self.nlu.extract_person('петров иван сергеевич'),
+                         {'first': 'Иван', 'last': 'Петров', 'middle': 'Сергеевич'})
+        self.assertEqual(self.nlu.extract_person('Петров, Иван.'), {'first': 'Иван', 'last': 'Петров', 'middle': None})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import re
+import unittest
+
+from libneuro.local.matcher import AhoCorasick, PatternMatcher, literal_anchors
+
+RULES = [
+    ('confirm', 'true', r'\bда\b'),
+    ('confirm', 'true', r'конечно|разумеется'),
+    ('confirm', 'false', r'\bнет\b|не надо'),
+    ('payment', 'true', r'плат[её]ж'),
+    ('payment', 'late', r'просроч\w+ плат'),
+    ('amount', 'any', r'\d+ руб'),
+    ('robot', 'true', r'(?:ты|вы) робот'),
+    ('repeat', 'true', r'повтор(и|ите)'),
+    ('brace', 'true', r'x{2}y|a{b'),
+    ('dot', 'true', r'ул\. ленина'),
+    ('plus', 'true', r'a\+b'),
+    ('optional', 'true', r'колл?-центр'),
+]
+
+TEXTS = [
+    '', 'да', 'дада', 'ну да конечно', 'нет не надо', 'не надо', 'платеж прошел', 'платёж', 'платаж',
+    'просроченный плат', 'просрочен плат', '500 руб', 'руб', 'ты робот', 'вы робот?', 'робот', 'повторите',
+    'повтор', 'xxy', 'xy', 'a{b', 'ул. ленина', 'ул ленина', 'a+b', 'ab', 'колцентр', 'кол-центр', 'колл-центр',
+]
+
+
+def sequential(rules, text, check=None, skip=()):
+    found = {}
+    for name, value, pattern in rules:
+        if name in found or name in skip or (check is not None and not check(name)):
+            continue
+        if re.search(pattern, text):
+            found[name] = value
+    return found
+
+
+class LiteralAnchorsTest(unittest.TestCase):
+
+    def test_anchors(self):
+        cases = [
+            (r'\bда\b', ['да']),
+            (r'плат[её]ж', ['плат']),
+            (r'нет|не надо', ['нет', 'не надо']),
+            (r'колл?-центр', ['-центр']),
+            (r'ул\. ленина', ['ул. ленина']),
+            (r'a{b', ['a{b']),
+            (r'x{2}y', ['y']),
+            (r'ab+c', ['ab']),
+            (r'(да|ага) конечно', [' конечно']),
+        ]
+        for pattern, anchors in cases:
+            with self.subTest(pattern=pattern):
+                self.assertEqual(literal_anchors(pattern), anchors)
+
+    def test_no_anchor(self):
+        for pattern in (r'(?:ты|вы) робот', r'\d+', r'да|\w+', r'[а-я]+', r'.*', r'(да|нет)'):
+            with self.subTest(pattern=pattern):
+                self.assertIsNone(literal_anchors(pattern))
+
+    def test_anchor_is_required(self):
+        # литерал обязан входить в любую строку, с которой совпал паттерн
+        for _, _, pattern in RULES:
+            anchors = literal_anchors(pattern)
+            if anchors is None:
+                continue
+            for text in TEXTS:
+                if re.search(pattern, text):
+                    with self.subTest(pattern=pattern, text=text):
+                        self.assertTrue(any(anchor in text for anchor in anchors))
+
+
+class AhoCorasickTest(unittest.TestCase):
+
+    def test_search_overlapping(self):
+        automaton = AhoCorasick([('he', 1), ('she', 2), ('his', 3), ('hers', 4)])
+        self.assertEqual(automaton.search('ushers'), {1, 2, 4})
+        self.assertEqual(automaton.search('this'), {3})
+        self.assertEqual(automaton.search('xyz'), set())
+
+    def test_scan_continues_between_chunks(self):
+        automaton = AhoCorasick([('he', 1), ('she', 2), ('hers', 4)])
+        node, first = automaton.scan('us')
+        node, second = automaton.scan('hers', node, 2)
+        self.assertEqual(automaton.scan('ushers')[1], first + second)
+        self.assertEqual(sorted(second), [(1, 4), (2, 4), (4, 6)])
+
+
+class PatternMatcherTest(unittest.TestCase):
+
+    def test_same_as_sequential_search(self):
+        matcher = PatternMatcher(RULES)
+        for text in TEXTS + [' '.join(TEXTS)]:
+            with self.subTest(text=text):
+                self.assertEqual(matcher.match(text), sequential(RULES, text))
+
+    def test_first_declared_value_wins(self):
+        matcher = PatternMatcher(RULES)
+        self.assertEqual(matcher.match('да нет')['confirm'], 'true')
+        self.assertEqual(matcher.match('просроченный платеж')['payment'], 'true')
+
+    def test_check_and_skip(self):
+        matcher = PatternMatcher(RULES)
+        text = 'да, платеж 500 руб'
+        check = {'confirm', 'amount'}.__contains__
+        self.assertEqual(matcher.match(text, check), sequential(RULES, text, check))
+        self.assertEqual(matcher.match(text, skip=('payment',)), {'confirm': 'true', 'amount': 'any'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from libneuro.local import CallScheduler
+
+START = datetime(2024, 5, 1, 9, 0)
+
+
+def ticks(seconds):
+    return START + timedelta(seconds=seconds)
+
+
+class CallSchedulerTest(unittest.TestCase):
+
+    def test_same_as_sorted_list(self):
+        # маленькое колесо: 4 ячейки, 2 уровня – сроки дальше 16 тиков попадают в overflow,
+        # звонки проходят через опускание ячеек и перенос из overflow
+        rng = random.Random(7)
+        scheduler = CallScheduler(slots=4, levels=2, now=START)
+        expected = {}
+        now = 0
+        for step in range(300):
+            for _ in range(rng.randint(0, 3)):
+                seconds = now + rng.choice([1, 2, 3, 5, 15, 16, 17, 40, 300])
+                priority = rng.choice([None, 0, 1, 5])
+                call_id = scheduler.add(ticks(seconds), {'step': step}, priority)
+                expected[call_id] = (seconds, priority or 0)
+            if expected and rng.random() < 0.2:
+                call_id = rng.choice(sorted(expected))
+                self.assertTrue(scheduler.cancel(call_id))
+                self.assertFalse(scheduler.cancel(call_id))
+                del expected[call_id]
+            now += rng.choice([0, 1, 1, 2, 7, 33])
+            due = scheduler.pop_due(ticks(now))
+            due_ids = {call_id for call_id, (seconds, _) in expected.items() if seconds <= now}
+            self.assertEqual({call.call_id for call in due}, due_ids, 'step %d' % step)
+            order = [(-call.priority, call.date) for call in due]
+            self.assertEqual(order, sorted(order))
+            for call_id in due_ids:
+                del expected[call_id]
+            self.assertEqual(len(scheduler), len(expected))
+        self.assertEqual(len(scheduler.pop_due(ticks(now + 10 ** 6))), len(expected))
+        self.assertEqual(len(scheduler), 0)
+
+    def test_limit(self):
+        scheduler = CallScheduler(now=START)
+        low = scheduler.add_many((ticks(1), 0, {'n': n}) for n in range(3))
+        high = scheduler.add(ticks(2), {'n': 'high'}, priority=10)
+        self.assertEqual([call.call_id for call in scheduler.pop_due(ticks(5), limit=2)], [high, low[0]])
+        self.assertEqual([call.call_id for call in scheduler.pop_due(ticks(5))], low[1:])
+        self.assertEqual(scheduler.pop_due(ticks(5)), [])
+
+    def test_not_due_yet(self):
+        scheduler = CallScheduler(tick=60, now=START)
+        call_id = scheduler.add(ticks(3600), {})
+        self.assertEqual(scheduler.pop_due(ticks(3599)), [])
+        self.assertIn(call_id, scheduler)
+        self.assertEqual([call.call_id for call in scheduler.pop_due(ticks(3600))], [call_id])
+
+    def test_past_date(self):
+        scheduler = CallScheduler(now=START)
+        call_id = scheduler.add(ticks(-100), {})
+        self.assertEqual([call.call_id for call in scheduler.pop_due(START)], [call_id])
+
+    def test_slots_power_of_two(self):
+        with self.assertRaises(ValueError):
+            CallScheduler(slots=100)
+
+
+class CallSchedulerLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'calls.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reopen(self, scheduler):
+        scheduler.close()
+        return CallScheduler(slots=4, levels=2, log_path=self.path, now=START)
+
+    def test_replay(self):
+        scheduler = CallScheduler(slots=4, levels=2, log_path=self.path, now=START)
+        first = scheduler.add(ticks(10), {'phone': '79990000001', 'attempt': 1}, priority=2)
+        cancelled = scheduler.add(ticks(20), {'phone': '79990000002'})
+        batch = scheduler.add_many([(ticks(5), None, {'phone': '79990000003'}), (ticks(500), 1, {'when': START})])
+        scheduler.cancel(cancelled)
+        self.assertEqual([call.call_id for call in scheduler.pop_due(ticks(5))], [batch[0]])
+
+        scheduler = self.reopen(scheduler)
+        self.assertEqual(len(scheduler), 2)
+        self.assertNotIn(cancelled, scheduler)
+        self.assertNotIn(batch[0], scheduler)
+        # новые call_id не повторяют записанные в журнал
+        added = scheduler.add(ticks(30), {})
+        self.assertGreater(added, batch[1])
+
+        due = scheduler.pop_due(ticks(1000))
+        self.assertEqual([call.call_id for call in due], [first, batch[1], added])
+        self.assertEqual(due[0].payload, {'phone': '79990000001', 'attempt': 1})
+        self.assertEqual(due[0].date, ticks(10))
+        self.assertEqual(due[1].payload, {'when': str(START)})
+
+        scheduler = self.reopen(scheduler)
+        self.assertEqual(len(scheduler), 0)
+        scheduler.close()
+
+    def test_compact(self):
+        scheduler = CallScheduler(slots=4, levels=2, log_path=self.path, now=START)
+        ids = scheduler.add_many((ticks(n), 0, {'n': n}) for n in range(1, 11))
+        for call_id in ids[:5]:
+            scheduler.cancel(call_id)
+        scheduler.pop_due(ticks(7))
+        scheduler.compact()
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 1 + 3)
+
+        scheduler = self.reopen(scheduler)
+        self.assertEqual(sorted(call.call_id for call in scheduler.pop_due(ticks(100))), ids[7:])
+        self.assertEqual(scheduler.add(ticks(1), {}), ids[-1] + 1)
+        scheduler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
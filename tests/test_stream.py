@@ -0,0 +1,82 @@
+import unittest
+
+from libneuro.local import Agent, LocalNeuroNluLibrary
+from libneuro.local.bench import DEMO_AGENT, DEMO_DIALOGS
+
+NUMBERS_AGENT = Agent(
+    entities={
+        'amount': {'big': [r'\b1000\b'], 'small': [r'\b\d{1,2}\b']},
+        'provider': {'true': [r'\bинтернет\b']},
+    },
+    intents={'callback': ['перезвон']},
+    exceptions={'интер нет': 'интернет', 'инет': 'интернет'},
+    number_words=True,
+)
+
+PHRASES = [
+    'ну инет тысяча рублей интер нет перезвоните',
+    'двадцать пять рублей',
+    'интер',
+    'интер нет',
+    'перезвоните мне через двадцать',
+]
+
+
+def feed_by_chars(stream, phrase):
+    partial = ''
+    for char in phrase:
+        partial += char
+        stream.feed(partial)
+    return stream.feed(phrase, final=True)
+
+
+class StreamingExtractorTest(unittest.TestCase):
+
+    def assert_same_as_extract(self, nlu, phrase):
+        stream = nlu.stream()
+        entities, intents = feed_by_chars(stream, phrase)
+        expected = nlu.extract(phrase).dump()
+        self.assertEqual(stream.text, expected['utterance'])
+        self.assertEqual(entities, expected['entities'])
+        self.assertEqual(intents, expected['intents'])
+
+    def test_demo_phrases(self):
+        nlu = LocalNeuroNluLibrary(DEMO_AGENT)
+        for phrase in {phrase for dialog in DEMO_DIALOGS for phrase in dialog if phrase}:
+            with self.subTest(phrase=phrase):
+                self.assert_same_as_extract(nlu, phrase)
+
+    def test_exceptions_and_numbers(self):
+        # замены и числа, которые собираются из нескольких слов, должны дождаться следующих слов
+        nlu = LocalNeuroNluLibrary(NUMBERS_AGENT)
+        for phrase in PHRASES:
+            with self.subTest(phrase=phrase):
+                self.assert_same_as_extract(nlu, phrase)
+
+    def test_last_word_waits(self):
+        nlu = LocalNeuroNluLibrary(DEMO_AGENT)
+        stream = nlu.stream(entities=['confirm'])
+        self.assertEqual(stream.feed('не'), ({}, {}))
+        self.assertEqual(stream.feed('нет'), ({}, {}))
+        self.assertEqual(stream.feed('нет '), ({'confirm': 'false'}, {}))
+
+    def test_first_value_during_speech(self):
+        nlu = LocalNeuroNluLibrary(DEMO_AGENT)
+        entities, _ = feed_by_chars(nlu.stream(), 'нет да')
+        self.assertEqual(entities['confirm'], 'false')
+        self.assertEqual(nlu.extract('нет да').dump()['entities']['confirm'], 'true')
+
+    def test_rewritten_hypothesis_resets(self):
+        nlu = LocalNeuroNluLibrary(DEMO_AGENT)
+        stream = nlu.stream()
+        self.assertEqual(stream.feed('да ')[0], {'confirm': 'true'})
+        self.assertEqual(stream.feed('нет оператор', final=True)[0], {'confirm': 'false', 'operator': 'true'})
+
+    def test_scope(self):
+        nlu = LocalNeuroNluLibrary(DEMO_AGENT)
+        entities, _ = feed_by_chars(nlu.stream(entities_exclude=['confirm']), 'да оператор')
+        self.assertEqual(entities, {'operator': 'true'})
+
+
+if __name__ == '__main__':
+    unittest.main()
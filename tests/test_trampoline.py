@@ -0,0 +1,87 @@
+import sys
+import unittest
+
+from libneuro.local import Agent, ScriptExecutor
+
+SCRIPT = '''
+import sys
+
+
+def stack_depth():
+    frame, depth = sys._getframe(), 0
+    while frame is not None:
+        frame, depth = frame.f_back, depth + 1
+    return depth
+
+
+@check_call_state(nv)
+def get_name():
+    return 'Anton'
+
+
+def helper():
+    return get_name()
+
+
+@check_call_state(nv)
+def chained():
+    return get_name()
+
+
+@check_call_state(nv)
+def goodbye(name):
+    nv.say('bye', name)
+    nv.hangup()
+
+
+@check_call_state(nv)
+def hello_main():
+    name = get_name()
+    nv.say('hello', name + helper() + chained())
+    return goodbye(name) if name else None
+
+
+@check_call_state(nv)
+def loop(n=0):
+    if n in (0, 2000):
+        nv.say('depth', str(stack_depth()))
+    if n >= 2000:
+        nv.hangup()
+        return
+    return loop(n + 1)
+'''
+
+
+class TrampolineTest(unittest.TestCase):
+
+    def run_script(self, entry_point, trampoline):
+        return ScriptExecutor(SCRIPT, Agent(), trampoline=trampoline).run(entry_point, [])
+
+    def test_nested_calls_return_values(self):
+        # не хвостовые вызовы и вызовы из недекорированных функций возвращают значение, а не Transition
+        expected = [('say', 'hello', 'AntonAntonAnton'), ('say', 'bye', 'Anton'), ('hangup',)]
+        for trampoline in (False, True):
+            with self.subTest(trampoline=trampoline):
+                self.assertEqual(self.run_script('hello_main', trampoline)['actions'], expected)
+
+    def test_tail_calls_keep_stack_flat(self):
+        actions = self.run_script('loop', True)['actions']
+        depths = [int(action[2]) for action in actions if action[:2] == ('say', 'depth')]
+        self.assertEqual(len(depths), 2)
+        # первый вызов идёт из исполнителя, остальные — из цикла батута
+        self.assertLessEqual(depths[1] - depths[0], 1)
+        self.assertEqual(actions[-1], ('hangup',))
+
+    def test_recursion_without_trampoline(self):
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(10000)
+        try:
+            actions = self.run_script('loop', False)['actions']
+        finally:
+            sys.setrecursionlimit(limit)
+        depths = [int(action[2]) for action in actions if action[:2] == ('say', 'depth')]
+        self.assertGreater(depths[1], depths[0] + 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()